@@ -2,32 +2,91 @@ import pandas as pd
 import json
 import time
 import os
+import asyncio
 from datetime import datetime
-from anthropic import Anthropic
+from concurrent.futures import ThreadPoolExecutor
+from anthropic import Anthropic, AsyncAnthropic
 from typing import Dict, List, Optional
+from collections import Counter
+from types import SimpleNamespace
 import re
+import hashlib
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from batch_backend import BatchBackend, message_text
+from journal import RunJournal
+from preprocess import InputPreprocessor
+from rules import RuleEngine
+from excel_stream import ExcelRowStream
+from telemetry import CallTelemetry
 
 class CosmeticDataGenerator:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, rate_limiter: RateLimiter = None,
+                 use_cache: bool = True, cache_path: str = "claude_response_cache.sqlite",
+                 base_url: str = None, preprocess_inputs: bool = True, field_token_budget: Dict = None,
+                 use_rules: bool = True, rule_fast_path: bool = False, fast_model: str = None,
+                 structured_output: bool = False):
         """
         화장품 데이터 생성기 초기화
         
         Args:
             api_key: Claude API 키
+            rate_limiter: 공유 Rate Limiter (None이면 기본 RPM/TPM 설정으로 생성)
+            use_cache: 응답 캐시 사용 여부 (False면 항상 API 호출)
+            cache_path: 응답 캐시 sqlite 파일 경로
+            base_url: API 주소 (None이면 기본값, 로컬 테스트 서버 주소로 바꿀 수 있음)
+            preprocess_inputs: 제품설명/전성분 정리 및 토큰 예산 적용 여부
+            field_token_budget: 필드별 토큰 예산 (None이면 InputPreprocessor.DEFAULT_BUDGET)
+            use_rules: 규칙으로 확정되는 필드(제품유형, 아토피/건선 제외 등)를 LLM 제약 조건으로 전달하고 응답에 적용
+            rule_fast_path: 제품유형/피부타입/관련 피부질환이 모두 규칙으로 확정되면 LLM 호출 생략
+                (세 필드와 제품설명만 채워지고 주요 효능/케어 증상/핵심 성분/설명은 비므로 기본값은 False, 구조화 출력에서는 무시)
+            fast_model: 먼저 시도할 빠르고 저렴한 모델 (None이면 self.model만 사용, 검증 실패/복잡한 제품은 self.model로 승격)
+            structured_output: 도구(JSON 스키마) 호출로 모든 필드를 받아서 정규식 파싱 없이 타입이 정해진 컬럼으로 저장
         """
-        self.client = Anthropic(api_key=api_key)
+        # 재시도는 rate_limiter(retry-after 존중, 지터 백오프)에서만 하도록 SDK 자체 재시도는 끔
+        self.client = Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+        self.async_client = AsyncAnthropic(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = "claude-sonnet-4-20250514"
+        self.fast_model = fast_model
+        self.structured_output = structured_output
+        self.max_tokens = 1500
+        self.temperature = 0.3
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = ResponseCache(cache_path) if use_cache else None
+        self.input_preprocessor = InputPreprocessor(field_token_budget) if preprocess_inputs else None
+        self.rule_engine = RuleEngine() if use_rules else None
+        # 규칙만으로 만든 결과에는 구조화 출력 필드(주요 효능/케어 증상/핵심 성분/설명)가 없으므로 같이 쓰지 않음
+        self.rule_fast_path = rule_fast_path and not structured_output
+        if rule_fast_path and structured_output:
+            print("⚠️ 구조화 출력에서는 규칙 빠른 경로를 사용하지 않습니다 (rule_fast_path 무시)")
+        self.rule_stats = {'skipped': 0, 'constrained': 0, 'corrected': 0}
         
-        # 프롬프트 템플릿
-        self.prompt_template = """
+        # 토큰 사용량 누적 (프롬프트 캐시 읽기/쓰기 포함)
+        self.usage_totals = {
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0
+        }
+        self.prompt_cache_warm = set()  # 프롬프트 캐시가 만들어진 모델
+        
+        # 다중 제품 묶음 요청 통계
+        self.pack_stats = {'packs': 0, 'packed_products': 0, 'fallbacks': 0}
+        
+        # 모델 티어별 통계 (API 응답 수, 응답 시간, 검증 통과/승격 수)
+        self.tier_stats = {}
+        self.complex_count = 0
+        
+        # API 호출별 지표 (실행 중에는 call_listener로 작업 저널에도 기록)
+        self.telemetry = CallTelemetry()
+        self.call_listener = None
+        
+        # 고정 프롬프트 (분석 규칙 + 예시) - 모든 요청에서 동일하므로 프롬프트 캐시 대상
+        self.system_prompt = """
 당신은 피부과 전문 화장품 데이터 분석가입니다.
-다음 화장품의 제품설명을 참고하고 전성분을 분석하여 피부질환 케어에 적합한 구조화된 상세정보를 생성해주세요.
-
-## 입력 정보
-- 제품명: {제품명}
-- 브랜드: {브랜드}
-- 제품설명: {제품설명}
-- 전성분: {전성분}  # ← 전체 다 넣기!
+사용자가 제공하는 화장품의 제품설명을 참고하고 전성분을 분석하여 피부질환 케어에 적합한 구조화된 상세정보를 생성해주세요.
+입력 정보(제품명, 브랜드, 제품설명, 전성분)는 사용자 메시지로 제공됩니다.
+전성분은 원래 순서(농도 순)대로 제공되며, 목록이 길면 뒤쪽 성분이 "외 N종"으로 생략될 수 있습니다.
 
 ## 분석 방법
 0. 화장품 회사에서 제공하는 제품설명을 읽고 제품의 주 목적을 파악하세요.
@@ -116,9 +175,46 @@ class CosmeticDataGenerator:
 정상 피부의 일상적인 건조함과 당김을 완화하는 기초 보습 제품입니다.
 히알루론산과 글리세린이 피부에 수분을 공급하고, 판테놀이 촉촉함을 유지시켜줍니다.
 가볍고 산뜻한 제형으로 끈적임 없이 빠르게 흡수됩니다.
+"""
+        
+        # 제품별 프롬프트 템플릿 (고정 프롬프트 뒤에 붙는 부분)
+        self.prompt_template = """
+## 입력 정보
+- 제품명: {제품명}
+- 브랜드: {브랜드}
+- 제품설명: {제품설명}
+- 전성분: {전성분}
+{제약조건}
+이제 위 형식에 맞춰 정확하게 생성해주세요.
+"""
+        
+        # 여러 제품을 한 요청에 묶을 때 쓰는 템플릿 (제품별 구간은 ID가 들어간 구분선으로 나눔)
+        self.packed_prompt_template = """
+## 입력 정보 (제품 {count}개)
+각 제품은 "### 제품 ID: P1" 형식의 줄로 구분됩니다.
+{products}
 
+## 출력 방법
+{output_guide}
 이제 위 형식에 맞춰 정확하게 생성해주세요.
 """
+        self.packed_text_guide = """제품마다 "=== 제품 ID: (ID) ===" 줄로 구간을 시작하고, 그 아래에 위 출력 형식을 그대로 작성하세요.
+다른 제품의 내용을 섞지 말고, 입력된 모든 제품 ID를 순서대로 빠짐없이 작성하세요.
+
+=== 제품 ID: P1 ===
+[제품유형: ...]
+...
+"""
+        self.packed_structured_guide = """도구 입력의 products 배열에 제품마다 product_id(P1, P2, ...)와 분석 결과를 하나씩 기록하세요.
+다른 제품의 내용을 섞지 말고, 입력된 모든 제품 ID를 빠짐없이 기록하세요.
+"""
+        self.packed_product_template = """
+### 제품 ID: {product_id}
+- 제품명: {제품명}
+- 브랜드: {브랜드}
+- 제품설명: {제품설명}
+- 전성분: {전성분}
+{제약조건}"""
 
     def parse_claude_response(self, response_text: str) -> Dict:
         """
@@ -167,58 +263,1046 @@ class CosmeticDataGenerator:
                 '원본_응답': response_text
             }
 
-    def call_claude_api(self, 제품명: str, 브랜드: str, 제품설명: str, 전성분: str, max_retries: int = 3) -> Optional[Dict]:
+    # 구조화 출력 필드: (도구 입력 키, 결과 컬럼, JSON 스키마)
+    STRUCTURED_FIELDS = [
+        ('product_type', '제품유형', {
+            'type': 'string', 'description': '제품명에서 파악한 제품 유형 (크림, 로션, 세럼, 토너, 클렌저, 선크림 등)'}),
+        ('skin_types', '피부타입', {
+            'type': 'array', 'items': {'type': 'string', 'enum': ['지성', '건성', '복합성', '민감성']},
+            'minItems': 1, 'maxItems': 2}),
+        ('related_conditions', '관련_피부질환', {
+            'type': 'array', 'items': {'type': 'string', 'enum': ['건선', '아토피', '여드름', '주사', '지루', '정상']},
+            'minItems': 1, 'maxItems': 3, 'description': '확실하지 않으면 정상'}),
+        ('key_benefits', '주요_효능', {
+            'type': 'array', 'items': {'type': 'string'}, 'minItems': 2, 'maxItems': 4}),
+        ('care_symptoms', '케어_증상', {
+            'type': 'array', 'items': {'type': 'string'}, 'minItems': 3, 'maxItems': 6,
+            'description': '성분 효능과 직접 연결되는 증상만'}),
+        ('key_ingredients', '핵심_성분', {
+            'type': 'array', 'items': {'type': 'string'}, 'minItems': 2, 'maxItems': 5,
+            'description': '앞쪽에 위치한(농도 높은) 기능성 성분 우선'}),
+        ('description', '텍스트_설명', {
+            'type': 'string',
+            'description': '제품이 어떤 피부질환/증상에 어떻게 도움되는지 2-3문장 (치료/완치 대신 케어/완화/개선 표현 사용)'}),
+    ]
+    STRUCTURED_COLUMNS = ['주요_효능', '케어_증상', '핵심_성분', '텍스트_설명']
+
+    def _tool_spec(self, packed: bool = False) -> Dict:
+        """구조화 출력용 도구 정의 (묶음 요청이면 제품별 결과 배열)"""
+        profile = {
+            'type': 'object',
+            'properties': {key: schema for key, _, schema in self.STRUCTURED_FIELDS},
+            'required': [key for key, _, _ in self.STRUCTURED_FIELDS]
+        }
+        if not packed:
+            return {
+                'name': 'record_cosmetic_profile',
+                'description': '화장품 분석 결과를 작성 규칙에 맞춰 기록합니다.',
+                'input_schema': profile
+            }
+        item = {
+            'type': 'object',
+            'properties': {'product_id': {'type': 'string'}, **profile['properties']},
+            'required': ['product_id'] + profile['required']
+        }
+        return {
+            'name': 'record_cosmetic_profiles',
+            'description': '여러 화장품의 분석 결과를 제품 ID별로 기록합니다.',
+            'input_schema': {'type': 'object', 'properties': {'products': {'type': 'array', 'items': item}},
+                             'required': ['products']}
+        }
+
+    def parse_structured_response(self, response_text) -> Dict:
         """
-        Claude API 호출
+        도구 호출 응답(JSON)을 결과 딕셔너리로 변환
         
         Args:
-            제품명: 화장품 제품명
-            브랜드: 브랜드명
-            제품설명: 제품 설명
-            전성분: 전성분 리스트
-            max_retries: 최대 재시도 횟수
+            response_text: 도구 입력 JSON 문자열 또는 딕셔너리
             
         Returns:
-            파싱된 응답 데이터 또는 None
+            파싱된 데이터 딕셔너리 (원본_응답은 임베딩용으로 기존 [필드: 값] 형식으로 만든 텍스트)
         """
-        prompt = self.prompt_template.format(
+        data = response_text
+        if isinstance(response_text, str):
+            try:
+                data = json.loads(response_text)
+            except json.JSONDecodeError:
+                data = None
+        if not isinstance(data, dict):
+            print("구조화 응답 파싱 실패: JSON 객체가 아닙니다")
+            data = {}
+        
+        parsed_data = {}
+        for key, column, schema in self.STRUCTURED_FIELDS:
+            value = data.get(key)
+            if schema['type'] == 'array':
+                if isinstance(value, str):
+                    value = value.split(',')
+                items = [str(item).strip() for item in value if str(item).strip()] if isinstance(value, list) else []
+                parsed_data[column] = items or None
+            else:
+                parsed_data[column] = str(value).strip() if value else None
+        
+        parsed_data['원본_응답'] = self.render_profile_text(parsed_data) if data else response_text
+        return parsed_data
+
+    def render_profile_text(self, parsed_data: Dict) -> str:
+        """구조화 결과를 기존 응답 형식 텍스트로 변환 (임베딩_텍스트 및 기존 파서와 호환)"""
+        lines = []
+        for _, column, schema in self.STRUCTURED_FIELDS:
+            if column == '텍스트_설명':
+                continue
+            value = parsed_data.get(column) or ''
+            rendered = value if isinstance(value, str) else ', '.join(value)
+            lines.append(f"[{column.replace('_', ' ')}: {rendered}]")
+        return '\n'.join(lines) + '\n\n' + (parsed_data.get('텍스트_설명') or '')
+
+    def parse_response(self, response_text: str) -> Dict:
+        """출력 모드에 맞게 응답 파싱 (구조화 출력이면 JSON, 아니면 [필드: 값] 정규식)"""
+        if self.structured_output:
+            return self.parse_structured_response(response_text)
+        return self.parse_claude_response(response_text)
+
+    def build_prompt(self, 제품명: str, 브랜드: str, 제품설명: str, 전성분: str, 규칙: Dict = None) -> str:
+        """제품 정보로 제품별 프롬프트 생성 (고정 프롬프트는 system으로 따로 전달, 규칙 결과는 제약 조건으로 추가)"""
+        return self.prompt_template.format(
             제품명=제품명,
             브랜드=브랜드,
             제품설명=제품설명,
-            전성분=전성분
+            전성분=전성분,
+            제약조건=RuleEngine.constraint_text(규칙)
+        )
+
+    # 묶음 응답에서 제품별 구간을 나누는 구분선
+    # 묶음 요청의 max_tokens 상한 (제품 수만큼 늘리되 모델 출력 한도와 비스트리밍 요청 제한을 넘지 않도록)
+    PACK_MAX_TOKENS = 8192
+    PACKED_SECTION_PATTERN = re.compile(r'^\s*=+\s*제품\s*ID\s*[:：]\s*(P\d+)\s*=+\s*$', re.MULTILINE)
+
+    def build_packed_prompt(self, items: List[Dict]) -> str:
+        """
+        여러 제품을 한 요청에 묶은 프롬프트 생성
+        
+        Args:
+            items: 제품명, 브랜드, 제품설명, 전성분을 포함한 입력값 리스트 (순서대로 P1, P2, ... ID 부여)
+        """
+        products = ''.join(
+            self.packed_product_template.format(
+                product_id=f"P{number}",
+                제품명=fields['제품명'],
+                브랜드=fields['브랜드'],
+                제품설명=fields['제품설명'],
+                전성분=fields['전성분'],
+                제약조건=RuleEngine.constraint_text(fields.get('규칙'))
+            )
+            for number, fields in enumerate(items, start=1)
         )
+        guide = self.packed_structured_guide if self.structured_output else self.packed_text_guide
+        return self.packed_prompt_template.format(count=len(items), products=products, output_guide=guide)
+
+    def split_packed_response(self, response_text: str, count: int) -> List:
+        """
+        묶음 응답을 제품별 구간으로 나눠서 각각 파싱
+        
+        Args:
+            response_text: 묶음 요청의 응답 텍스트 (구조화 출력이면 도구 입력 JSON)
+            count: 묶은 제품 수
+            
+        Returns:
+            제품 순서대로 [(구간 원본 텍스트, 파싱 결과), ...] (구간이 없거나 필수 필드가 빠진 제품은 파싱 결과 None)
+        """
+        sections = {}
+        if self.structured_output:
+            try:
+                products = json.loads(response_text or '').get('products') or []
+            except (json.JSONDecodeError, AttributeError):
+                products = []
+            for product in products:
+                if isinstance(product, dict) and product.get('product_id'):
+                    section = {key: value for key, value in product.items() if key != 'product_id'}
+                    sections.setdefault(str(product['product_id']).strip(), json.dumps(section, ensure_ascii=False))
+        else:
+            matches = list(self.PACKED_SECTION_PATTERN.finditer(response_text or ''))
+            for i, match in enumerate(matches):
+                end = matches[i + 1].start() if i + 1 < len(matches) else len(response_text)
+                # 같은 ID가 두 번 나오면 처음 구간만 사용
+                sections.setdefault(match.group(1), response_text[match.end():end].strip())
+        
+        results = []
+        for number in range(1, count + 1):
+            section = sections.get(f"P{number}")
+            parsed = self.parse_response(section) if section else None
+            if parsed and all(parsed.get(field) for field in ('제품유형', '피부타입', '관련_피부질환')):
+                results.append((section, parsed))
+            else:
+                results.append((section, None))
+        return results
+
+    def _request_params(self, prompt: str, max_tokens: int = None, model: str = None, packed: bool = False) -> Dict:
+        """
+        messages.create / Batches API 공통 요청 파라미터
+        
+        고정 프롬프트를 cache_control이 붙은 system 블록으로 앞에 두고 제품 정보는 마지막에 둬서
+        고정 부분은 매 요청마다 다시 처리하지 않고 프롬프트 캐시에서 읽도록 합니다.
+        구조화 출력이면 도구 호출을 강제해서 JSON 스키마에 맞는 입력으로 결과를 받습니다.
+        """
+        params = {
+            "model": model or self.model,
+            "max_tokens": max_tokens or self.max_tokens,
+            "temperature": self.temperature,
+            "system": [{
+                "type": "text",
+                "text": self.system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            "messages": [{
+                "role": "user",
+                "content": prompt
+            }]
+        }
+        if self.structured_output:
+            tool = self._tool_spec(packed)
+            params["tools"] = [tool]
+            params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+        return params
+
+    def _estimate_input_tokens(self, prompt: str, model: str = None) -> int:
+        """
+        Rate Limiter용 입력 토큰 추정
+        
+        고정 프롬프트가 한 번 캐시된 뒤에는 캐시에서 읽는 토큰이 분당 입력 토큰 한도에
+        포함되지 않으므로 제품별 부분만 계산 (프롬프트 캐시는 모델마다 따로 만들어짐)
+        """
+        tokens = self.rate_limiter.estimate_tokens(prompt)
+        if (model or self.model) not in self.prompt_cache_warm:
+            tokens += self.rate_limiter.estimate_tokens(self.system_prompt)
+        return tokens
+
+    def _record_usage(self, usage, model: str = None):
+        """응답의 토큰 사용량 누적 (프롬프트 캐시 읽기/쓰기 포함)"""
+        if usage is None:
+            return
+        for key in self.usage_totals:
+            self.usage_totals[key] += getattr(usage, key, None) or 0
+        if (getattr(usage, 'cache_read_input_tokens', None) or getattr(usage, 'cache_creation_input_tokens', None)):
+            self.prompt_cache_warm.add(model or self.model)
+
+    def usage_summary(self) -> str:
+        """토큰 사용량 및 프롬프트 캐시 통계 문자열"""
+        totals = self.usage_totals
+        prompt_total = totals['input_tokens'] + totals['cache_read_input_tokens'] + totals['cache_creation_input_tokens']
+        cached_ratio = totals['cache_read_input_tokens'] / prompt_total * 100 if prompt_total else 0.0
+        return (f"토큰 사용량: 입력 {totals['input_tokens']:,} / 출력 {totals['output_tokens']:,} / "
+                f"캐시 쓰기 {totals['cache_creation_input_tokens']:,} / 캐시 읽기 {totals['cache_read_input_tokens']:,} "
+                f"(입력 중 캐시 읽기 {cached_ratio:.1f}%)")
+
+    def _record_call(self, model: str, usage, seconds: float, attempts: int, products: int = 1, ok: bool = True,
+                     batch: bool = False):
+        """API 호출 한 번의 지표 기록 (실행 중이면 작업 저널에도 추가)"""
+        record = self.telemetry.make_record(model, usage, seconds, attempts, products, ok, batch)
+        self.telemetry.add(record)
+        if self.call_listener is not None:
+            self.call_listener(record)
+
+    def _rule_only_result(self, 규칙: Optional[Dict], 제품설명: str) -> Optional[Dict]:
+        """세 필드가 모두 규칙으로 확정된 제품이면 LLM 없이 만든 결과 반환 (아니면 None)"""
+        if not (self.rule_fast_path and 규칙 and 규칙['complete']):
+            return None
+        self.rule_stats['skipped'] += 1
+        return self.parse_claude_response(self.rule_engine.render(규칙, 제품설명))
+
+    def _apply_rules(self, parsed: Optional[Dict], 규칙: Optional[Dict]) -> Optional[Dict]:
+        """파싱된 LLM 응답에 규칙 결과 적용"""
+        if parsed is None or not 규칙:
+            return parsed
+        if RuleEngine.constraint_text(규칙):
+            self.rule_stats['constrained'] += 1
+        if self.rule_engine is not None and self.rule_engine.enforce(parsed, 규칙):
+            self.rule_stats['corrected'] += 1
+        return parsed
+
+    def rule_summary(self) -> str:
+        """규칙 엔진 통계 문자열"""
+        stats = self.rule_stats
+        return (f"규칙 엔진: LLM 생략 {stats['skipped']}건, 제약 조건 전달 {stats['constrained']}건, "
+                f"응답 보정 {stats['corrected']}건")
+
+    # 검증용 선택지 (프롬프트 작성 규칙과 같음, 예시 3의 "정상피부" 표기도 허용)
+    ALLOWED_SKIN_TYPES = {'지성', '건성', '복합성', '민감성'}
+    ALLOWED_DISEASES = {'건선', '아토피', '여드름', '주사', '지루', '정상', '정상피부'}
+
+    # 빠른 모델을 건너뛰고 바로 상위 모델을 쓰는 제품 (질환을 내세우는 제품, 전성분이 아주 긴 제품)
+    COMPLEX_CLAIM_PATTERN = re.compile(r'아토피|건선|지루|주사|여드름|아크네|atopic|psoriasis|acne', re.IGNORECASE)
+    COMPLEX_INGREDIENT_COUNT = 40
+
+    @property
+    def model_tiers(self) -> List[str]:
+        """시도할 모델 순서 (빠른 모델 → 기본 모델)"""
+        if self.fast_model and self.fast_model != self.model:
+            return [self.fast_model, self.model]
+        return [self.model]
+
+    def validate_response(self, parsed: Optional[Dict]) -> List[str]:
+        """
+        파싱된 응답 검증
+        
+        Returns:
+            문제 목록 (비어 있으면 통과)
+        """
+        if not parsed:
+            return ['응답 없음']
+        problems = []
+        if not parsed.get('제품유형'):
+            problems.append('제품유형 없음')
+        skin_types = parsed.get('피부타입')
+        if not skin_types:
+            problems.append('피부타입 없음')
+        elif len(skin_types) > 2 or not set(skin_types) <= self.ALLOWED_SKIN_TYPES:
+            problems.append(f"피부타입 선택지 벗어남: {', '.join(skin_types)}")
+        diseases = parsed.get('관련_피부질환')
+        if not diseases:
+            problems.append('관련 피부질환 없음')
+        elif len(diseases) > 3 or not set(diseases) <= self.ALLOWED_DISEASES:
+            problems.append(f"관련 피부질환 선택지 벗어남: {', '.join(diseases)}")
+        if self.structured_output:
+            problems.extend(f"{column} 없음" for column in self.STRUCTURED_COLUMNS if not parsed.get(column))
+        return problems
+
+    def is_complex_product(self, 제품명: str, 제품설명: str, 전성분: str) -> bool:
+        """빠른 모델을 건너뛸 복잡한 제품인지 판단"""
+        if self.COMPLEX_CLAIM_PATTERN.search(f"{제품명} {제품설명}"):
+            return True
+        return InputPreprocessor.count_ingredients(전성분) > self.COMPLEX_INGREDIENT_COUNT
+
+    def _models_for(self, fields: Dict) -> List[str]:
+        """제품별로 시도할 모델 목록 (복잡한 제품은 기본 모델만)"""
+        tiers = self.model_tiers
+        if len(tiers) > 1 and self.is_complex_product(fields['제품명'], fields['제품설명'], fields['전성분']):
+            self.complex_count += 1
+            return [self.model]
+        return tiers
+
+    def _tier(self, model: str) -> Dict:
+        return self.tier_stats.setdefault(model, {'calls': 0, 'seconds': 0.0, 'accepted': 0, 'escalated': 0})
+
+    def _check_tier(self, parsed: Optional[Dict], model: str, last: bool, 제품명: str) -> bool:
+        """티어 응답 검증 → 통과면 True, 상위 모델로 승격해야 하면 False"""
+        problems = self.validate_response(parsed)
+        if not problems:
+            self._tier(model)['accepted'] += 1
+            return True
+        if last:
+            return True
+        self._tier(model)['escalated'] += 1
+        print(f"⤴️ {model} 응답 검증 실패 ({'; '.join(problems)}) → {self.model}로 다시 요청. 제품: {제품명}")
+        return False
+
+    def tier_summary(self) -> str:
+        """모델 티어별 통계 문자열"""
+        lines = [f"모델 티어: {' → '.join(self.model_tiers)} (복잡한 제품으로 바로 상위 모델 사용 {self.complex_count}건)"]
+        for model in self.model_tiers:
+            stats = self._tier(model)
+            average = stats['seconds'] / stats['calls'] if stats['calls'] else 0.0
+            lines.append(f"  - {model}: API 응답 {stats['calls']}건 (평균 {average:.2f}초), "
+                         f"검증 통과 {stats['accepted']}건, 상위 모델로 승격 {stats['escalated']}건")
+        return '\n'.join(lines)
+
+    def _lookup_cache(self, prompt, model: str = None):
+        """응답 캐시 조회 → (캐시 키, 캐시된 응답 텍스트 또는 None)"""
+        if self.response_cache is None:
+            return None, None
+        payload = self.system_prompt + prompt
+        if self.structured_output:
+            payload = [payload, self._tool_spec()]
+        cache_key = self.response_cache.make_key(model or self.model, self.temperature, payload)
+        return cache_key, self.response_cache.get(cache_key)
+
+    def _store_cache(self, cache_key: Optional[str], response_text: str, model: str = None):
+        """API 응답 원본을 캐시에 저장"""
+        if self.response_cache is not None and cache_key is not None:
+            self.response_cache.put(cache_key, model or self.model, response_text)
+
+    def _request_model(self, prompt: str, model: str, max_retries: int, 제품명: str,
+                       max_tokens: int = None, packed: bool = False, products: int = 1) -> Optional[str]:
+        """
+        모델 하나에 요청해서 응답 텍스트 반환 (응답 캐시 + rate limit + 재시도, 실패하면 None)
+        """
+        cache_key, cached_text = self._lookup_cache(prompt, model)
+        if cached_text is not None:
+            return cached_text
+        
+        prompt_tokens = self._estimate_input_tokens(prompt, model)
+        first_started_at = time.time()  # 실패 기록에는 재시도 대기까지 포함한 전체 경과 시간 사용
         
         for attempt in range(max_retries):
             try:
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=1500,
-                    temperature=0.3,
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                )
+                self.rate_limiter.acquire(prompt_tokens)
+                started_at = time.time()
+                response = self.client.messages.create(**self._request_params(prompt, max_tokens, model, packed))
                 
-                response_text = response.content[0].text
-                parsed_data = self.parse_claude_response(response_text)
+                response_text = message_text(response)
+                seconds = time.time() - started_at
+                self._tier(model)['calls'] += 1
+                self._tier(model)['seconds'] += seconds
+                self._record_usage(response.usage, model)
+                self._record_call(model, response.usage, seconds, attempt + 1, products)
+                self._store_cache(cache_key, response_text, model)
+                return response_text
                 
-                return parsed_data
+            except Exception as e:
+                print(f"API 호출 실패 (시도 {attempt + 1}/{max_retries}): {e}")
+                delay = self.rate_limiter.retry_delay(e, attempt)
+                if delay is None:
+                    print(f"재시도할 수 없는 오류입니다. 제품: {제품명}")
+                    self._record_call(model, None, time.time() - first_started_at, attempt + 1, products, ok=False)
+                    return None
+                if attempt < max_retries - 1:
+                    time.sleep(delay)  # retry-after 또는 지터 백오프
+                else:
+                    print(f"최대 재시도 횟수 초과. 제품: {제품명}")
+                    self._record_call(model, None, time.time() - first_started_at, attempt + 1, products, ok=False)
+                    return None
+
+    async def _request_model_async(self, prompt: str, model: str, max_retries: int, 제품명: str,
+                                   max_tokens: int = None, packed: bool = False, products: int = 1) -> Optional[str]:
+        """_request_model의 비동기 버전"""
+        cache_key, cached_text = self._lookup_cache(prompt, model)
+        if cached_text is not None:
+            return cached_text
+        
+        prompt_tokens = self._estimate_input_tokens(prompt, model)
+        first_started_at = time.time()
+        
+        for attempt in range(max_retries):
+            try:
+                await self.rate_limiter.acquire_async(prompt_tokens)
+                started_at = time.time()
+                response = await self.async_client.messages.create(**self._request_params(prompt, max_tokens, model, packed))
+                
+                response_text = message_text(response)
+                seconds = time.time() - started_at
+                self._tier(model)['calls'] += 1
+                self._tier(model)['seconds'] += seconds
+                self._record_usage(response.usage, model)
+                self._record_call(model, response.usage, seconds, attempt + 1, products)
+                self._store_cache(cache_key, response_text, model)
+                return response_text
                 
             except Exception as e:
                 print(f"API 호출 실패 (시도 {attempt + 1}/{max_retries}): {e}")
+                delay = self.rate_limiter.retry_delay(e, attempt)
+                if delay is None:
+                    print(f"재시도할 수 없는 오류입니다. 제품: {제품명}")
+                    self._record_call(model, None, time.time() - first_started_at, attempt + 1, products, ok=False)
+                    return None
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # 지수 백오프
+                    await asyncio.sleep(delay)  # retry-after 또는 지터 백오프
                 else:
                     print(f"최대 재시도 횟수 초과. 제품: {제품명}")
+                    self._record_call(model, None, time.time() - first_started_at, attempt + 1, products, ok=False)
                     return None
 
+    def call_claude_api(self, 제품명: str, 브랜드: str, 제품설명: str, 전성분: str,
+                        규칙: Dict = None, max_retries: int = 3, models: List[str] = None) -> Optional[Dict]:
+        """
+        Claude API 호출 (빠른 모델 응답이 검증에 실패하면 기본 모델로 승격)
+        
+        Args:
+            제품명: 화장품 제품명
+            브랜드: 브랜드명
+            제품설명: 제품 설명
+            전성분: 전성분 리스트
+            규칙: RuleEngine.evaluate 결과 (제약 조건으로 전달하고 응답에 적용, 모두 확정이면 호출 생략)
+            max_retries: 최대 재시도 횟수
+            models: 시도할 모델 순서 (None이면 제품에 맞게 model_tiers에서 선택)
+            
+        Returns:
+            파싱된 응답 데이터 또는 None
+        """
+        rule_result = self._rule_only_result(규칙, 제품설명)
+        if rule_result is not None:
+            return rule_result
+        
+        prompt = self.build_prompt(제품명, 브랜드, 제품설명, 전성분, 규칙)
+        if models is None:
+            models = self._models_for({'제품명': 제품명, '제품설명': 제품설명, '전성분': 전성분})
+        
+        parsed_data = None
+        for tier, model in enumerate(models):
+            response_text = self._request_model(prompt, model, max_retries, 제품명)
+            parsed_data = self.parse_response(response_text) if response_text is not None else None
+            # 규칙으로 보정하기 전의 모델 응답으로 검증 (보정이 빠른 모델의 실패를 가리지 않도록)
+            if self._check_tier(parsed_data, model, tier == len(models) - 1, 제품명):
+                break
+        return self._apply_rules(parsed_data, 규칙)
+
+    async def call_claude_api_async(self, 제품명: str, 브랜드: str, 제품설명: str, 전성분: str,
+                              규칙: Dict = None, max_retries: int = 3, models: List[str] = None) -> Optional[Dict]:
+        """
+        Claude API 비동기 호출 (call_claude_api와 같은 재시도/승격 규칙)
+        
+        Args:
+            제품명: 화장품 제품명
+            브랜드: 브랜드명
+            제품설명: 제품 설명
+            전성분: 전성분 리스트
+            규칙: RuleEngine.evaluate 결과 (제약 조건으로 전달하고 응답에 적용, 모두 확정이면 호출 생략)
+            max_retries: 최대 재시도 횟수
+            models: 시도할 모델 순서 (None이면 제품에 맞게 model_tiers에서 선택)
+            
+        Returns:
+            파싱된 응답 데이터 또는 None
+        """
+        rule_result = self._rule_only_result(규칙, 제품설명)
+        if rule_result is not None:
+            return rule_result
+        
+        prompt = self.build_prompt(제품명, 브랜드, 제품설명, 전성분, 규칙)
+        if models is None:
+            models = self._models_for({'제품명': 제품명, '제품설명': 제품설명, '전성분': 전성분})
+        
+        parsed_data = None
+        for tier, model in enumerate(models):
+            response_text = await self._request_model_async(prompt, model, max_retries, 제품명)
+            parsed_data = self.parse_response(response_text) if response_text is not None else None
+            if self._check_tier(parsed_data, model, tier == len(models) - 1, 제품명):
+                break
+        return self._apply_rules(parsed_data, 규칙)
+
+    def _prepare_pack(self, items: List[Dict]):
+        """
+        묶음 요청 준비: 제품별 응답 캐시를 먼저 확인하고 캐시에 없는 제품만 묶음
+        
+        묶음 요청은 첫 번째 티어 모델로 보내고, 복잡한 제품은 묶지 않고 따로 요청합니다.
+        
+        Returns:
+            (제품 순서대로 결과 리스트, 묶을 제품 위치 리스트, 따로 요청할 [(제품 위치, 모델 목록)])
+        """
+        pack_model = self.model_tiers[0]
+        results = [None] * len(items)
+        pending = []
+        direct = []
+        for i, fields in enumerate(items):
+            rule_result = self._rule_only_result(fields.get('규칙'), fields['제품설명'])
+            if rule_result is not None:
+                results[i] = rule_result
+                continue
+            models = self._models_for(fields)
+            if models[0] != pack_model:
+                direct.append((i, models))
+                continue
+            _, cached_text = self._lookup_cache(self.build_prompt(**fields), pack_model)
+            if cached_text is not None:
+                parsed = self.parse_response(cached_text)
+                if self._check_tier(parsed, pack_model, len(self.model_tiers) == 1, fields['제품명']):
+                    results[i] = self._apply_rules(parsed, fields.get('규칙'))
+                else:
+                    direct.append((i, self._fallback_models()))
+            else:
+                pending.append(i)
+        if len(pending) == 1:
+            direct.append((pending.pop(), None))
+        return results, pending, direct
+
+    def _pack_max_tokens(self, count: int) -> int:
+        """제품 count개를 묶은 요청의 max_tokens (PACK_MAX_TOKENS 이하)"""
+        return min(self.max_tokens * count, self.PACK_MAX_TOKENS)
+
+    def _finish_pack(self, response_text: Optional[str], items: List[Dict], pending: List[int],
+                     results: List) -> List[int]:
+        """
+        묶음 응답을 제품별로 나눠 results에 채우고, 구간 파싱/검증에 실패한 제품 위치 반환
+        
+        묶음 응답은 다른 제품과 같은 문맥에서 나온 답이므로 단일 요청 캐시 키로 저장하지 않습니다
+        (묶음 요청 전체가 묶음 프롬프트 키로 캐시되어 같은 묶음을 다시 실행하면 재사용됨).
+        """
+        pack_model = self.model_tiers[0]
+        self.pack_stats['packs'] += 1
+        self.pack_stats['packed_products'] += len(pending)
+        
+        sections = self.split_packed_response(response_text, len(pending)) if response_text else [(None, None)] * len(pending)
+        failed = []
+        for i, (_, parsed) in zip(pending, sections):
+            if parsed is None:
+                failed.append(i)
+                continue
+            if self._check_tier(parsed, pack_model, len(self.model_tiers) == 1, items[i]['제품명']):
+                results[i] = self._apply_rules(parsed, items[i].get('규칙'))
+            else:
+                failed.append(i)
+        
+        if failed:
+            self.pack_stats['fallbacks'] += len(failed)
+            print(f"⚠️ 묶음 응답 파싱/검증 실패 {len(failed)}/{len(pending)}건 → 단일 요청으로 다시 처리")
+        return failed
+
+    def _fallback_models(self) -> Optional[List[str]]:
+        """묶음에서 실패한 제품을 다시 요청할 모델 (티어를 쓰면 바로 기본 모델)"""
+        return [self.model] if len(self.model_tiers) > 1 else None
+
+    def call_claude_api_packed(self, items: List[Dict], max_retries: int = 3) -> List[Optional[Dict]]:
+        """
+        여러 제품을 한 번의 Claude API 요청으로 처리
+        
+        구간 파싱/검증에 실패한 제품은 call_claude_api로 하나씩 다시 요청합니다.
+        
+        Args:
+            items: 제품명, 브랜드, 제품설명, 전성분을 포함한 입력값 리스트
+            max_retries: 최대 재시도 횟수
+            
+        Returns:
+            제품 순서대로 파싱된 응답 데이터 또는 None 리스트
+        """
+        results, pending, direct = self._prepare_pack(items)
+        for i, models in direct:
+            results[i] = self.call_claude_api(**items[i], max_retries=max_retries, models=models)
+        if not pending:
+            return results
+        
+        prompt = self.build_packed_prompt([items[i] for i in pending])
+        response_text = self._request_model(prompt, self.model_tiers[0], max_retries,
+                                            f"묶음 {len(pending)}개", max_tokens=self._pack_max_tokens(len(pending)),
+                                            packed=True, products=len(pending))
+        
+        for i in self._finish_pack(response_text, items, pending, results):
+            results[i] = self.call_claude_api(**items[i], max_retries=max_retries, models=self._fallback_models())
+        return results
+
+    async def call_claude_api_packed_async(self, items: List[Dict], max_retries: int = 3) -> List[Optional[Dict]]:
+        """
+        여러 제품을 한 번의 Claude API 요청으로 비동기 처리 (call_claude_api_packed와 같은 규칙)
+        
+        Args:
+            items: 제품명, 브랜드, 제품설명, 전성분을 포함한 입력값 리스트
+            max_retries: 최대 재시도 횟수
+            
+        Returns:
+            제품 순서대로 파싱된 응답 데이터 또는 None 리스트
+        """
+        results, pending, direct = self._prepare_pack(items)
+        direct_results = await asyncio.gather(*(self.call_claude_api_async(**items[i], max_retries=max_retries, models=models)
+                                                for i, models in direct))
+        for (i, _), result in zip(direct, direct_results):
+            results[i] = result
+        if not pending:
+            return results
+        
+        prompt = self.build_packed_prompt([items[i] for i in pending])
+        response_text = await self._request_model_async(prompt, self.model_tiers[0], max_retries,
+                                                        f"묶음 {len(pending)}개", max_tokens=self._pack_max_tokens(len(pending)),
+                                                        packed=True, products=len(pending))
+        
+        failed = self._finish_pack(response_text, items, pending, results)
+        fallbacks = await asyncio.gather(*(self.call_claude_api_async(**items[i], max_retries=max_retries,
+                                                                      models=self._fallback_models()) for i in failed))
+        for i, result in zip(failed, fallbacks):
+            results[i] = result
+        return results
+
+    def pack_summary(self) -> str:
+        """묶음 요청 통계 문자열"""
+        stats = self.pack_stats
+        average = stats['packed_products'] / stats['packs'] if stats['packs'] else 0.0
+        return (f"묶음 요청: {stats['packs']}회 (요청당 평균 {average:.1f}개 제품), "
+                f"단일 요청으로 폴백 {stats['fallbacks']}건")
+
+    def _read_row_inputs(self, row, columns) -> Dict:
+        """엑셀 행에서 API 입력값과 가격 추출"""
+        # 가격 정보가 있는지 확인 (없으면 None)
+        if '가격' in columns and pd.notna(row.get('가격')):
+            가격 = row['가격']
+        else:
+            가격 = None
+        
+        return {
+            '제품명': str(row['제품명']).strip(),
+            '브랜드': str(row['브랜드']).strip(),
+            '제품설명': str(row['제품설명']).strip(),
+            '전성분': str(row['전성분']).strip(),
+            '가격': 가격
+        }
+
+    def _build_output_row(self, inputs: Dict, result: Optional[Dict]) -> Dict:
+        """API 결과와 원본 데이터를 출력 행으로 결합"""
+        if result:
+            # 원본 데이터와 결합 (순서: 브랜드, 제품명, 제품설명, 전성분, 임베딩_텍스트, 제품유형, 피부타입, 관련_피부질환, 가격)
+            output_row = {
+                '브랜드': inputs['브랜드'],
+                '제품명': inputs['제품명'],
+                '제품설명': inputs['제품설명'],
+                '전성분': inputs['전성분'],
+                '임베딩_텍스트': result.get('원본_응답', ''),
+                '제품유형': result.get('제품유형'),
+                '피부타입': result.get('피부타입'),
+                '관련_피부질환': result.get('관련_피부질환'),
+                '가격': inputs['가격']
+            }
+            if self.structured_output:
+                # 구조화 출력 필드는 process_cosmetic_data의 컬럼과 같은 형식(쉼표로 연결한 문자열)으로 저장
+                for column in self.STRUCTURED_COLUMNS:
+                    value = result.get(column)
+                    output_row[column] = ', '.join(value) if isinstance(value, list) else value
+            return output_row
+        
+        # 실패한 경우에도 원본 데이터는 보존
+        return {
+            '브랜드': inputs['브랜드'],
+            '제품명': inputs['제품명'],
+            '제품설명': inputs['제품설명'],
+            '전성분': inputs['전성분'],
+            '임베딩_텍스트': None,
+            '제품유형': None,
+            '피부타입': None,
+            '관련_피부질환': None,
+            '가격': inputs['가격'],
+            '처리_상태': 'API_ERROR'
+        }
+
+    def _api_inputs(self, inputs: Dict) -> Dict:
+        """
+        call_claude_api에 넘길 입력값 (전처리 사용 시 제품설명/전성분 정리 및 토큰 예산 적용)
+        
+        규칙은 전성분 뒤쪽이 잘리기 전의 원본 입력으로 판정해서 '규칙' 키로 같이 넘김
+        """
+        fields = {key: inputs[key] for key in ('제품명', '브랜드', '제품설명', '전성분')}
+        rule = None
+        if self.rule_engine is not None:
+            rule = self.rule_engine.evaluate(fields['제품명'], fields['제품설명'], fields['전성분'])
+        if self.input_preprocessor is not None:
+            fields = self.input_preprocessor.apply(fields)
+        fields['규칙'] = rule
+        return fields
+
+    # 중복 판단 시 제품명에서 무시할 용량/구성/기획 표기
+    NAME_NOISE_PATTERN = re.compile(
+        r'\[[^\]]*\]|\([^)]*\)'                                  # [기획], (리필) 등 괄호 표기
+        r'|\d+(?:\.\d+)?\s*(?:ml|g|kg|l|매|개|ea|p|입|종)\b'        # 50ml, 30g, 2개 ...
+        r'|\d+\s*\+\s*\d+'                                         # 1+1
+        r'|\b(?:기획|세트|증정|리필|단품|듀오|더블|대용량|한정)\b',
+        re.IGNORECASE
+    )
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+
+    @classmethod
+    def input_fingerprint(cls, inputs: Dict) -> str:
+        """
+        프롬프트 입력값의 정규화 지문 (용량/세트/판매처만 다른 같은 제품은 같은 값)
+        
+        Args:
+            inputs: 제품명, 브랜드, 제품설명, 전성분을 포함한 입력값
+            
+        Returns:
+            sha1 지문 문자열
+        """
+        def normalize(text):
+            return cls.WHITESPACE_PATTERN.sub(' ', str(text)).strip().lower()
+        
+        name = normalize(cls.NAME_NOISE_PATTERN.sub(' ', str(inputs['제품명'])))
+        ingredients = ','.join(part.strip() for part in normalize(inputs['전성분']).split(','))
+        key = '\x1f'.join([normalize(inputs['브랜드']), name, normalize(inputs['제품설명']), ingredients])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _group_duplicates(self, fingerprints: List[str]) -> List[int]:
+        """
+        같은 지문을 가진 행을 묶어서 각 행의 대표 행 위치를 반환
+        
+        Args:
+            fingerprints: 행 위치별 입력 지문
+            
+        Returns:
+            행 위치별 대표 행 위치 리스트 (대표 행은 그룹에서 가장 앞 행)
+        """
+        first_position = {}
+        representative = []
+        for position, fingerprint in enumerate(fingerprints):
+            representative.append(first_position.setdefault(fingerprint, position))
+        
+        unique_count = len(first_position)
+        saved = len(fingerprints) - unique_count
+        if fingerprints:
+            print(f"중복 제거: 전체 {len(fingerprints)}행 → 고유 {unique_count}건 "
+                  f"(API 호출 {saved}건 절감, {saved/len(fingerprints)*100:.1f}%)")
+        return representative
+
+    def _load_previous(self, journal_path: str, output_path: str, retry_errors: bool) -> Optional[Dict]:
+        """
+        이전 실행의 저널(없으면 결과 엑셀)에서 완료된 행 불러오기 (행 매칭은 _match_completed)
+        
+        Args:
+            journal_path: 작업 저널 경로
+            output_path: 결과 엑셀 경로
+            retry_errors: True면 처리_상태가 API_ERROR인 행은 완료로 보지 않음
+            
+        Returns:
+            {'by_key': {행 키: 출력 행}} (저널) 또는 {'by_fingerprint': {입력 지문: [출력 행, ...]}} (결과 엑셀), 없으면 None
+        """
+        if os.path.exists(journal_path):
+            # 저널: 행 번호 + 입력 지문이 모두 같아야 완료로 인정
+            records = [record for record in RunJournal.read_rows(journal_path) if record.get('key')]
+            previous = {'by_key': {record['key']: record['data'] for record in records}}
+            source, rows = journal_path, [record['data'] for record in records]
+        elif os.path.exists(output_path):
+            # 결과 엑셀: 행 번호가 없으므로 입력 지문으로 순서대로 매칭
+            rows = pd.read_excel(output_path).to_dict('records')
+            by_fingerprint = {}
+            for data in rows:
+                by_fingerprint.setdefault(self.input_fingerprint(data), []).append(data)
+            previous = {'by_fingerprint': by_fingerprint}
+            source = output_path
+        else:
+            return None
+        
+        error_count = sum(1 for data in rows if data.get('처리_상태') == 'API_ERROR')
+        previous['retry_errors'] = retry_errors
+        print(f"🔁 이어서 처리: {source}에서 이전 결과 {len(rows)}행을 불러왔습니다. 완료된 행은 건너뜁니다"
+              f" (API_ERROR 행 {error_count}개 {'재시도' if retry_errors else '유지'})")
+        return previous
+
+    def _match_completed(self, previous: Optional[Dict], rows: List, fingerprints: List[str]) -> Dict:
+        """
+        이번에 처리할 행 중 이전 실행에서 이미 완료된 행 찾기
+        
+        Args:
+            previous: _load_previous 결과
+            rows: [(행 번호, 입력값), ...]
+            fingerprints: 행 위치별 입력 지문
+            
+        Returns:
+            {행 위치: 출력 행 데이터}
+        """
+        completed = {}
+        if not previous:
+            return completed
+        
+        for position, ((idx, _), fp) in enumerate(zip(rows, fingerprints)):
+            if 'by_key' in previous:
+                data = previous['by_key'].get(self._row_key(idx, fp))
+            else:
+                matches = previous['by_fingerprint'].get(fp)
+                data = matches.pop(0) if matches else None
+            if data is not None:
+                completed[position] = data
+        
+        if previous['retry_errors']:
+            completed = {position: data for position, data in completed.items()
+                         if data.get('처리_상태') != 'API_ERROR'}
+        return completed
+
+    @classmethod
+    def carry_over_rows(cls, output_path: str, range_fingerprints: Counter, start_row: int):
+        """
+        기존 결과 엑셀에서 이번 처리 범위에 속하지 않는 행 찾기 (다른 범위로 다시 실행해도 이전 행을 잃지 않도록)
+
+        결과 엑셀에는 행 번호가 없으므로 이번 범위의 입력 지문 개수만큼 같은 지문의 행을 범위 안의 행으로 보고,
+        나머지 행은 기존 순서대로 이번 결과 앞/뒤에 붙입니다. 범위 안의 행이 기존 결과에 있었다면 그 위치를 기준으로,
+        없었다면 start_row가 0보다 크면 앞, 0이면 뒤에 붙입니다.
+
+        Args:
+            output_path: 결과 엑셀 경로
+            range_fingerprints: 이번 처리 범위 행들의 입력 지문 개수
+            start_row: 이번 처리 시작 행
+
+        Returns:
+            (이번 결과 앞에 붙일 행 리스트, 뒤에 붙일 행 리스트)
+        """
+        if not os.path.exists(output_path):
+            return [], []
+
+        remaining = Counter(range_fingerprints)
+        before, after = [], []
+        in_range_seen = False
+        for data in pd.read_excel(output_path).to_dict('records'):
+            fp = cls.input_fingerprint(data)
+            if remaining[fp] > 0:
+                remaining[fp] -= 1
+                in_range_seen = True
+            elif in_range_seen:
+                after.append(data)
+            else:
+                before.append(data)
+
+        if not in_range_seen and start_row == 0:
+            before, after = [], before
+        if before or after:
+            print(f"📎 기존 결과 파일의 범위 밖 행 {len(before) + len(after)}개를 유지합니다 ({output_path})")
+        return before, after
+
+    @staticmethod
+    def _row_key(idx, fingerprint: str) -> str:
+        """저널 행 키 (행 번호 + 입력 지문)"""
+        return f"{int(idx)}:{fingerprint}"
+
+    async def _process_rows_async(self, rows: List, concurrency: int, on_result, representative: List[int] = None,
+                                  pack_size: int = 1):
+        """
+        여러 행을 동시에 처리하되 결과는 입력 순서대로 on_result에 전달
+        
+        Args:
+            rows: [(행 번호, 입력값), ...]
+            concurrency: 동시 API 호출 수
+            on_result: 결과 콜백 (행 번호, 입력값, 결과)
+            representative: 행 위치별 대표 행 위치 (대표 행만 API 호출하고 결과를 공유)
+            pack_size: 한 요청에 묶을 제품 수 (1이면 제품마다 요청)
+        """
+        if representative is None:
+            representative = list(range(len(rows)))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def worker(positions):
+            items = [self._api_inputs(rows[position][1]) for position in positions]
+            async with semaphore:
+                if len(items) == 1:
+                    results = [await self.call_claude_api_async(**items[0])]
+                else:
+                    results = await self.call_claude_api_packed_async(items)
+            return zip(positions, results)
+        
+        # 대표 행을 입력 순서대로 pack_size개씩 묶음
+        targets = [position for position in range(len(rows)) if representative[position] == position]
+        tasks = [
+            asyncio.create_task(worker(targets[start:start + max(1, pack_size)]))
+            for start in range(0, len(targets), max(1, pack_size))
+        ]
+        
+        # 먼저 끝난 결과는 보관했다가 앞 행이 모두 끝나면 순서대로 기록
+        # (기록은 저널 쓰기/인덱서 큐 대기로 막힐 수 있으므로 이벤트 루프 밖의 기록 전용 스레드에서 실행,
+        #  기록이 밀려도 진행 중인 API 요청은 계속 처리됨)
+        loop = asyncio.get_running_loop()
+        finished = {}
+        next_position = 0
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            for task in asyncio.as_completed(tasks):
+                finished.update(await task)
+                while next_position < len(rows) and representative[next_position] in finished:
+                    idx, inputs = rows[next_position]
+                    await loop.run_in_executor(writer, on_result, idx, inputs, finished[representative[next_position]])
+                    next_position += 1
+
+    def _process_rows_batch(self, rows: List, representative: List[int], on_result,
+                            state_path: str, chunk_size: int = 1000, poll_interval: float = 30.0):
+        """
+        Message Batches API로 대표 행을 한꺼번에 처리하고 결과를 입력 순서대로 on_result에 전달
+        
+        Args:
+            rows: [(행 번호, 입력값), ...]
+            representative: 행 위치별 대표 행 위치
+            on_result: 결과 콜백 (행 번호, 입력값, 결과)
+            state_path: 배치 상태 파일 경로 (같은 경로로 다시 실행하면 이어서 처리)
+            chunk_size: 배치 하나에 넣을 요청 수
+            poll_interval: 배치 상태 확인 간격(초)
+        """
+        results = {}
+        requests = []
+        cache_keys = {}
+        custom_ids = {}
+        rules = {}
+        models = {}
+        usages = {}
+        
+        for position, (idx, inputs) in enumerate(rows):
+            if representative[position] != position:
+                continue
+            fields = self._api_inputs(inputs)
+            rule_result = self._rule_only_result(fields['규칙'], fields['제품설명'])
+            if rule_result is not None:
+                results[position] = rule_result
+                continue
+            prompt = self.build_prompt(**fields)
+            cache_key, cached_text = self._lookup_cache(prompt)
+            if cached_text is not None:
+                results[position] = self._apply_rules(self.parse_response(cached_text), fields['규칙'])
+                continue
+            
+            # 요청 내용이 바뀌면 이전 배치 결과를 재사용하지 않도록 custom_id에 파라미터 해시 포함
+            params = self._request_params(prompt)
+            params_hash = hashlib.sha1(json.dumps(params, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            custom_id = f"row-{idx}-{params_hash}"
+            custom_ids[position] = custom_id
+            cache_keys[custom_id] = cache_key
+            rules[custom_id] = fields['규칙']
+            models[custom_id] = params['model']
+            requests.append((custom_id, params))
+        
+        print(f"배치 모드: 캐시 적중 {len(results)}건, 배치 요청 {len(requests)}건")
+        
+        if requests:
+            # 배치 제출/폴링은 rate_limiter 재시도 루프를 거치지 않으므로 SDK 기본 재시도를 사용
+            backend = BatchBackend(self.client.with_options(max_retries=2), state_path, chunk_size=chunk_size, poll_interval=poll_interval)
+            texts = backend.run(requests)
+            
+            for position, custom_id in custom_ids.items():
+                text = texts.get(custom_id)
+                if text is None:
+                    results[position] = None
+                    continue
+                self._store_cache(cache_keys[custom_id], text)
+                results[position] = self._apply_rules(self.parse_response(text), rules[custom_id])
+                usages[position] = (models[custom_id], SimpleNamespace(**backend.usage(custom_id)))
+        
+        for position, (idx, inputs) in enumerate(rows):
+            if position in usages:
+                # 호출 지표는 행을 기록하기 직전에 남겨서 중단 후 이어서 처리할 때 같은 결과가 두 번 집계되지 않도록 함
+                model, usage = usages[position]
+                self._record_usage(usage, model)
+                self._record_call(model, usage, 0.0, 1, batch=True)
+            on_result(idx, inputs, results.get(representative[position]))
+
+    def _process_row_batch(self, rows: List, representative: List[int], record_result, counts: Dict,
+                           start_row: int, total_count: int, concurrency: int, pack_size: int, backend: str,
+                           output_path: str, temp_files: List[str], batch_chunk_size: int, batch_poll_interval: float):
+        """행 묶음 하나를 설정된 모드(배치/비동기/순차)로 처리하고 결과를 입력 행 순서대로 기록"""
+        def safe_record(idx, inputs, result):
+            """한 행 기록 중 오류가 나도 나머지 행은 계속 처리 (순차 모드와 같은 방식)"""
+            try:
+                record_result(idx, inputs, result)
+            except Exception as e:
+                print(f"❌ 행 처리 중 오류: {e}")
+                counts['error'] += 1
+        
+        if backend == "batch":
+            # 배치 상태 파일은 출력 파일 옆에 저장 (같은 output_path로 다시 실행하면 이어서 처리)
+            state_path = output_path.replace('.xlsx', '_batch_state.json')
+            self._process_rows_batch(rows, representative, safe_record, state_path,
+                                     chunk_size=batch_chunk_size, poll_interval=batch_poll_interval)
+            temp_files.append(state_path)  # 최종 저장 후 같이 삭제
+        elif concurrency > 1 or pack_size > 1:
+            asyncio.run(self._process_rows_async(rows, concurrency, safe_record, representative, pack_size))
+        else:
+            group_results = {}
+            for position, (idx, inputs) in enumerate(rows):
+                try:
+                    print(f"[{idx-start_row+1}/{total_count}] 처리 중: {inputs['브랜드']} - {inputs['제품명']}")
+                    
+                    if representative[position] in group_results:
+                        # 앞에서 처리한 동일 제품 결과 재사용
+                        result = group_results[representative[position]]
+                    else:
+                        # Claude API 호출 (호출 간격은 rate_limiter가 조절)
+                        result = self.call_claude_api(**self._api_inputs(inputs))
+                        group_results[position] = result
+                    record_result(idx, inputs, result)
+                    
+                except Exception as e:
+                    print(f"❌ 행 처리 중 오류: {e}")
+                    counts['error'] += 1
+                    continue
+
     def process_excel_file(self, 
                           excel_path: str, 
                           output_path: str = None,
                           start_row: int = 0,
                           end_row: int = None,
-                          save_interval: int = 10) -> pd.DataFrame:
+                          save_interval: int = 10,
+                          stream_queue=None,
+                          concurrency: int = 1,
+                          dedupe: bool = True,
+                          backend: str = "messages",
+                          batch_chunk_size: int = 1000,
+                          batch_poll_interval: float = 30.0,
+                          resume: bool = True,
+                          retry_errors: bool = True,
+                          pack_size: int = 1,
+                          write_output: bool = True,
+                          stream_chunk_size: int = None) -> pd.DataFrame:
         """
         엑셀 파일을 읽어서 Claude API로 처리
         
@@ -227,122 +1311,198 @@ class CosmeticDataGenerator:
             output_path: 출력 파일 경로 (None이면 자동 생성)
             start_row: 시작 행 (0부터 시작)
             end_row: 종료 행 (None이면 끝까지)
-            save_interval: 중간 저장 간격
+            save_interval: 저널 fsync 간격 (행 단위, 완료된 행은 매번 저널에 한 줄씩 기록)
+            stream_queue: 성공한 행을 (행 번호, 결과 딕셔너리)로 바로 넣을 큐 (증분 인덱싱용)
+            concurrency: 동시 API 호출 수 (1이면 기존처럼 한 행씩, 2 이상이면 AsyncAnthropic 비동기 모드)
+            dedupe: 입력값이 같은 행(용량/세트 차이 등)은 한 번만 API 호출하고 결과 공유
+            backend: "messages" (실시간 호출) 또는 "batch" (Message Batches API, 대량 오프라인 처리용)
+            batch_chunk_size: 배치 모드에서 배치 하나에 넣을 요청 수
+            batch_poll_interval: 배치 모드에서 상태 확인 간격(초)
+            resume: 같은 output_path의 저널(없으면 결과 엑셀)이 있으면 완료된 행은 건너뛰고 이어서 처리
+            retry_errors: 이어서 처리할 때 처리_상태가 API_ERROR인 행은 다시 처리
+            pack_size: 한 요청에 묶을 제품 수 (2 이상이면 묶음 요청, 파싱 실패한 제품만 단일 요청으로 재처리, messages 백엔드 전용)
+            write_output: False면 결과 엑셀을 쓰지 않고 저널을 남김 (샤드 실행에서 저널을 모아 한 번에 병합할 때 사용)
+            stream_chunk_size: 지정하면 시트 전체를 읽지 않고 이 행 수만큼씩 읽으면서 처리 (대용량 시트용, messages 백엔드 전용)
             
         Returns:
             처리된 데이터프레임
         """
-        # 엑셀 파일 읽기
-        print(f"엑셀 파일 읽는 중: {excel_path}")
-        df = pd.read_excel(excel_path)
+        # 엑셀 파일 읽기 (스트리밍 모드는 헤더만 읽고 행은 처리하면서 묶음 단위로 읽음)
+        stream = stream_chunk_size and backend != "batch"
+        if stream_chunk_size and backend == "batch":
+            print("⚠️ 배치 모드에서는 스트리밍 읽기를 사용하지 않습니다 (stream_chunk_size 무시)")
+        print(f"엑셀 파일 읽는 중: {excel_path}" + (f" (스트리밍, {stream_chunk_size}행 단위)" if stream else ""))
+        if stream:
+            reader = ExcelRowStream(excel_path)
+            columns = reader.columns
+        else:
+            df = pd.read_excel(excel_path)
+            columns = df.columns
         
         # 필수 컬럼 확인
         required_columns = ['제품명', '브랜드', '제품설명', '전성분']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in columns]
         
         if missing_columns:
             print(f"필수 컬럼이 없습니다: {missing_columns}")
-            print(f"현재 컬럼: {list(df.columns)}")
+            print(f"현재 컬럼: {list(columns)}")
+            if stream:
+                reader.close()
             return None
         
         # 처리할 범위 설정
-        if end_row is None:
-            end_row = len(df)
+        # (스트리밍 모드는 행 수를 미리 세지 않음: end_row는 그대로 쓰고 iter_batches가 시트 끝에서 멈추며,
+        #  end_row가 없으면 시트 크기 정보로 추정한 행 수는 진행 표시에만 쓰고 실제 행 수는 다 읽은 뒤 확정)
+        estimated = stream and end_row is None
+        if stream:
+            sheet_rows = reader.estimated_rows
+            range_end = end_row if end_row is not None else (sheet_rows or 0)
+        else:
+            sheet_rows = len(df)
+            end_row = sheet_rows if end_row is None else min(end_row, sheet_rows)
+            range_end = end_row
         
-        df_subset = df.iloc[start_row:end_row].copy()
-        print(f"처리할 데이터: {len(df_subset)}개 ({start_row}행부터 {end_row-1}행까지)")
+        total_count = max(0, range_end - start_row)
+        if estimated:
+            print(f"처리할 데이터: 약 {total_count}개 ({start_row}행부터 시트 끝까지, 시트 크기 정보 기준 추정)")
+        else:
+            print(f"처리할 데이터: {total_count}개 ({start_row}행부터 {range_end-1}행까지)")
         
         # 출력 파일 경로 설정
         if output_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"cosmetic_data_processed_{timestamp}.xlsx"
         
-        # 결과 저장용 리스트
-        results = []
+        # 진행 상황 추적
+        counts = {'success': 0, 'error': 0, 'skipped': 0}
         
-        # temp 파일 추적용 리스트
-        temp_files = []
+        def row_batches():
+            """처리할 행을 [(행 번호, 입력값), ...] 묶음으로 반환 (일반 모드는 범위 전체가 한 묶음)"""
+            if stream:
+                batches = reader.iter_batches(start_row, end_row, stream_chunk_size)
+            else:
+                batches = [list(df.iloc[start_row:end_row].iterrows())]
+            for batch in batches:
+                rows = []
+                for idx, row in batch:
+                    try:
+                        rows.append((idx, self._read_row_inputs(row, columns)))
+                    except Exception as e:
+                        print(f"❌ 행 처리 중 오류: {e}")
+                        counts['error'] += 1
+                yield rows
         
-        # 진행 상황 추적
-        total_count = len(df_subset)
-        success_count = 0
-        error_count = 0
+        # 완료된 행은 JSONL 저널에 한 줄씩 추가 (최종 엑셀은 마지막에 저널에서 한 번만 생성)
+        journal_path = output_path.replace('.xlsx', '.journal.jsonl')
+        journal_exists = os.path.exists(journal_path)
+        previous = self._load_previous(journal_path, output_path, retry_errors) if resume else None
+        resumed_journal = resume and journal_exists
+        prior_calls = []
+        if resumed_journal:
+            # 중단된 실행의 호출 지표도 비용/지연 시간 요약에 포함
+            prior_calls = [record for record in RunJournal.read(journal_path) if record.get('type') == 'call']
+            self.telemetry.calls.extend(prior_calls)
+        journal = RunJournal(journal_path, fsync_interval=save_interval, mode='a' if resumed_journal else 'w')
+        # 호출 지표는 저널과 별도로 삭제하지 않는 파일에도 누적 (실행이 끝나 저널이 지워져도 남김)
+        calls_path = output_path.replace('.xlsx', '.calls.jsonl')
+        calls_log = RunJournal(calls_path, fsync_interval=save_interval, mode='a')
+        row_keys = {}
+        range_fingerprints = Counter()  # 기존 결과 엑셀에서 범위 밖 행을 가려낼 때 사용
+        
+        # 최종 저장 후 삭제할 파일 목록
+        temp_files = [journal_path]
+        
+        def record_result(idx, inputs, result):
+            """결과 한 행 기록 (항상 입력 행 순서대로 호출됨)"""
+            output_row = self._build_output_row(inputs, result)
+            journal.append({'type': 'row', 'row': int(idx), 'key': row_keys.pop(idx), 'data': output_row})
+            
+            # 비동기 모드에서는 "처리 중" 출력이 없으므로 행 정보를 같이 표시
+            label = f" [{idx-start_row+1}/{total_count}] {inputs['브랜드']} - {inputs['제품명']}" if concurrency > 1 or pack_size > 1 or backend == "batch" else ""
+            
+            if result:
+                counts['success'] += 1
+                print(f"✅ 성공{label} - 제품유형: {result.get('제품유형', 'N/A')}")
+                
+                # 스트리밍 모드: 엑셀 저장을 기다리지 않고 바로 인덱서로 전달
+                if stream_queue is not None:
+                    stream_queue.put((idx, output_row))
+            else:
+                counts['error'] += 1
+                print(f"❌ 실패{label}")
         
+        started_at = time.time()
         print(f"\n처리 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"💾 작업 저널: {journal_path} (호출 지표: {calls_path})")
+        if backend == "batch":
+            print("배치 모드: Message Batches API")
+            if pack_size > 1:
+                print("⚠️ 배치 모드에서는 묶음 요청을 사용하지 않습니다 (pack_size 무시)")
+        elif concurrency > 1 or pack_size > 1:
+            print(f"비동기 모드: 동시 호출 {concurrency}개" + (f", 요청당 제품 {pack_size}개" if pack_size > 1 else ""))
         print("=" * 50)
         
-        for idx, row in df_subset.iterrows():
-            try:
-                제품명 = str(row['제품명']).strip()
-                브랜드 = str(row['브랜드']).strip()
-                제품설명 = str(row['제품설명']).strip()
-                전성분 = str(row['전성분']).strip()
-                
-                # 가격 정보가 있는지 확인 (없으면 None)
-                if '가격' in df.columns and pd.notna(row.get('가격')):
-                    가격 = row['가격']
-                else:
-                    가격 = None
-                
-                print(f"[{idx-start_row+1}/{total_count}] 처리 중: {브랜드} - {제품명}")
-                
-                # Claude API 호출
-                result = self.call_claude_api(제품명, 브랜드, 제품설명, 전성분)
-                
-                if result:
-                    # 원본 데이터와 결합 (순서: 브랜드, 제품명, 제품설명, 전성분, 임베딩_텍스트, 제품유형, 피부타입, 관련_피부질환, 가격)
-                    combined_data = {
-                        '브랜드': 브랜드,
-                        '제품명': 제품명,
-                        '제품설명': 제품설명,
-                        '전성분': 전성분,
-                        '임베딩_텍스트': result.get('원본_응답', ''),
-                        '제품유형': result.get('제품유형'),
-                        '피부타입': result.get('피부타입'),
-                        '관련_피부질환': result.get('관련_피부질환'),
-                        '가격': 가격
-                    }
-                    results.append(combined_data)
-                    success_count += 1
-                    print(f"✅ 성공 - 제품유형: {result.get('제품유형', 'N/A')}")
-                else:
-                    # 실패한 경우에도 원본 데이터는 보존
-                    error_data = {
-                        '브랜드': 브랜드,
-                        '제품명': 제품명,
-                        '제품설명': 제품설명,
-                        '전성분': 전성분,
-                        '임베딩_텍스트': None,
-                        '제품유형': None,
-                        '피부타입': None,
-                        '관련_피부질환': None,
-                        '가격': 가격,
-                        '처리_상태': 'API_ERROR'
-                    }
-                    results.append(error_data)
-                    error_count += 1
-                    print("❌ 실패")
-                
-                # 중간 저장
-                if (idx - start_row + 1) % save_interval == 0:
-                    temp_df = pd.DataFrame(results)
-                    temp_output = output_path.replace('.xlsx', f'_temp_{idx-start_row+1}.xlsx')
-                    temp_df.to_excel(temp_output, index=False)
-                    temp_files.append(temp_output)  # temp 파일 목록에 추가
-                    print(f"💾 중간 저장: {temp_output}")
+        def record_call(record):
+            """호출별 지표를 저널(이어서 처리용)과 호출 지표 파일에 기록"""
+            journal.append(record)
+            calls_log.append(record)
+        
+        self.call_listener = record_call
+        try:
+            for rows in row_batches():
+                fingerprints = [self.input_fingerprint(inputs) for _, inputs in rows]
+                range_fingerprints.update(fingerprints)
+                row_keys.update((idx, self._row_key(idx, fp)) for (idx, _), fp in zip(rows, fingerprints))
                 
-                # API 호출 간격 (Rate Limit 방지)
-                time.sleep(1)
+                # 이미 완료된 행은 제외 (결과 엑셀에서 복원한 행은 새 저널에 옮겨 적기)
+                completed = self._match_completed(previous, rows, fingerprints)
+                for position, data in sorted(completed.items()):
+                    idx = rows[position][0]
+                    key = row_keys.pop(idx)
+                    if not journal_exists:
+                        journal.append({'type': 'row', 'row': int(idx), 'key': key, 'data': data})
+                if completed:
+                    counts['skipped'] += len(completed)
+                    rows = [row for position, row in enumerate(rows) if position not in completed]
+                    fingerprints = [fp for position, fp in enumerate(fingerprints) if position not in completed]
                 
-            except Exception as e:
-                print(f"❌ 행 처리 중 오류: {e}")
-                error_count += 1
-                continue
+                # 중복 행은 대표 행 결과를 그대로 사용 (스트리밍 모드에서는 묶음 안에서만, 묶음 간 중복은 응답 캐시가 처리)
+                representative = self._group_duplicates(fingerprints) if dedupe else list(range(len(rows)))
+                self._process_row_batch(rows, representative, record_result, counts, start_row, total_count,
+                                        concurrency, pack_size, backend, output_path, temp_files,
+                                        batch_chunk_size, batch_poll_interval)
+        finally:
+            # 중단되어도 저널에 기록된 행은 디스크에 남김
+            self.call_listener = None
+            journal.close()
+            calls_log.close()
+            if stream:
+                reader.close()
+        
+        if stream:
+            # 실제로 읽은 마지막 행까지로 범위 확정 (시트 끝까지 읽었으면 시트 행 수도 확정)
+            read_end = reader.last_row + 1 if reader.last_row is not None else start_row
+            if end_row is None:
+                sheet_rows = read_end
+            else:
+                sheet_rows = max(sheet_rows or 0, read_end)
+            total_count = max(0, read_end - start_row)
         
-        # 최종 결과 저장
+        elapsed = time.time() - started_at
+        success_count = counts['success']
+        error_count = counts['error']
+        
+        # 최종 결과 저장 (저널에서 한 번만 엑셀 생성)
+        results = [record['data'] for record in RunJournal.read_rows(journal_path)]
         if results:
-            final_df = pd.DataFrame(results)
-            final_df.to_excel(output_path, index=False)
+            if write_output:
+                # 다른 범위로 실행한 기존 결과 행은 덮어쓰지 않고 유지
+                before, after = self.carry_over_rows(output_path, range_fingerprints, start_row)
+                final_df = pd.DataFrame(before + results + after)
+                final_df.to_excel(output_path, index=False)
+            else:
+                final_df = pd.DataFrame(results)
+                temp_files = []  # 저널은 병합할 때까지 보관
             
             # temp 파일들 삭제
             deleted_count = 0
@@ -352,24 +1512,112 @@ class CosmeticDataGenerator:
                         os.remove(temp_file)
                         deleted_count += 1
                 except Exception as e:
-                    print(f"⚠️ temp 파일 삭제 실패: {temp_file} - {e}")
+                    print(f"⚠️ 임시 파일 삭제 실패: {temp_file} - {e}")
             
             if deleted_count > 0:
-                print(f"🗑️ temp 파일 {deleted_count}개 삭제 완료")
+                print(f"🗑️ 저널/임시 파일 {deleted_count}개 삭제 완료")
             
             print("\n" + "=" * 50)
             print(f"처리 완료: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            processed_count = total_count - counts['skipped']
             print(f"총 처리: {total_count}개")
+            if counts['skipped']:
+                print(f"건너뜀 (이전 실행에서 완료): {counts['skipped']}개")
             print(f"성공: {success_count}개")
             print(f"실패: {error_count}개")
-            print(f"성공률: {success_count/total_count*100:.1f}%")
-            print(f"결과 파일: {output_path}")
+            if processed_count > 0:
+                print(f"성공률: {success_count/processed_count*100:.1f}%")
+            print(f"소요 시간: {elapsed:.1f}초 (처리량: {processed_count/max(elapsed, 1e-9)*60:.1f}개/분)")
+            print(self.rate_limiter.summary())
+            print(self.usage_summary())
+            if self.telemetry.calls:
+                # 이어서 처리한 경우 비용은 중단 전 호출까지 합친 값이므로 행당 비용도 저널의 완료 행 전체 기준
+                rows_done = processed_count + counts['skipped'] if resumed_journal else processed_count
+                if prior_calls:
+                    print(f"(중단 전 실행의 호출 {len(prior_calls)}회 포함)")
+                print(self.telemetry.summary(rows_done, sheet_rows - len(results), elapsed))
+            if pack_size > 1 and backend != "batch":
+                print(self.pack_summary())
+            if self.input_preprocessor is not None:
+                print(self.input_preprocessor.summary())
+            if self.rule_engine is not None:
+                print(self.rule_summary())
+            if len(self.model_tiers) > 1:
+                print(self.tier_summary())
+            if self.response_cache is not None:
+                print(self.response_cache.summary())
+            print(f"결과 파일: {output_path if write_output else journal_path}")
             
             return final_df
         else:
             print("처리된 결과가 없습니다.")
             return None
 
+    def compare_pack_sizes(self, excel_path: str, pack_sizes=(1, 4, 8), sample_size: int = 20) -> pd.DataFrame:
+        """
+        묶음 크기별 처리량/토큰/정확도 비교 (응답 캐시를 끄고 실제 API를 호출하므로 비용 발생)
+        
+        정확도는 묶지 않은 요청(pack_size=1) 결과와 제품유형/피부타입/관련_피부질환이 일치하는 비율입니다.
+        
+        Args:
+            excel_path: 입력 엑셀 파일 경로
+            pack_sizes: 비교할 묶음 크기 목록 (1이 없으면 기준값으로 추가)
+            sample_size: 비교에 사용할 앞쪽 행 수
+            
+        Returns:
+            묶음 크기별 비교 결과 데이터프레임
+        """
+        df = pd.read_excel(excel_path).head(sample_size)
+        items = [self._api_inputs(self._read_row_inputs(row, df.columns)) for _, row in df.iterrows()]
+        pack_sizes = sorted(set(pack_sizes) | {1})
+        
+        def same(a, b):
+            if isinstance(a, list) and isinstance(b, list):
+                return sorted(a) == sorted(b)
+            return a == b
+        
+        saved_cache = self.response_cache
+        self.response_cache = None
+        reports = []
+        baseline = None
+        try:
+            for pack_size in pack_sizes:
+                usage_before = dict(self.usage_totals)
+                fallbacks_before = self.pack_stats['fallbacks']
+                started_at = time.time()
+                
+                if pack_size == 1:
+                    results = [self.call_claude_api(**fields) for fields in items]
+                else:
+                    results = []
+                    for start in range(0, len(items), pack_size):
+                        results.extend(self.call_claude_api_packed(items[start:start + pack_size]))
+                
+                elapsed = time.time() - started_at
+                if baseline is None:
+                    baseline = results
+                
+                report = {
+                    'pack_size': pack_size,
+                    '소요_시간(초)': round(elapsed, 1),
+                    '처리량(개/분)': round(len(items) / max(elapsed, 1e-9) * 60, 1),
+                    '입력_토큰': sum(self.usage_totals[key] - usage_before[key] for key in
+                                  ('input_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')),
+                    '출력_토큰': self.usage_totals['output_tokens'] - usage_before['output_tokens'],
+                    '폴백': self.pack_stats['fallbacks'] - fallbacks_before,
+                    '실패': sum(1 for result in results if result is None)
+                }
+                for field in ('제품유형', '피부타입', '관련_피부질환'):
+                    pairs = [(a, b) for a, b in zip(baseline, results) if a and b]
+                    matched = sum(1 for a, b in pairs if same(a.get(field), b.get(field)))
+                    report[f'{field}_일치율(%)'] = round(matched / len(pairs) * 100, 1) if pairs else None
+                reports.append(report)
+                print(f"pack_size={pack_size}: {report}")
+        finally:
+            self.response_cache = saved_cache
+        
+        return pd.DataFrame(reports)
+
 def main():
     """
     메인 실행 함수
@@ -386,25 +1634,40 @@ def main():
     # 엑셀 파일 경로 설정
     excel_path = "화장품데이터.xlsx"  # 여기에 엑셀 파일 경로 입력
     
+    # 결과 파일 경로 (같은 경로로 다시 실행하면 완료된 행은 건너뛰고 이어서 처리)
+    output_path = "cosmetic_data_processed.xlsx"
+    
     # 처리 범위 설정
     start_row = 0      # 시작 행 (0부터 시작)
     end_row = 200      # 종료 행 (None이면 전체, 숫자 입력하면 해당 행까지)
+    concurrency = 1    # 동시 API 호출 수 (1이면 순차 처리)
+    pack_size = 1      # 한 요청에 묶을 제품 수 (1이면 제품마다 요청)
+    use_cache = True   # 응답 캐시 사용 (False면 캐시된 행도 다시 API 호출)
+    fast_model = None  # 먼저 시도할 빠른 모델 (예: "claude-3-5-haiku-20241022", None이면 기본 모델만 사용)
+    structured_output = False  # True면 도구(JSON 스키마) 호출로 주요 효능/케어 증상/핵심 성분/설명까지 컬럼으로 저장
+    stream_chunk_size = None   # 대용량 시트는 행 수 지정 (예: 500): 시트 전체를 읽지 않고 이만큼씩 읽으면서 처리
     # ==========================================
     
     if not os.path.exists(excel_path):
         print(f"파일이 존재하지 않습니다: {excel_path}")
         return
     
-    # 데이터 생성기 초기화
-    generator = CosmeticDataGenerator(api_key)
+    # 데이터 생성기 초기화 (계정의 Rate Limit에 맞게 설정)
+    rate_limiter = RateLimiter(requests_per_minute=50, tokens_per_minute=30000)
+    generator = CosmeticDataGenerator(api_key, rate_limiter=rate_limiter, use_cache=use_cache, fast_model=fast_model,
+                                      structured_output=structured_output)
     
     # 처리 실행
     try:
         result_df = generator.process_excel_file(
             excel_path=excel_path,
+            output_path=output_path,
             start_row=start_row,
             end_row=end_row,
-            save_interval=10
+            save_interval=10,  # 저널 fsync 간격
+            concurrency=concurrency,
+            pack_size=pack_size,
+            stream_chunk_size=stream_chunk_size
         )
         
         if result_df is not None:
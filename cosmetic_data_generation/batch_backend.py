@@ -0,0 +1,151 @@
+"""
+Anthropic Message Batches API 백엔드
+
+대량 오프라인 처리용: 요청을 청크 단위 배치로 제출하고, 완료될 때까지 폴링한 뒤
+custom_id로 결과를 다시 행에 매핑합니다.
+
+제출한 배치 ID와 받아온 결과는 상태 파일(JSON)에 저장하므로,
+중간에 중단되어도 같은 상태 파일로 다시 실행하면 이미 제출한 요청은 재제출하지 않고
+기존 배치의 결과만 이어서 받아옵니다. 실패/취소/만료된 요청은 결과에 남기지 않으므로
+다음 실행에서 다시 제출됩니다.
+
+Anthropic 클라이언트의 base_url을 배치 엔드포인트를 흉내 내는 로컬 HTTP 서버
+(batch_stub_server.py)로 바꾸면 실제 API 없이 테스트할 수 있습니다.
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from telemetry import TOKEN_KEYS
+
+
+def message_text(message) -> str:
+    """
+    응답 메시지의 결과 텍스트 (도구 호출 응답이면 도구 입력을 JSON 문자열로)
+    """
+    for block in message.content:
+        if getattr(block, 'type', None) == 'tool_use':
+            return json.dumps(block.input, ensure_ascii=False)
+    return message.content[0].text
+
+
+class BatchBackend:
+    def __init__(self, client, state_path: str, chunk_size: int = 1000, poll_interval: float = 30.0):
+        """
+        Args:
+            client: Anthropic 클라이언트 (client.messages.batches 사용)
+            state_path: 배치 진행 상태 저장 파일 경로 (재시작 시 이어서 처리)
+            chunk_size: 배치 하나에 넣을 요청 수 (API 최대 100,000)
+            poll_interval: 배치 상태 확인 간격(초)
+        """
+        self.client = client
+        self.state_path = state_path
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            state.setdefault('usage', {})
+            # 이전 형식에서 실패로 저장된 결과(None)는 지우고 다시 제출되도록 배치 목록에서도 뺌
+            failed = {custom_id for custom_id, text in state['results'].items() if text is None}
+            if failed:
+                state['results'] = {custom_id: text for custom_id, text in state['results'].items() if text is not None}
+                for batch in state['batches']:
+                    batch['custom_ids'] = [custom_id for custom_id in batch['custom_ids'] if custom_id not in failed]
+            print(f"배치 상태 파일 불러옴: {self.state_path} (배치 {len(state['batches'])}개, 결과 {len(state['results'])}개)")
+            return state
+        return {'batches': [], 'results': {}, 'usage': {}}
+
+    def _save_state(self):
+        # 중간에 중단되어도 상태 파일이 깨지지 않도록 임시 파일에 쓰고 교체
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def submit(self, requests: List[Tuple[str, Dict]]):
+        """
+        아직 제출되지 않은 요청만 chunk_size 단위 배치로 제출
+
+        Args:
+            requests: [(custom_id, messages.create 파라미터), ...]
+        """
+        submitted = {custom_id for batch in self.state['batches'] for custom_id in batch['custom_ids']}
+        pending = [(custom_id, params) for custom_id, params in requests
+                   if custom_id not in submitted and custom_id not in self.state['results']]
+
+        if not pending:
+            return
+
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            batch = self.client.messages.batches.create(
+                requests=[{'custom_id': custom_id, 'params': params} for custom_id, params in chunk]
+            )
+            self.state['batches'].append({
+                'id': batch.id,
+                'custom_ids': [custom_id for custom_id, _ in chunk],
+                'collected': False
+            })
+            self._save_state()
+            print(f"📦 배치 제출: {batch.id} ({len(chunk)}건)")
+
+    def wait_and_collect(self) -> Dict[str, str]:
+        """
+        제출한 배치가 모두 끝날 때까지 폴링하고 결과 수집
+
+        Returns:
+            {custom_id: 응답 텍스트} (실패/만료/취소된 요청은 빠짐)
+        """
+        while True:
+            remaining = [batch for batch in self.state['batches'] if not batch['collected']]
+            if not remaining:
+                break
+
+            for batch in remaining:
+                info = self.client.messages.batches.retrieve(batch['id'])
+                if info.processing_status != 'ended':
+                    counts = info.request_counts
+                    print(f"⏳ 배치 진행 중: {batch['id']} "
+                          f"(처리 중 {counts.processing}, 성공 {counts.succeeded}, 실패 {counts.errored})")
+                    continue
+
+                self._collect(batch)
+                batch['collected'] = True
+                self._save_state()
+
+            if any(not batch['collected'] for batch in self.state['batches']):
+                time.sleep(self.poll_interval)
+
+        return self.state['results']
+
+    def _collect(self, batch: Dict):
+        """끝난 배치의 성공 결과와 토큰 사용량을 custom_id별로 저장"""
+        succeeded = 0
+        failed = set()
+        for entry in self.client.messages.batches.results(batch['id']):
+            if entry.result.type == 'succeeded':
+                message = entry.result.message
+                self.state['results'][entry.custom_id] = message_text(message)
+                self.state['usage'][entry.custom_id] = {key: getattr(message.usage, key, None) or 0
+                                                        for key in TOKEN_KEYS}
+                succeeded += 1
+            else:
+                # errored / canceled / expired: 결과를 남기지 않고 배치 목록에서도 빼서 다음 실행에서 다시 제출
+                failed.add(entry.custom_id)
+        batch['custom_ids'] = [custom_id for custom_id in batch['custom_ids'] if custom_id not in failed]
+        print(f"✅ 배치 완료: {batch['id']} (성공 {succeeded}건, 실패 {len(failed)}건)")
+
+    def usage(self, custom_id: str) -> Optional[Dict]:
+        """성공한 요청의 토큰 사용량 ({input_tokens, output_tokens, ...}, 없으면 None)"""
+        return self.state['usage'].get(custom_id)
+
+    def run(self, requests: List[Tuple[str, Dict]]) -> Dict[str, str]:
+        """제출 → 폴링 → 결과 수집을 한 번에 실행"""
+        self.submit(requests)
+        return self.wait_and_collect()
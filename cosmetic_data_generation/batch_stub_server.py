@@ -0,0 +1,210 @@
+"""
+Message Batches API 로컬 대역 서버
+
+배치 백엔드(batch_backend.py)를 실제 API 없이 확인하기 위한 작은 HTTP 서버입니다.
+배치 생성(POST /v1/messages/batches), 상태 조회(GET .../{batch_id}),
+결과 JSONL(GET .../{batch_id}/results) 세 엔드포인트만 흉내 내며,
+CosmeticDataGenerator(base_url=서버 주소, backend="batch")로 연결해서 사용합니다.
+
+- 모든 요청은 같은 응답 텍스트(또는 도구 호출 입력)로 성공 처리
+- fail_custom_ids에 넣은 custom_id는 errored 결과로 돌려줌 (실패 요청 재제출 확인용)
+- 배치는 polls_until_end번 조회된 뒤에 ended 상태가 됨 (폴링 확인용)
+"""
+
+import json
+import threading
+import itertools
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional
+
+
+# 기본 응답 (프롬프트의 출력 형식과 같은 텍스트)
+DEFAULT_RESPONSE_TEXT = (
+    "[제품유형: 크림]\n"
+    "[피부타입: 건성, 민감성]\n"
+    "[관련 피부질환: 아토피]\n"
+    "[주요 효능: 보습, 진정]\n"
+    "[케어 증상: 건조함, 당김]\n"
+    "[핵심 성분: 세라마이드, 판테놀]\n"
+    "\n"
+    "세라마이드와 판테놀이 피부 장벽을 보호하고 건조한 피부에 보습을 주는 크림입니다."
+)
+
+BATCHES_PATH = '/v1/messages/batches'
+
+
+class BatchStubServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, response_text: str = DEFAULT_RESPONSE_TEXT,
+                 tool_input: Optional[Dict] = None, fail_custom_ids: Iterable[str] = (),
+                 polls_until_end: int = 1, usage: Optional[Dict] = None):
+        """
+        Args:
+            host: 바인딩할 주소
+            port: 포트 (0이면 빈 포트 자동 선택)
+            response_text: 성공 결과의 응답 텍스트
+            tool_input: 도구 호출(구조화 출력) 요청에 돌려줄 도구 입력 (None이면 빈 딕셔너리)
+            fail_custom_ids: errored 결과로 돌려줄 custom_id 목록
+            polls_until_end: 배치가 ended 상태가 되기 전까지의 조회 횟수
+            usage: 성공 결과에 넣을 토큰 사용량
+        """
+        self.response_text = response_text
+        self.tool_input = tool_input or {}
+        self.fail_custom_ids = set(fail_custom_ids)
+        self.polls_until_end = polls_until_end
+        self.usage = usage or {'input_tokens': 1000, 'output_tokens': 300,
+                               'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        self.batches: Dict[str, Dict] = {}
+        self.submitted_custom_ids = []  # 제출된 custom_id 순서 (재제출 확인용)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """백그라운드 스레드에서 서버 시작 후 base_url 반환"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """현재 스레드에서 서버 실행 (Ctrl+C로 종료)"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _create(self, body: Dict) -> Dict:
+        with self._lock:
+            batch_id = f"msgbatch_stub_{next(self._ids):04d}"
+            self.batches[batch_id] = {'requests': body['requests'], 'polls': 0,
+                                      'created_at': datetime.now(timezone.utc)}
+            self.submitted_custom_ids.extend(request['custom_id'] for request in body['requests'])
+        return self._info(batch_id, count_poll=False)
+
+    def _info(self, batch_id: str, count_poll: bool = True) -> Dict:
+        with self._lock:
+            batch = self.batches[batch_id]
+            if count_poll:
+                batch['polls'] += 1
+            ended = batch['polls'] >= self.polls_until_end
+        total = len(batch['requests'])
+        failed = sum(1 for request in batch['requests'] if request['custom_id'] in self.fail_custom_ids)
+        created_at = batch['created_at']
+        return {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {
+                'processing': 0 if ended else total,
+                'succeeded': total - failed if ended else 0,
+                'errored': failed if ended else 0,
+                'canceled': 0,
+                'expired': 0,
+            },
+            'created_at': created_at.isoformat(),
+            'expires_at': (created_at + timedelta(days=1)).isoformat(),
+            'ended_at': datetime.now(timezone.utc).isoformat() if ended else None,
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'results_url': f"{self.base_url}{BATCHES_PATH}/{batch_id}/results" if ended else None,
+        }
+
+    def _result(self, request: Dict) -> Dict:
+        """요청 하나의 결과 (JSONL 한 줄)"""
+        custom_id = request['custom_id']
+        if custom_id in self.fail_custom_ids:
+            result = {'type': 'errored',
+                      'error': {'type': 'error', 'error': {'type': 'api_error', 'message': 'stub failure'}}}
+        else:
+            params = request['params']
+            if params.get('tool_choice'):
+                content = [{'type': 'tool_use', 'id': f"toolu_{custom_id}",
+                            'name': params['tool_choice']['name'], 'input': self.tool_input}]
+            else:
+                content = [{'type': 'text', 'text': self.response_text}]
+            result = {'type': 'succeeded',
+                      'message': {'id': f"msg_{custom_id}", 'type': 'message', 'role': 'assistant',
+                                  'model': params.get('model', ''), 'content': content,
+                                  'stop_reason': 'tool_use' if params.get('tool_choice') else 'end_turn',
+                                  'stop_sequence': None, 'usage': self.usage}}
+        return {'custom_id': custom_id, 'result': result}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+                self.send_response(status)
+                self.send_header('content-type', content_type)
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, obj: Dict, status: int = 200):
+                self._send(status, json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+            def _not_found(self):
+                self._send_json({'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}}, 404)
+
+            def do_POST(self):
+                if self.path.split('?')[0].rstrip('/') != BATCHES_PATH:
+                    return self._not_found()
+                body = json.loads(self.rfile.read(int(self.headers['content-length'])))
+                self._send_json(stub._create(body))
+
+            def do_GET(self):
+                path = self.path.split('?')[0].rstrip('/')
+                if not path.startswith(BATCHES_PATH + '/'):
+                    return self._not_found()
+                parts = path[len(BATCHES_PATH) + 1:].split('/')
+                batch_id = parts[0]
+                if batch_id not in stub.batches or len(parts) > 2 or (len(parts) == 2 and parts[1] != 'results'):
+                    return self._not_found()
+                if len(parts) == 1:
+                    return self._send_json(stub._info(batch_id))
+                lines = [json.dumps(stub._result(request), ensure_ascii=False)
+                         for request in stub.batches[batch_id]['requests']]
+                self._send(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'application/binary')
+
+        return Handler
+
+
+def main():
+    """
+    메인 실행 함수 (서버를 띄워 두고 base_url로 연결해서 사용)
+    """
+    # ============ 여기에 설정값 입력 ============
+    host = '127.0.0.1'
+    port = 8765
+    polls_until_end = 2     # 배치가 끝나기 전까지의 조회 횟수
+    # ==========================================
+
+    server = BatchStubServer(host=host, port=port, polls_until_end=polls_until_end)
+    print(f"배치 대역 서버 실행 중: {server.base_url} (Ctrl+C로 종료)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
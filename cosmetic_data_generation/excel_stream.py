@@ -0,0 +1,92 @@
+"""
+대용량 엑셀 입력을 행 묶음 단위로 읽는 스트리밍 리더
+
+pd.read_excel은 시트 전체를 메모리에 올린 뒤에야 반환하므로 큰 공급사 시트에서는
+첫 API 호출까지 몇 분이 걸립니다. openpyxl 읽기 전용 모드로 필요한 행만 순서대로 읽어
+batch_size개씩 넘기므로 첫 요청은 바로 나가고 메모리 사용량은 시트 크기와 관계없이 일정합니다.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+
+
+class ExcelRowStream:
+    def __init__(self, path: str, sheet_name: str = None):
+        """
+        Args:
+            path: 엑셀 파일 경로 (.xlsx)
+            sheet_name: 읽을 시트 이름 (None이면 첫 번째 시트, pd.read_excel 기본값과 동일)
+        """
+        self.path = path
+        self._workbook = load_workbook(path, read_only=True, data_only=True)
+        self._sheet = self._workbook[sheet_name] if sheet_name else self._workbook.worksheets[0]
+        header = next(self._sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        self.columns = [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(header)]
+        self._total_rows = None
+        self.last_row = None  # iter_batches로 읽은 마지막 값 있는 행 번호 (읽기 전이면 None)
+
+    @property
+    def estimated_rows(self) -> Optional[int]:
+        """
+        시트 크기 정보(max_row)로 추정한 데이터 행 수 (행을 읽지 않음, 크기 정보가 없으면 None)
+
+        서식만 있는 빈 행까지 세므로 실제보다 클 수 있어 진행 표시용으로만 씁니다.
+        실제 행 수는 iter_batches로 끝까지 읽은 뒤 last_row로 확인합니다.
+        """
+        max_row = self._sheet.max_row
+        return max(0, max_row - 1) if max_row is not None else None
+
+    @property
+    def total_rows(self) -> int:
+        """
+        헤더를 제외한 데이터 행 수 (마지막으로 값이 있는 행까지, pd.read_excel의 행 수와 같음)
+
+        시트 전체를 한 번 훑으므로(행을 보관하지 않아 메모리 사용량은 일정) 처리 전에는 쓰지 않고,
+        시트 크기 정보가 없어 estimated_rows가 None일 때만 대신 사용합니다.
+        """
+        if self._total_rows is None:
+            last_row = 1
+            for row_number, values in enumerate(self._sheet.iter_rows(min_row=2, values_only=True), start=2):
+                if any(value is not None for value in values):
+                    last_row = row_number
+            self._total_rows = last_row - 1
+        return self._total_rows
+
+    def iter_batches(self, start_row: int = 0, end_row: Optional[int] = None,
+                     batch_size: int = 500) -> Iterator[List[Tuple[int, Dict]]]:
+        """
+        [start_row, end_row) 범위의 행을 batch_size개씩 반환
+
+        행 번호는 pd.read_excel의 인덱스와 같은 0부터 시작하는 데이터 행 번호이고,
+        빈 셀은 NaN으로 채우며 모든 셀이 빈 행은 건너뜁니다.
+        end_row가 시트보다 크거나 None이면 시트 끝에서 멈춥니다.
+
+        Yields:
+            [(행 번호, {컬럼명: 값}), ...]
+        """
+        batch_size = max(1, batch_size)
+        max_row = end_row + 1 if end_row is not None else None  # 시트 행 번호는 헤더가 1행
+        batch = []
+        for idx, values in enumerate(self._sheet.iter_rows(min_row=start_row + 2, max_row=max_row, values_only=True),
+                                     start=start_row):
+            if all(value is None for value in values):
+                continue
+            row = {column: float('nan') for column in self.columns}
+            row.update((column, value) for column, value in zip(self.columns, values) if value is not None)
+            batch.append((idx, row))
+            self.last_row = idx
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        self._workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,86 @@
+"""
+추가 전용(append-only) JSONL 작업 저널
+
+처리가 끝난 행을 한 줄씩 기록합니다. 매 줄마다 flush하고 일정 간격으로 fsync하므로
+중간에 프로세스가 죽어도 잃는 것은 마지막 몇 줄뿐이고, 체크포인트 비용은 행 수와 관계없이 일정합니다.
+최종 엑셀은 작업이 끝난 뒤 저널에서 한 번만 만듭니다.
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Iterator, List
+
+
+def _json_default(value):
+    """numpy/pandas 스칼라 등 JSON 기본 타입이 아닌 값 변환"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class RunJournal:
+    def __init__(self, path: str, fsync_interval: int = 10, mode: str = 'a'):
+        """
+        Args:
+            path: 저널 파일 경로 (.jsonl)
+            fsync_interval: 몇 줄마다 디스크에 fsync할지
+            mode: 'a'면 기존 저널에 이어 쓰기, 'w'면 새로 시작
+        """
+        self.path = path
+        self.fsync_interval = max(1, fsync_interval)
+        self._unsynced = 0
+        self._lock = threading.Lock()  # 결과 기록 스레드와 이벤트 루프(호출 지표)가 같이 씀
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, mode, encoding='utf-8')
+
+    def append(self, record: Dict):
+        """레코드 한 줄 기록 (여러 스레드에서 호출 가능)"""
+        line = json.dumps(record, ensure_ascii=False, default=_json_default) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        """버퍼를 디스크에 강제로 기록"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict]:
+        """저널 레코드 읽기 (비정상 종료로 잘린 마지막 줄은 무시)"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    @staticmethod
+    def read_rows(path: str) -> List[Dict]:
+        """'row' 레코드만 행 번호 순서로 반환 (같은 행이 여러 번 있으면 마지막 기록 사용)"""
+        rows = {}
+        for record in RunJournal.read(path):
+            if record.get('type') == 'row':
+                rows[record['row']] = record
+        return [rows[row] for row in sorted(rows)]
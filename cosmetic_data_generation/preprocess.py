@@ -0,0 +1,186 @@
+"""
+프롬프트 입력 전처리 (제품설명 / 전성분 토큰 예산)
+
+- 전성분: 성분명 정규화, 중복 제거, 예산을 넘으면 뒤쪽 성분부터 생략 (순서 = 농도이므로 순서는 유지,
+  규칙 엔진의 자극 성분은 판정에 필요하므로 예산과 관계없이 유지)
+- 제품설명: URL/해시태그/HTML/장식 기호, 배송·이벤트·법정 표기 같은 상투 문구 제거, 중복 문장 제거 후 예산만큼만 사용
+- 실행 전체의 필드별 전처리 전/후 토큰 통계 집계
+"""
+
+import re
+from typing import Dict, List
+
+from rate_limiter import RateLimiter
+from rules import RuleEngine
+
+
+class InputPreprocessor:
+    # 필드별 기본 토큰 예산 (None이면 제한 없음)
+    DEFAULT_BUDGET = {'제품설명': 400, '전성분': 600}
+
+    INGREDIENT_PREFIX_PATTERN = re.compile(r'^\s*(?:\[?전성분\]?\s*[:：]?)\s*')
+    # "1,2-헥산다이올"처럼 숫자 사이의 쉼표는 성분명의 일부이므로 나누지 않음
+    INGREDIENT_SPLIT_PATTERN = re.compile(r'\s*(?:(?<!\d),|,(?!\d)|[，·\n])\s*')
+    # 예산을 넘어도 생략하지 않을 자극 성분 (rules.py의 IRRITANT_RULES)
+    PROTECTED_INGREDIENT_PATTERN = re.compile('|'.join(f'(?:{pattern})' for _, pattern in RuleEngine.IRRITANT_RULES),
+                                              re.IGNORECASE)
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+    # budget_ingredients가 붙이는 생략 표기
+    OMITTED_TAIL_PATTERN = re.compile(r'\s*외\s*(\d+)종\s*$')
+
+    URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+    HTML_PATTERN = re.compile(r'<[^>]+>')
+    HASHTAG_PATTERN = re.compile(r'#\S+')
+    DECORATION_PATTERN = re.compile(r'[★☆♥♡◆◇■□▶▷◀◁●○◎※✔✓✅❤️💕✨🎁]+')
+    SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?。])\s+|\n+')
+
+    # 분석에 도움이 안 되는 판매/배송/법정 표기 문장
+    BOILERPLATE_PATTERN = re.compile(
+        r'배송|교환|반품|환불|구매\s*시|이벤트|쿠폰|사은품|적립|할인|특가|리뷰\s*작성|상세\s*페이지|'
+        r'고객\s*센터|제조국|제조업자|제조판매업자|책임판매업자|사용\s*기한|개봉\s*후|식약처|심사필|'
+        r'품질\s*보증|소비자\s*상담|이미지는\s*연출'
+    )
+
+    def __init__(self, budget: Dict[str, int] = None):
+        """
+        Args:
+            budget: 필드별 토큰 예산 (None이면 DEFAULT_BUDGET, 값이 None인 필드는 제한 없음)
+        """
+        self.budget = dict(self.DEFAULT_BUDGET if budget is None else budget)
+        self.stats = {field: {'before': 0, 'after': 0, 'truncated': 0} for field in ('제품설명', '전성분')}
+        self.row_count = 0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return RateLimiter.estimate_tokens(text)
+
+    @classmethod
+    def normalize_ingredients(cls, text: str) -> List[str]:
+        """전성분 문자열 → 정규화/중복 제거된 성분 리스트 (원래 순서 유지)"""
+        text = cls.INGREDIENT_PREFIX_PATTERN.sub('', str(text))
+        ingredients = []
+        seen = set()
+        for part in cls.INGREDIENT_SPLIT_PATTERN.split(text):
+            name = cls.WHITESPACE_PATTERN.sub(' ', part).strip(' .;')
+            if not name or name.lower() == 'nan':
+                continue
+            key = name.replace(' ', '').lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            ingredients.append(name)
+        return ingredients
+
+    @classmethod
+    def count_ingredients(cls, text: str) -> int:
+        """전성분 성분 수 (전처리된 문자열이면 "외 N종"으로 생략된 성분도 포함)"""
+        text = str(text)
+        match = cls.OMITTED_TAIL_PATTERN.search(text)
+        if match is None:
+            return len(cls.normalize_ingredients(text))
+        return len(cls.normalize_ingredients(text[:match.start()])) + int(match.group(1))
+
+    def budget_ingredients(self, text: str) -> str:
+        """전성분 정규화 후 예산 안에서 앞쪽(농도 높은) 성분부터 유지 (자극 성분은 항상 유지)"""
+        ingredients = self.normalize_ingredients(text)
+        limit = self.budget.get('전성분')
+        if limit is None:
+            return ', '.join(ingredients)
+
+        costs = [self.estimate_tokens(name) + 1 for name in ingredients]
+        protected = {i for i, name in enumerate(ingredients) if self.PROTECTED_INGREDIENT_PATTERN.search(name)}
+        used = sum(costs[i] for i in protected)
+        kept_positions = set(protected)
+        for i, cost in enumerate(costs):
+            if i in protected:
+                continue
+            if kept_positions and used + cost > limit:
+                break
+            kept_positions.add(i)
+            used += cost
+        kept = [name for i, name in enumerate(ingredients) if i in kept_positions]
+
+        if len(kept) < len(ingredients):
+            self.stats['전성분']['truncated'] += 1
+            return ', '.join(kept) + f" 외 {len(ingredients) - len(kept)}종"
+        return ', '.join(kept)
+
+    def clean_description(self, text: str) -> List[str]:
+        """제품설명에서 상투 문구를 걷어낸 문장 리스트"""
+        text = str(text)
+        if text.lower() == 'nan':
+            return []
+        text = self.HTML_PATTERN.sub(' ', text)
+        text = self.URL_PATTERN.sub(' ', text)
+        text = self.HASHTAG_PATTERN.sub(' ', text)
+        text = self.DECORATION_PATTERN.sub(' ', text)
+
+        sentences = []
+        seen = set()
+        for sentence in self.SENTENCE_SPLIT_PATTERN.split(text):
+            sentence = self.WHITESPACE_PATTERN.sub(' ', sentence).strip()
+            if len(sentence) < 2 or self.BOILERPLATE_PATTERN.search(sentence):
+                continue
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            sentences.append(sentence)
+        return sentences
+
+    def budget_description(self, text: str) -> str:
+        """제품설명 정리 후 예산 안에서 앞 문장부터 유지"""
+        sentences = self.clean_description(text)
+        limit = self.budget.get('제품설명')
+        if limit is None:
+            return ' '.join(sentences)
+
+        kept = []
+        used = 0
+        for sentence in sentences:
+            cost = self.estimate_tokens(sentence)
+            if used + cost > limit:
+                if not kept:
+                    # 첫 문장부터 예산을 넘으면 비율만큼 잘라서 사용
+                    kept.append(sentence[:max(1, len(sentence) * limit // max(cost, 1))])
+                break
+            kept.append(sentence)
+            used += cost
+
+        if len(' '.join(kept)) < len(' '.join(sentences)):
+            self.stats['제품설명']['truncated'] += 1
+        return ' '.join(kept)
+
+    def apply(self, inputs: Dict) -> Dict:
+        """
+        API 입력값 전처리 (원본 inputs는 그대로 두고 새 딕셔너리 반환)
+
+        Args:
+            inputs: 제품명, 브랜드, 제품설명, 전성분을 포함한 입력값
+
+        Returns:
+            프롬프트에 넣을 제품명, 브랜드, 제품설명, 전성분
+        """
+        description = self.budget_description(inputs['제품설명'])
+        ingredients = self.budget_ingredients(inputs['전성분'])
+
+        self.row_count += 1
+        for field, value in (('제품설명', description), ('전성분', ingredients)):
+            self.stats[field]['before'] += self.estimate_tokens(inputs[field])
+            self.stats[field]['after'] += self.estimate_tokens(value)
+
+        return {
+            '제품명': inputs['제품명'],
+            '브랜드': inputs['브랜드'],
+            '제품설명': description,
+            '전성분': ingredients
+        }
+
+    def summary(self) -> str:
+        """필드별 전처리 전/후 토큰 통계 문자열"""
+        lines = [f"입력 전처리 ({self.row_count}행, 예산: {self.budget})"]
+        for field, stat in self.stats.items():
+            before = stat['before']
+            after = stat['after']
+            reduced = (1 - after / before) * 100 if before else 0.0
+            lines.append(f"  - {field}: {before:,} → {after:,} 토큰 (-{reduced:.1f}%), 예산 초과로 잘림 {stat['truncated']}행")
+        return '\n'.join(lines)
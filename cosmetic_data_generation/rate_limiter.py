@@ -0,0 +1,190 @@
+"""
+API 호출용 토큰 버킷 Rate Limiter
+
+- 분당 요청 수(RPM)와 분당 입력 토큰 수(TPM) 두 개의 버킷을 함께 관리
+- 429 응답의 retry-after 헤더를 존중해서 모든 호출을 같이 멈춤
+- 재시도 가능한 오류(429, 5xx, 연결/타임아웃)에만 지터가 들어간 지수 백오프 적용
+
+화장품 데이터 생성기와 피부질환 설명 생성기(Generate_Output_*.py)에서 같이 사용합니다.
+스레드/asyncio 어느 쪽에서 호출해도 하나의 인스턴스를 공유할 수 있습니다.
+"""
+
+import time
+import random
+import asyncio
+import threading
+from typing import Optional
+
+
+class RateLimiter:
+    # 재시도 가능한 HTTP 상태 코드 (5xx는 별도로 전부 재시도)
+    RETRYABLE_STATUS = {408, 409, 429}
+
+    # 상태 코드가 없는 재시도 가능 오류 (anthropic/openai SDK 예외 이름)
+    RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError'}
+
+    def __init__(self,
+                 requests_per_minute: int = 50,
+                 tokens_per_minute: int = 30000,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        """
+        Args:
+            requests_per_minute: 분당 최대 요청 수
+            tokens_per_minute: 분당 최대 입력 토큰 수 (None이면 토큰 제한 없음)
+            base_delay: 백오프 기본 대기 시간(초)
+            max_delay: 백오프 최대 대기 시간(초)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # 버킷은 가득 찬 상태로 시작
+        self._request_tokens = float(requests_per_minute)
+        self._input_tokens = float(tokens_per_minute or 0)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # 통계
+        self.wait_seconds = 0.0
+        self.throttled_count = 0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        프롬프트 입력 토큰 수 추정
+
+        영문/숫자는 약 4자당 1토큰, 한글 등 비ASCII 문자는 약 1자당 1토큰으로 계산
+        """
+        if not text:
+            return 0
+        ascii_count = sum(1 for ch in text if ord(ch) < 128)
+        return ascii_count // 4 + (len(text) - ascii_count) + 1
+
+    @staticmethod
+    def estimate_image_tokens(width: int, height: int) -> int:
+        """이미지 입력 토큰 수 추정 (Claude 기준 약 가로x세로/750, 최대 1600)"""
+        return min(1600, max(1, width * height // 750))
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._request_tokens = min(
+            float(self.requests_per_minute),
+            self._request_tokens + elapsed * self.requests_per_minute / 60.0
+        )
+        if self.tokens_per_minute:
+            self._input_tokens = min(
+                float(self.tokens_per_minute),
+                self._input_tokens + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def _try_acquire(self, tokens: int) -> float:
+        """버킷에서 차감을 시도하고, 부족하면 기다려야 할 시간(초)을 반환 (0이면 차감 완료)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if self._blocked_until > now:
+                return self._blocked_until - now
+
+            # 한 번에 버킷보다 큰 요청은 버킷 크기만큼만 요구
+            if self.tokens_per_minute:
+                tokens = min(tokens, self.tokens_per_minute)
+
+            waits = []
+            if self._request_tokens < 1:
+                waits.append((1 - self._request_tokens) * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute and self._input_tokens < tokens:
+                waits.append((tokens - self._input_tokens) * 60.0 / self.tokens_per_minute)
+
+            if waits:
+                return max(waits)
+
+            self._request_tokens -= 1
+            if self.tokens_per_minute:
+                self._input_tokens -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """요청 1개 + 입력 토큰만큼 버킷이 찰 때까지 대기 (동기)"""
+        throttled = False
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            throttled = True
+            self.wait_seconds += wait
+            time.sleep(wait)
+        if throttled:
+            self.throttled_count += 1
+
+    async def acquire_async(self, tokens: int = 0):
+        """요청 1개 + 입력 토큰만큼 버킷이 찰 때까지 대기 (asyncio)"""
+        throttled = False
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            throttled = True
+            self.wait_seconds += wait
+            await asyncio.sleep(wait)
+        if throttled:
+            self.throttled_count += 1
+
+    def is_retryable(self, error: Exception) -> bool:
+        """재시도할 가치가 있는 오류인지 판단"""
+        status = getattr(error, 'status_code', None)
+        if status is not None:
+            return status in self.RETRYABLE_STATUS or status >= 500
+        return (
+            type(error).__name__ in self.RETRYABLE_ERROR_NAMES
+            or isinstance(error, (ConnectionError, TimeoutError))
+        )
+
+    @staticmethod
+    def get_retry_after(error: Exception) -> Optional[float]:
+        """오류 응답의 retry-after 헤더 값(초) 추출"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+
+        try:
+            if headers.get('retry-after-ms') is not None:
+                return float(headers['retry-after-ms']) / 1000.0
+            if headers.get('retry-after') is not None:
+                return float(headers['retry-after'])
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        실패한 호출의 재시도 대기 시간 계산
+
+        Args:
+            error: 발생한 예외
+            attempt: 현재 시도 번호 (0부터 시작)
+
+        Returns:
+            대기 시간(초), 재시도하면 안 되는 오류면 None
+        """
+        if not self.is_retryable(error):
+            return None
+
+        retry_after = self.get_retry_after(error)
+        if retry_after is not None:
+            # 서버가 알려준 시간 동안은 다른 호출도 같이 멈춤
+            with self._lock:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            return retry_after
+
+        # 지터가 들어간 지수 백오프 (full jitter)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def summary(self) -> str:
+        """대기 통계 문자열"""
+        return f"Rate limit 대기: {self.throttled_count}회, 총 {self.wait_seconds:.1f}초"
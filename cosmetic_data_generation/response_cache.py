@@ -0,0 +1,89 @@
+"""
+LLM 응답 영구 캐시 (sqlite)
+
+(모델, temperature, 완성된 프롬프트)의 해시를 키로 원본 응답 텍스트를 저장합니다.
+파싱 전 원본 텍스트를 저장하므로 파싱 코드를 고친 뒤 다시 돌려도 API 비용이 들지 않습니다.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+
+class ResponseCache:
+    def __init__(self, db_path: str = "claude_response_cache.sqlite"):
+        """
+        Args:
+            db_path: sqlite 캐시 파일 경로
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # 비동기/스레드 모드에서도 같은 연결을 공유 (샤드 프로세스끼리 같은 파일을 쓸 때는 잠금 해제를 기다림)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt) -> str:
+        """(모델, temperature, 프롬프트) 해시 키 생성 (프롬프트는 문자열 또는 JSON 직렬화 가능한 값)"""
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, ensure_ascii=False, sort_keys=True)
+        payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """캐시된 응답 텍스트 조회 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, response_text: str):
+        """응답 텍스트 저장"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, response_text, time.time())
+            )
+            self._conn.commit()
+        self.writes += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def summary(self) -> str:
+        """캐시 통계 문자열"""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"응답 캐시: 적중 {self.hits}회, 미적중 {self.misses}회 (적중률 {hit_rate:.1f}%), "
+                f"신규 저장 {self.writes}개, 전체 {len(self)}개 ({self.db_path})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
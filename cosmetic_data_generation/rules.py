@@ -0,0 +1,212 @@
+"""
+규칙 기반 필드 판정 (LLM 호출 전 빠른 경로)
+
+프롬프트에 적힌 규칙 중 문자열 매칭만으로 결정되는 부분을 미리 계산합니다.
+- 제품유형: 제품명 끝의 유형 키워드 (이름 중간의 다른 유형 단어와 겹치면 확정하지 않고 후보로만 전달)
+- 관련 피부질환 제외: 전성분에 레티놀/향료/변성 알코올/SLS 등 자극 성분이 있으면 아토피/건선 제외
+- 피부타입: 제품명에 "지성용", "민감성 피부" 처럼 명시된 경우
+- 관련 피부질환 = 정상: 질환 케어 성분도 질환 키워드도 없는 경우 (프롬프트 기본값)
+
+확정된 값은 LLM에 제약 조건으로 전달하고 응답에도 그대로 적용하며,
+세 필드가 모두 확정된 제품은 (rule_fast_path를 켠 경우) LLM을 호출하지 않고 규칙 결과만으로 응답을 만듭니다.
+전성분 예산(preprocess.py)으로 뒤쪽 성분이 잘리기 전의 원본 입력으로 판정해야 합니다.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+
+class RuleEngine:
+    # 제품유형 키워드 (위에서부터 우선 적용: "선크림"이 "크림"보다, "클렌징 오일"이 "오일"보다 먼저)
+    # 브랜드/라인명("스킨앤랩", "스킨푸드")에 걸리지 않도록 용량/기획 표기를 뺀 제품명의 끝부분에서 찾음 (product_types)
+    PRODUCT_TYPE_RULES = [
+        ('선크림', r'선\s*크림|선\s*스크린|선\s*블록|선\s*젤|선\s*로션|선\s*스틱|sun\s*(?:cream|screen|block)'),
+        ('클렌저', r'클렌징|클렌저|클렌즈|폼\s*클렌|워시|cleans'),
+        ('마스크', r'마스크|시트\s*팩|슬리핑\s*팩|워시\s*오프\s*팩|mask'),
+        ('토너', r'토너|토닉|스킨(?!\s*케어)|toner|tonic'),
+        ('미스트', r'미스트|mist'),
+        ('세럼', r'세럼|에센스|앰플|serum|essence|ampoule'),
+        ('로션', r'로션|에멀전|에멀젼|lotion|emulsion'),
+        ('크림', r'크림|cream'),
+        ('젤', r'젤(?!리)|gel'),
+        ('오일', r'오일|oil'),
+        ('밤', r'(?<![가-힣])밤(?![가-힣])|balm'),
+    ]
+
+    # 아토피/건선 제외 대상 자극 성분 (농도 조건이 있는 비타민C/AHA 5% 이상은 전성분만으로 판단할 수 없어 제외)
+    IRRITANT_RULES = [
+        ('레티놀/레티노이드', r'레티놀|레티날|레티노이드|레티닐|retin(?:ol|al|oid|yl)'),
+        ('향료', r'향료|fragrance|parfum'),
+        ('변성 알코올', r'변성\s*알코올|alcohol\s*denat'),
+        ('SLS/SLES', r'소듐\s*라우(?:릴|레스)\s*설페이트|라우(?:릴|레스)\s*황산\s*나트륨|\bsl(?:e)?s\b|'
+                     r'sodium\s*laur(?:yl|eth)\s*sulfate'),
+    ]
+    IRRITANT_EXCLUDED = ['아토피', '건선']
+
+    # 질환 케어와 연결되는 성분 (프롬프트의 피부장벽/진정/항염/각질제거/피지조절 성분)
+    DISEASE_ACTIVE_PATTERN = re.compile(
+        r'세라마이드|콜레스테롤|피토스핑고신|센텔라|병풀|마데카소사이드|아시아티코사이드|알란토인|비사보롤|'
+        r'나이아신아마이드|징크|아젤라|살리실|글리콜릭?애씨드|글라이콜릭애씨드|락틱애씨드|만델릭|글루코노락톤|'
+        r'티트리|\b[ab]ha\b|\blha\b|ceramide|cholesterol|centella|niacinamide|salicylic|zinc|azelaic',
+        re.IGNORECASE
+    )
+    # 제품명/제품설명에 질환이나 트러블 케어를 내세우는 표현
+    DISEASE_KEYWORD_PATTERN = re.compile(
+        r'아토피|건선|여드름|아크네|트러블|블레미쉬|뾰루지|지루|주사|홍조|시카|진정|장벽|민감|'
+        r'atopic|psoriasis|acne|blemish|trouble|cica|barrier',
+        re.IGNORECASE
+    )
+
+    SKIN_TYPE_PATTERN = re.compile(r'(지성|건성|복합성|민감성)\s*(?:피부\s*용?|용)')
+
+    # 제품유형 판정 전에 제품명에서 뺄 괄호/용량/구성/기획 표기
+    NAME_NOISE_PATTERN = re.compile(
+        r'\[[^\]]*\]|\([^)]*\)'
+        r'|\d+(?:\.\d+)?\s*(?:ml|g|kg|l|매|개|ea|p|입|종)\b|\d+\s*\+\s*\d+'
+        r'|(?<![가-힣])(?:기획|세트|증정|리필|단품|듀오|더블|대용량|한정)(?![가-힣])',
+        re.IGNORECASE
+    )
+
+    def __init__(self):
+        # 키워드가 끝에 와야 유형으로 봄 ("수분크림", "마스크팩", "클렌징 오일", "cleanser"는 인정, "스킨앤랩", "스킨푸드"는 제외)
+        self.product_type_rules = [(name, re.compile(rf'(?:{pattern})(?:\s*(?:팩|패드|폼|워터|오일|젤|밤)|[a-z]*)?$',
+                                                     re.IGNORECASE))
+                                   for name, pattern in self.PRODUCT_TYPE_RULES]
+        self.type_priority = {name: i for i, (name, _) in enumerate(self.PRODUCT_TYPE_RULES)}
+        self.irritant_rules = [(name, re.compile(pattern, re.IGNORECASE))
+                               for name, pattern in self.IRRITANT_RULES]
+
+    def _word_type(self, text: str) -> Optional[str]:
+        """text 끝에 오는 유형 키워드의 제품유형 (없으면 None)"""
+        return next((name for name, pattern in self.product_type_rules if pattern.search(text)), None)
+
+    def product_types(self, 제품명: str) -> List[str]:
+        """
+        제품명 키워드로 제품유형 후보 판정
+
+        유형은 용량/기획 표기를 뺀 제품명의 마지막 두 단어("클렌징 폼", "선 크림")에서 정하고,
+        두 단어가 서로 다른 유형이거나("젤 크림") 그 앞 단어에 다른 유형 키워드가 있으면 후보로 같이 반환합니다.
+
+        Returns:
+            [끝부분 유형, ..., 앞 단어의 다른 유형, ...] ("... 크림 포 드라이 스킨" → ['토너', '크림']),
+            하나뿐일 때만 확정 값으로 사용
+        """
+        words = self.NAME_NOISE_PATTERN.sub(' ', str(제품명)).split()
+        if not words:
+            return []
+
+        # 끝 단어 유형 (앞 단어와 이어지는 "선 크림" 포함)과 그 앞 단어 유형 ("클렌징 폼"), 우선순위 순서
+        tail_types = [self._word_type(' '.join(words))]
+        if len(words) > 1:
+            tail_types.append(self._word_type(words[-2]))
+        candidates = sorted({name for name in tail_types if name}, key=self.type_priority.get)
+        if not candidates:
+            return []
+
+        for word in words[:-2]:
+            name = self._word_type(word)
+            if name and name not in candidates:
+                candidates.append(name)
+        return candidates
+
+    def irritants(self, 전성분: str) -> List[str]:
+        """전성분에 포함된 자극 성분 그룹 목록"""
+        return [name for name, pattern in self.irritant_rules if pattern.search(전성분)]
+
+    def skin_types(self, 제품명: str) -> Optional[List[str]]:
+        """제품명에 명시된 피부타입 (1-2개일 때만 확정, 아니면 None)"""
+        types = list(dict.fromkeys(self.SKIN_TYPE_PATTERN.findall(제품명)))
+        return types if 1 <= len(types) <= 2 else None
+
+    def evaluate(self, 제품명: str, 제품설명: str, 전성분: str) -> Dict:
+        """
+        원본 입력값에 규칙 적용
+
+        Returns:
+            {'제품유형', '피부타입', '관련_피부질환': 확정 값 또는 None,
+             '제품유형_후보': 제품명만으로 하나로 정할 수 없을 때의 후보 (프롬프트 참고용), '제외_질환': 제외할 질환 리스트, '자극_성분': 근거가 된 자극 성분 그룹, 'complete': 세 필드 모두 확정 여부}
+        """
+        irritants = self.irritants(전성분)
+        product_types = self.product_types(제품명)
+
+        diseases = None
+        if not self.DISEASE_ACTIVE_PATTERN.search(전성분) and not self.DISEASE_KEYWORD_PATTERN.search(f"{제품명} {제품설명}"):
+            diseases = ['정상']
+
+        rule = {
+            '제품유형': product_types[0] if len(product_types) == 1 else None,
+            '제품유형_후보': product_types if len(product_types) > 1 else [],
+            '피부타입': self.skin_types(제품명),
+            '관련_피부질환': diseases,
+            '제외_질환': list(self.IRRITANT_EXCLUDED) if irritants else [],
+            '자극_성분': irritants
+        }
+        rule['complete'] = all(rule[field] for field in ('제품유형', '피부타입', '관련_피부질환'))
+        return rule
+
+    @staticmethod
+    def constraint_text(rule: Optional[Dict]) -> str:
+        """LLM 프롬프트에 넣을 제약 조건 문장 (확정된 값이 없으면 빈 문자열)"""
+        if not rule:
+            return ''
+        lines = []
+        if rule['제품유형']:
+            lines.append(f"- 제품유형은 반드시 \"{rule['제품유형']}\"")
+        if rule['피부타입']:
+            lines.append(f"- 피부타입은 반드시 \"{', '.join(rule['피부타입'])}\"")
+        if rule['관련_피부질환']:
+            lines.append(f"- 관련 피부질환은 반드시 \"{', '.join(rule['관련_피부질환'])}\"")
+        elif rule['제외_질환']:
+            lines.append(f"- 관련 피부질환에서 {', '.join(rule['제외_질환'])} 제외 "
+                         f"(자극 성분 포함: {', '.join(rule['자극_성분'])})")
+        text = ''
+        if lines:
+            text += "- 규칙으로 확정된 항목 (그대로 따를 것):\n" + '\n'.join('  ' + line for line in lines) + '\n'
+        if rule.get('제품유형_후보'):
+            text += (f"- 참고: 제품명 기준 제품유형 후보는 {', '.join(rule['제품유형_후보'])} "
+                     f"(브랜드/라인명일 수 있으므로 제품설명을 보고 판단)\n")
+        return text
+
+    def enforce(self, parsed: Dict, rule: Optional[Dict]) -> bool:
+        """
+        파싱된 LLM 응답에 규칙 결과 적용 (원본_응답 텍스트도 같이 수정)
+
+        Returns:
+            수정한 항목이 있으면 True
+        """
+        if not parsed or not rule:
+            return False
+
+        expected = {}
+        if rule['제품유형'] and parsed.get('제품유형') != rule['제품유형']:
+            expected['제품유형'] = rule['제품유형']
+        if rule['피부타입'] and parsed.get('피부타입') != rule['피부타입']:
+            expected['피부타입'] = list(rule['피부타입'])
+
+        diseases = rule['관련_피부질환'] or parsed.get('관련_피부질환')
+        if diseases is not None:
+            filtered = [disease for disease in diseases if disease not in rule['제외_질환']] or ['정상']
+            if filtered != parsed.get('관련_피부질환'):
+                expected['관련_피부질환'] = filtered
+
+        if not expected:
+            return False
+
+        text = parsed.get('원본_응답') or ''
+        for field, value in expected.items():
+            parsed[field] = value
+            label = field.replace('_', ' ')
+            rendered = value if isinstance(value, str) else ', '.join(value)
+            text, replaced = re.subn(rf'\[{label}:\s*[^\]]*\]', f'[{label}: {rendered}]', text, count=1)
+            if not replaced:
+                text = f'[{label}: {rendered}]\n' + text
+        parsed['원본_응답'] = text
+        return True
+
+    @staticmethod
+    def render(rule: Dict, 제품설명: str) -> str:
+        """세 필드가 모두 확정된 제품의 응답 텍스트 (LLM 응답과 같은 형식, 설명은 제품설명 사용)"""
+        return (f"[제품유형: {rule['제품유형']}]\n"
+                f"[피부타입: {', '.join(rule['피부타입'])}]\n"
+                f"[관련 피부질환: {', '.join(rule['관련_피부질환'])}]\n\n"
+                f"{제품설명}")
@@ -0,0 +1,313 @@
+"""
+화장품 데이터 생성 샤드 실행기
+
+입력 범위를 N개의 연속된 샤드로 나눠 워커 프로세스마다 process_excel_file을 실행하고
+(샤드마다 자체 비동기 동시 호출), 샤드별 저널을 원래 행 순서대로 병합해서 결과 엑셀 하나를 만듭니다.
+결과 엑셀이 이미 있으면 이번 범위 밖의 기존 행은 유지한 채 합칩니다.
+
+- 계정 단위 Rate Limit(RPM/TPM)은 샤드 수로 나눠서 각 프로세스에 배분
+- 샤드 저널 이름은 (출력 경로, 샤드 번호, 샤드 수)로 정해지므로 같은 설정으로 다시 실행하면 샤드별로 이어서 처리
+- 응답 캐시(sqlite)는 모든 샤드가 같이 사용, 중복 제거는 샤드 안에서만 적용
+- 시트 행 수는 미리 세지 않고 시트 크기 정보(max_row)로 나누며, 샤드는 자기 구간만 스트리밍으로 읽음
+- 모든 샤드가 끝나면 샤드별 호출 지표 파일은 결과 호출 지표 파일(<output>.calls.jsonl)에 합친 뒤 삭제
+"""
+
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from excel_stream import ExcelRowStream
+from journal import RunJournal
+from telemetry import CallTelemetry
+
+
+# 샤드가 자기 구간만 읽도록 쓰는 기본 스트리밍 묶음 크기 (process_kwargs에 stream_chunk_size가 없을 때)
+SHARD_STREAM_CHUNK_SIZE = 500
+
+
+def shard_ranges(start_row: int, end_row: int, num_shards: int) -> List[Tuple[int, int]]:
+    """[start_row, end_row) 범위를 크기가 거의 같은 연속 구간 num_shards개로 분할 (빈 구간 제외)"""
+    total = max(0, end_row - start_row)
+    num_shards = max(1, min(num_shards, total))
+    size, remainder = divmod(total, num_shards)
+    ranges = []
+    begin = start_row
+    for shard in range(num_shards):
+        end = begin + size + (1 if shard < remainder else 0)
+        if end > begin:
+            ranges.append((begin, end))
+        begin = end
+    return ranges
+
+
+def shard_output_path(output_path: str, shard: int, num_shards: int) -> str:
+    """샤드별 출력 경로 (저널/호출 지표 파일은 여기서 .xlsx를 .journal.jsonl/.calls.jsonl로 바꾼 경로)"""
+    return output_path.replace('.xlsx', f'.shard{shard:02d}of{num_shards:02d}.xlsx')
+
+
+def _run_shard(task: Dict) -> Dict:
+    """워커 프로세스: 샤드 하나 처리 후 통계 반환 (결과는 샤드 저널에 남김)"""
+    # 워커 프로세스에서 import (spawn 방식에서도 각 프로세스가 자체 클라이언트를 만들도록)
+    from rate_limiter import RateLimiter
+    from Generate_Cosmetic_Data_Claude import CosmeticDataGenerator
+
+    rate_limiter = RateLimiter(requests_per_minute=task['requests_per_minute'],
+                               tokens_per_minute=task['tokens_per_minute'])
+    generator = CosmeticDataGenerator(task['api_key'], rate_limiter=rate_limiter, **task['generator_kwargs'])
+
+    journal_path = task['output_path'].replace('.xlsx', '.journal.jsonl')
+    resumed = _row_record_count(journal_path)
+
+    started_at = time.time()
+    generator.process_excel_file(
+        excel_path=task['excel_path'],
+        output_path=task['output_path'],
+        start_row=task['start_row'],
+        end_row=task['end_row'],
+        write_output=False,
+        **task['process_kwargs']
+    )
+    elapsed = time.time() - started_at
+
+    rows = RunJournal.read_rows(journal_path)
+    # 이번 실행에서 저널에 추가된 행 (이어서 처리할 때 다시 시도한 API_ERROR 행 포함, 같은 행은 마지막 기록)
+    new_records = {}
+    row_records = (record for record in RunJournal.read(journal_path) if record.get('type') == 'row')
+    for position, record in enumerate(row_records):
+        if position >= resumed:
+            new_records[record['row']] = record
+    return {
+        'shard': task['shard'],
+        'rows': len(rows),
+        'processed': len(new_records),
+        'errors': sum(1 for record in new_records.values() if record['data'].get('처리_상태') == 'API_ERROR'),
+        'elapsed': elapsed,
+        'usage': dict(generator.usage_totals),
+        'calls': generator.telemetry.calls
+    }
+
+
+def _row_record_count(journal_path: str) -> int:
+    """저널에 기록된 'row' 레코드 수 (같은 행을 다시 기록한 줄도 셈)"""
+    return sum(1 for record in RunJournal.read(journal_path) if record.get('type') == 'row')
+
+
+def merge_shard_journals(journal_paths: List[str], output_path: str, start_row: int = 0) -> pd.DataFrame:
+    """
+    샤드 저널을 원래 행 번호 순서로 병합해서 결과 엑셀 저장
+
+    결과 엑셀이 이미 있으면 샤드 행과 입력 지문이 겹치지 않는 기존 행(다른 범위로 실행한 결과)은
+    process_excel_file과 같은 방식으로 유지합니다.
+
+    Args:
+        journal_paths: 샤드 저널 경로 리스트
+        output_path: 결과 엑셀 경로
+        start_row: 이번 실행의 시작 행 (기존 행을 앞/뒤 어디에 붙일지 정할 때 사용)
+
+    Returns:
+        병합된 데이터프레임
+    """
+    from Generate_Cosmetic_Data_Claude import CosmeticDataGenerator
+
+    records = {}
+    for journal_path in journal_paths:
+        for record in RunJournal.read_rows(journal_path):
+            records[record['row']] = record
+    if not records:
+        return pd.DataFrame()
+
+    # 저널 행 키는 "행 번호:입력 지문"
+    range_fingerprints = Counter(record['key'].split(':', 1)[1] for record in records.values() if record.get('key'))
+    before, after = CosmeticDataGenerator.carry_over_rows(output_path, range_fingerprints, start_row)
+    final_df = pd.DataFrame(before + [records[row]['data'] for row in sorted(records)] + after)
+    final_df.to_excel(output_path, index=False)
+    return final_df
+
+
+def merge_shard_calls(calls_paths: List[str], output_path: str) -> int:
+    """
+    샤드별 호출 지표 파일을 결과 호출 지표 파일(<output>.calls.jsonl)에 이어 붙이고 삭제
+
+    Returns:
+        옮긴 호출 레코드 수
+    """
+    moved = 0
+    calls_log = RunJournal(output_path.replace('.xlsx', '.calls.jsonl'), mode='a')
+    try:
+        for calls_path in calls_paths:
+            for record in RunJournal.read(calls_path):
+                calls_log.append(record)
+                moved += 1
+    finally:
+        calls_log.close()
+    for calls_path in calls_paths:
+        if os.path.exists(calls_path):
+            os.remove(calls_path)
+    return moved
+
+
+def run_sharded(api_key: str,
+                excel_path: str,
+                output_path: str,
+                num_shards: int = 4,
+                start_row: int = 0,
+                end_row: int = None,
+                requests_per_minute: int = 50,
+                tokens_per_minute: int = 30000,
+                generator_kwargs: Dict = None,
+                process_kwargs: Dict = None) -> pd.DataFrame:
+    """
+    입력 범위를 샤드로 나눠 여러 프로세스에서 생성하고 결과를 하나로 병합
+
+    Args:
+        api_key: Claude API 키
+        excel_path: 입력 엑셀 파일 경로
+        output_path: 병합된 결과 엑셀 경로 (샤드 저널도 이 경로 옆에 생성)
+        num_shards: 샤드(워커 프로세스) 수
+        start_row: 시작 행 (0부터 시작)
+        end_row: 종료 행 (None이면 끝까지)
+        requests_per_minute: 계정 전체 분당 요청 수 (샤드 수로 나눠 배분)
+        tokens_per_minute: 계정 전체 분당 입력 토큰 수 (샤드 수로 나눠 배분)
+        generator_kwargs: CosmeticDataGenerator 추가 인자 (use_cache, fast_model 등)
+        process_kwargs: process_excel_file 추가 인자 (concurrency, pack_size 등, 샤드마다 적용,
+            stream_chunk_size가 없으면 SHARD_STREAM_CHUNK_SIZE로 자기 구간만 읽음)
+
+    Returns:
+        병합된 데이터프레임 (모든 샤드가 실패하면 None)
+    """
+    # 행 데이터는 샤드에서 읽고, 여기서는 end_row가 없을 때만 시트 크기 정보(max_row)로 범위를 정함
+    # (서식만 있는 빈 행까지 포함된 추정치라 마지막 샤드는 실제보다 작을 수 있음, 샤드는 시트 끝에서 멈춤)
+    to_sheet_end = end_row is None
+    with ExcelRowStream(excel_path) as reader:
+        sheet_rows = reader.estimated_rows
+        if sheet_rows is None:
+            print("⚠️ 시트 크기 정보가 없어 행 수를 직접 셉니다")
+            sheet_rows = reader.total_rows
+    if to_sheet_end:
+        end_row = sheet_rows
+
+    process_kwargs = dict(process_kwargs or {})
+    if process_kwargs.get('backend', 'messages') != 'batch':
+        # 샤드마다 시트 전체를 pd.read_excel로 읽지 않도록 자기 구간만 스트리밍으로 읽음
+        process_kwargs.setdefault('stream_chunk_size', SHARD_STREAM_CHUNK_SIZE)
+
+    ranges = shard_ranges(start_row, end_row, num_shards)
+    num_shards = len(ranges)
+    if not ranges:
+        print("처리할 데이터가 없습니다.")
+        return None
+
+    tasks = []
+    for shard, (begin, end) in enumerate(ranges):
+        tasks.append({
+            'shard': shard,
+            'api_key': api_key,
+            'excel_path': excel_path,
+            'output_path': shard_output_path(output_path, shard, num_shards),
+            'start_row': begin,
+            'end_row': end,
+            'requests_per_minute': max(1, requests_per_minute // num_shards),
+            'tokens_per_minute': max(1, tokens_per_minute // num_shards) if tokens_per_minute else None,
+            'generator_kwargs': generator_kwargs or {},
+            'process_kwargs': process_kwargs
+        })
+
+    print(f"샤드 실행 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"범위 {start_row}~{end_row - 1}행 → 샤드 {num_shards}개: "
+          + ', '.join(f"#{task['shard']} {task['start_row']}~{task['end_row'] - 1}" for task in tasks))
+    print(f"샤드당 Rate Limit: {tasks[0]['requests_per_minute']} RPM / {tasks[0]['tokens_per_minute']} TPM")
+    print("=" * 50)
+
+    started_at = time.time()
+    reports = []
+    failed_shards = []
+    with ProcessPoolExecutor(max_workers=num_shards) as executor:
+        futures = [(task, executor.submit(_run_shard, task)) for task in tasks]
+        for task, future in futures:
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                print(f"❌ 샤드 #{task['shard']} 실패: {e}")
+                failed_shards.append(task['shard'])
+    elapsed = time.time() - started_at
+
+    # 샤드 순서(= 원래 행 순서)로 병합
+    journal_paths = [task['output_path'].replace('.xlsx', '.journal.jsonl') for task in tasks]
+    final_df = merge_shard_journals(journal_paths, output_path, start_row)
+    if final_df.empty:
+        print("처리된 결과가 없습니다.")
+        return None
+
+    # 모든 샤드가 끝났을 때만 샤드 저널 삭제, 호출 지표는 결과 호출 지표 파일로 합침
+    # (실패한 샤드가 있으면 다시 실행해서 이어서 처리)
+    if not failed_shards:
+        for journal_path in journal_paths:
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+        merge_shard_calls([task['output_path'].replace('.xlsx', '.calls.jsonl') for task in tasks], output_path)
+
+    total_processed = sum(report['processed'] for report in reports)
+    total_errors = sum(report['errors'] for report in reports)
+    print("\n" + "=" * 50)
+    print(f"샤드 실행 완료: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    for report in sorted(reports, key=lambda report: report['shard']):
+        print(f"  - 샤드 #{report['shard']}: {report['rows']}행 (이번 실행 {report['processed']}행), 실패 {report['errors']}개, "
+              f"{report['elapsed']:.1f}초 ({report['processed'] / max(report['elapsed'], 1e-9) * 60:.1f}개/분)")
+    print(f"총 {len(final_df)}행 병합 (실패 {total_errors}개)")
+    print(f"전체 소요 시간: {elapsed:.1f}초 (합산 처리량: {total_processed / max(elapsed, 1e-9) * 60:.1f}개/분)")
+    input_tokens = sum(report['usage']['input_tokens'] for report in reports)
+    output_tokens = sum(report['usage']['output_tokens'] for report in reports)
+    print(f"토큰 사용량 합계: 입력 {input_tokens:,} / 출력 {output_tokens:,}")
+    telemetry = CallTelemetry()
+    for report in reports:
+        telemetry.calls.extend(report['calls'])
+    if telemetry.calls:
+        # 시트 끝까지 모두 처리했으면 남은 행 없음, 아니면 시트 크기 정보 기준 추정
+        remaining_rows = 0 if to_sheet_end and not failed_shards else max(0, sheet_rows - len(final_df))
+        print(telemetry.summary(total_processed, remaining_rows, elapsed))
+    if failed_shards:
+        print(f"⚠️ 실패한 샤드 {failed_shards}: 샤드 저널을 남겨 두었으니 같은 설정으로 다시 실행하면 이어서 처리합니다")
+    print(f"결과 파일: {output_path}")
+
+    return final_df
+
+
+def main():
+    """
+    메인 실행 함수
+    """
+    # ============ 여기에 설정값 입력 ============
+    api_key = os.getenv("ANTHROPIC_API_KEY", "")
+
+    if not api_key:
+        print("경고: ANTHROPIC_API_KEY가 설정되지 않았습니다.")
+        return
+
+    excel_path = "화장품데이터.xlsx"                # 입력 엑셀 파일 경로
+    output_path = "cosmetic_data_processed.xlsx"   # 병합 결과 파일 경로
+    num_shards = 4                                 # 워커 프로세스 수
+    concurrency = 4                                # 샤드당 동시 API 호출 수
+    # ==========================================
+
+    if not os.path.exists(excel_path):
+        print(f"파일이 존재하지 않습니다: {excel_path}")
+        return
+
+    run_sharded(
+        api_key=api_key,
+        excel_path=excel_path,
+        output_path=output_path,
+        num_shards=num_shards,
+        requests_per_minute=50,
+        tokens_per_minute=30000,
+        process_kwargs={'concurrency': concurrency}
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+API 호출별 지표 (지연 시간, 토큰, 재시도, 비용)
+
+호출마다 모델, 입력/출력/캐시 토큰, 응답 시간, 시도 횟수를 기록하고
+실행이 끝나면 p50/p95 지연 시간, 초당 토큰 수, 남은 행의 예상 비용을 요약합니다.
+동시 호출 수나 묶음 크기를 조정할 때 이 값을 기준으로 비교합니다.
+"""
+
+from typing import Dict, List, Optional
+
+
+# 모델별 가격 (USD / 1M 토큰: 입력, 출력)
+PRICING = {
+    'claude-sonnet-4-20250514': (3.0, 15.0),
+    'claude-3-5-haiku-20241022': (0.8, 4.0),
+}
+# 프롬프트 캐시 쓰기/읽기 토큰의 입력 가격 배율
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+# Message Batches API 요청의 가격 배율
+BATCH_MULTIPLIER = 0.5
+
+TOKEN_KEYS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
+
+class CallTelemetry:
+    def __init__(self, pricing: Dict = None):
+        """
+        Args:
+            pricing: 모델별 (입력, 출력) 가격을 덮어쓸 딕셔너리 (USD / 1M 토큰)
+        """
+        self.pricing = dict(PRICING, **(pricing or {}))
+        self.calls: List[Dict] = []
+
+    @staticmethod
+    def make_record(model: str, usage, seconds: float, attempts: int, products: int = 1, ok: bool = True,
+                    batch: bool = False) -> Dict:
+        """호출 한 번의 지표 레코드 (저널에 그대로 기록 가능한 형태, 배치 요청은 지연 시간 없이 비용만 집계)"""
+        record = {'type': 'call', 'model': model, 'ok': ok, 'seconds': round(seconds, 3),
+                  'attempts': attempts, 'products': products}
+        if batch:
+            record['batch'] = True
+        for key in TOKEN_KEYS:
+            record[key] = (getattr(usage, key, None) or 0) if usage is not None else 0
+        return record
+
+    def add(self, record: Dict):
+        self.calls.append(record)
+
+    def cost(self, record: Dict) -> Optional[float]:
+        """호출 한 번의 비용 (USD, 가격 정보가 없는 모델이면 None)"""
+        price = self.pricing.get(record['model'])
+        if price is None:
+            return None
+        input_price, output_price = price
+        cost = (record['input_tokens'] * input_price
+                + record['cache_creation_input_tokens'] * input_price * CACHE_WRITE_MULTIPLIER
+                + record['cache_read_input_tokens'] * input_price * CACHE_READ_MULTIPLIER
+                + record['output_tokens'] * output_price) / 1_000_000
+        return cost * BATCH_MULTIPLIER if record.get('batch') else cost
+
+    @staticmethod
+    def percentile(values: List[float], q: float) -> float:
+        """선형 보간 백분위수 (values가 비어 있으면 0)"""
+        if not values:
+            return 0.0
+        values = sorted(values)
+        position = (len(values) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    def summary(self, rows_done: int, remaining_rows: int, elapsed: float) -> str:
+        """
+        호출 지표 요약 문자열
+
+        Args:
+            rows_done: 이번 실행에서 처리한 행 수 (행당 비용 계산용, 캐시/중복/규칙으로 호출 없이 끝난 행 포함)
+            remaining_rows: 아직 처리하지 않은 행 수 (예상 비용 계산용)
+            elapsed: 실행 전체 소요 시간(초)
+        """
+        succeeded = [call for call in self.calls if call['ok']]
+        lines = [f"API 호출 지표: {len(self.calls)}회 (실패 {len(self.calls) - len(succeeded)}회, "
+                 f"재시도 {sum(call['attempts'] - 1 for call in self.calls)}회)"]
+        if not succeeded:
+            return lines[0]
+
+        # 배치 요청은 호출별 응답 시간이 없으므로 지연 시간/호출 기준 처리 속도에서 제외
+        timed = [call for call in succeeded if not call.get('batch')]
+        latencies = [call['seconds'] for call in timed]
+        if timed:
+            lines.append(f"  - 지연 시간: p50 {self.percentile(latencies, 50):.2f}초 / p95 {self.percentile(latencies, 95):.2f}초")
+            for model in sorted({call['model'] for call in timed}):
+                model_latencies = [call['seconds'] for call in timed if call['model'] == model]
+                lines.append(f"    · {model}: {len(model_latencies)}회, p50 {self.percentile(model_latencies, 50):.2f}초 / "
+                             f"p95 {self.percentile(model_latencies, 95):.2f}초")
+
+        totals = {key: sum(call[key] for call in succeeded) for key in TOKEN_KEYS}
+        prompt_tokens = totals['input_tokens'] + totals['cache_creation_input_tokens'] + totals['cache_read_input_tokens']
+        speed = f"입력+출력 {(prompt_tokens + totals['output_tokens']) / max(elapsed, 1e-9):.1f} 토큰/초 (실행 시간 기준)"
+        if timed:
+            timed_output = sum(call['output_tokens'] for call in timed)
+            speed = f"출력 {timed_output / max(sum(latencies), 1e-9):.1f} 토큰/초 (호출 기준), " + speed
+        lines.append(f"  - 처리 속도: {speed}")
+
+        costs = [self.cost(call) for call in succeeded]
+        unknown = sorted({call['model'] for call, cost in zip(succeeded, costs) if cost is None})
+        total_cost = sum(cost for cost in costs if cost is not None)
+        per_row = total_cost / rows_done if rows_done else 0.0
+        line = (f"  - 비용: ${total_cost:.4f} (행당 ${per_row:.5f}) → 남은 {remaining_rows:,}행 예상 "
+                f"${per_row * remaining_rows:.2f}")
+        if unknown:
+            line += f" (가격 정보 없음: {', '.join(unknown)})"
+        lines.append(line)
+        return '\n'.join(lines)
@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 from pathlib import Path
+from image_manifest import ImageManifest, IMAGE_EXTENSIONS
 
 def add_extensions_to_img_url():
     """
@@ -33,15 +34,12 @@ def add_extensions_to_img_url():
         print(f"{image_folder} 폴더를 찾을 수 없습니다.")
         return
     
-    # 이미지 파일 목록 가져오기 (파일명 -> 확장자 매핑)
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
-    image_map = {}  # {파일명(확장자제외): 확장자}
-    
-    for file_path in image_folder.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-            file_name_without_ext = file_path.stem
-            file_extension = file_path.suffix
-            image_map[file_name_without_ext] = file_extension
+    # 이미지 파일 목록 가져오기 (파일명 -> 확장자 매핑, 폴더를 훑지 않고 매니페스트 조회)
+    image_extensions = IMAGE_EXTENSIONS
+    manifest = ImageManifest(image_folder)
+    print(manifest.summary(manifest.refresh()))
+    image_map = {stem: entry.extension for stem, entry in manifest.stem_map().items()}  # {파일명(확장자제외): 확장자}
+    manifest.close()
     
     print(f"{len(image_map)}개의 이미지 파일을 발견했습니다.")
     
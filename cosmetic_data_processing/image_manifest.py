@@ -0,0 +1,228 @@
+"""
+이미지 폴더 영구 매니페스트 (sqlite)
+
+이미지 파일마다 경로, 파일명(확장자 제외), 확장자, 크기, 수정 시각, 내용 해시(sha256)를 저장하고
+처리 스크립트들은 폴더를 매번 훑는 대신 이 매니페스트를 조회합니다.
+
+- 갱신(refresh)은 폴더 수정 시각 기준 증분 방식: 목록이 바뀌지 않은 폴더는 stat 한 번으로 건너뛰고,
+  바뀐 폴더만 다시 읽어서 크기/수정 시각이 달라진 파일만 해시를 다시 계산
+- 이름 변경/이동된 파일은 (크기, 수정 시각)이 같은 사라진 파일의 해시를 재사용
+- 파일을 옮기거나 이름을 바꾸는 스크립트는 record_rename으로 매니페스트도 같이 수정
+- 폴더 목록은 그대로 두고 파일 내용만 덮어쓴 경우는 감지하지 못하므로 refresh(full=True)로 전체 확인
+"""
+
+import os
+import sqlite3
+import hashlib
+from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+# path, dir은 이미지 폴더 기준 상대 경로 (최상위 폴더의 dir은 '')
+ImageEntry = namedtuple('ImageEntry', ['path', 'dir', 'stem', 'extension', 'size', 'mtime_ns', 'sha256'])
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """파일 내용의 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageManifest:
+    def __init__(self, image_folder, db_path: str = None, hash_workers: int = 8):
+        """
+        Args:
+            image_folder: 이미지 폴더 (예: "화장품_이미지")
+            db_path: sqlite 파일 경로 (None이면 "<이미지 폴더>.manifest.sqlite")
+            hash_workers: 해시 계산 스레드 수
+        """
+        self.root = Path(image_folder)
+        self.db_path = db_path or f"{self.root}.manifest.sqlite"
+        self.hash_workers = hash_workers
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                stem TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS images_dir ON images (dir);
+            CREATE INDEX IF NOT EXISTS images_stem ON images (stem);
+            CREATE INDEX IF NOT EXISTS images_sha256 ON images (sha256);
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime_ns INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _split(rel_path: str) -> Tuple[str, str, str]:
+        """상대 경로 → (폴더, 파일명(확장자 제외), 확장자)"""
+        rel_dir, name = rel_path.rsplit('/', 1) if '/' in rel_path else ('', rel_path)
+        stem, extension = os.path.splitext(name)
+        return rel_dir, stem, extension
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        폴더 변경 사항을 매니페스트에 반영
+
+        Args:
+            full: True면 폴더 수정 시각과 관계없이 모든 폴더를 다시 읽음
+
+        Returns:
+            {'dirs': 확인한 폴더 수, 'rescanned': 다시 읽은 폴더 수,
+             'added', 'updated', 'moved', 'removed': 파일 수, 'hashed': 해시 계산 수}
+        """
+        stats = {'dirs': 0, 'rescanned': 0, 'added': 0, 'updated': 0, 'removed': 0, 'hashed': 0}
+        known_dirs = dict(self._conn.execute("SELECT path, mtime_ns FROM dirs"))
+        seen_dirs = set()
+        vanished = {}   # (크기, 수정 시각) → [해시, ...]: 사라진 파일 (이름 변경/이동 감지용)
+        pending = []    # 해시를 (다시) 계산할 파일: (상대 경로, 크기, 수정 시각, 추가 여부)
+
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                dir_mtime = os.stat(self.root / rel_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs.add(rel_dir)
+            stats['dirs'] += 1
+
+            if not full and known_dirs.get(rel_dir) == dir_mtime:
+                # 목록이 바뀌지 않은 폴더: 저장된 하위 폴더만 따라 내려감
+                stack.extend(path for (path,) in self._conn.execute("SELECT path FROM dirs WHERE parent = ?", (rel_dir,)))
+                continue
+
+            stats['rescanned'] += 1
+            existing = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM images WHERE dir = ?", (rel_dir,))}
+            current = set()
+            with os.scandir(self.root / rel_dir) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                        st = entry.stat()
+                        current.add(rel_path)
+                        previous = existing.get(rel_path)
+                        if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+                            pending.append((rel_path, st.st_size, st.st_mtime_ns, previous is None))
+
+            for rel_path in existing.keys() - current:
+                size, mtime_ns, sha256 = existing[rel_path]
+                vanished.setdefault((size, mtime_ns), []).append(sha256)
+            self._conn.executemany("DELETE FROM images WHERE path = ?",
+                                   [(rel_path,) for rel_path in existing.keys() - current])
+            parent = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ('' if rel_dir else None)
+            self._conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                               (rel_dir, parent, dir_mtime))
+
+        # 없어진 폴더 (하위 폴더 포함) 정리
+        for rel_dir in known_dirs.keys() - seen_dirs:
+            for size, mtime_ns, sha256 in self._conn.execute(
+                    "SELECT size, mtime_ns, sha256 FROM images WHERE dir = ?", (rel_dir,)).fetchall():
+                vanished.setdefault((size, mtime_ns), []).append(sha256)
+            self._conn.execute("DELETE FROM images WHERE dir = ?", (rel_dir,))
+            self._conn.execute("DELETE FROM dirs WHERE path = ?", (rel_dir,))
+
+        # 새 파일/바뀐 파일 해시 (이동된 파일은 (크기, 수정 시각)이 하나로만 대응될 때 사라진 파일의 해시 재사용)
+        candidates = {}
+        for rel_path, size, mtime_ns, is_new in pending:
+            if is_new:
+                candidates.setdefault((size, mtime_ns), []).append(rel_path)
+        reused = {paths[0]: vanished[key][0] for key, paths in candidates.items()
+                  if len(paths) == 1 and len(vanished.get(key, [])) == 1}
+        to_hash = [rel_path for rel_path, _, _, _ in pending if rel_path not in reused]
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as executor:
+            hashes = dict(zip(to_hash, executor.map(lambda rel_path: file_sha256(self.root / rel_path), to_hash)))
+        hashes.update(reused)
+
+        rows = []
+        for rel_path, size, mtime_ns, is_new in pending:
+            rows.append((rel_path, *self._split(rel_path), size, mtime_ns, hashes[rel_path]))
+            stats['added' if is_new else 'updated'] += 1
+        self._conn.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        stats['hashed'] = len(to_hash)
+        stats['moved'] = len(reused)
+        stats['added'] -= len(reused)
+        stats['removed'] = sum(len(items) for items in vanished.values()) - len(reused)
+        self._conn.commit()
+        return stats
+
+    def summary(self, stats: Dict) -> str:
+        """refresh 결과 문자열"""
+        return (f"이미지 매니페스트: {len(self)}개 ({self.db_path}) - 폴더 {stats['dirs']}개 중 {stats['rescanned']}개 다시 읽음, "
+                f"추가 {stats['added']} / 변경 {stats['updated']} / 이동 {stats['moved']} / 삭제 {stats['removed']}, "
+                f"해시 계산 {stats['hashed']}개")
+
+    def entries(self, rel_dir: Optional[str] = None) -> List[ImageEntry]:
+        """이미지 목록 (rel_dir을 주면 그 폴더의 파일만, ''이면 최상위 폴더)"""
+        query = "SELECT path, dir, stem, extension, size, mtime_ns, sha256 FROM images"
+        if rel_dir is None:
+            rows = self._conn.execute(query + " ORDER BY path")
+        else:
+            rows = self._conn.execute(query + " WHERE dir = ? ORDER BY path", (rel_dir,))
+        return [ImageEntry(*row) for row in rows]
+
+    def stem_map(self, rel_dir: str = '') -> Dict[str, ImageEntry]:
+        """{파일명(확장자 제외): 항목} (같은 이름이 여러 개면 경로순 마지막 항목)"""
+        return {entry.stem: entry for entry in self.entries(rel_dir)}
+
+    def subdirectories(self) -> List[str]:
+        """최상위를 제외한 하위 폴더 상대 경로 목록"""
+        return [path for (path,) in self._conn.execute("SELECT path FROM dirs WHERE path != '' ORDER BY path")]
+
+    def path_of(self, entry: ImageEntry) -> Path:
+        """항목의 실제 파일 경로"""
+        return self.root / entry.path
+
+    def record_rename(self, old_rel_path: str, new_rel_path: str):
+        """파일 이름 변경/이동을 매니페스트에 반영 (commit은 commit()에서 한 번에)"""
+        self._conn.execute("UPDATE OR REPLACE images SET path = ?, dir = ?, stem = ?, extension = ? WHERE path = ?",
+                           (new_rel_path, *self._split(new_rel_path), old_rel_path))
+
+    def record_renames(self, renames: Iterable[Tuple[str, str]]):
+        """
+        여러 파일 이름 변경을 한 번에 반영하고 commit
+
+        바뀐 폴더의 수정 시각도 같이 갱신해서 다음 refresh에서 그 폴더를 다시 읽지 않게 함
+        (스크립트가 직접 바꾼 내용은 이미 반영했으므로)
+        """
+        touched = set()
+        for old_rel_path, new_rel_path in renames:
+            self.record_rename(old_rel_path, new_rel_path)
+            touched.update((self._split(old_rel_path)[0], self._split(new_rel_path)[0]))
+        for rel_dir in touched:
+            try:
+                dir_mtime = os.stat(self.root / rel_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            self._conn.execute("UPDATE dirs SET mtime_ns = ? WHERE path = ?", (dir_mtime, rel_dir))
+        self.commit()
+
+    def commit(self):
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
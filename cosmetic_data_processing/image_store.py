@@ -0,0 +1,344 @@
+"""
+내용 주소 이미지 저장소 (content-addressed store)
+
+이미지 파일을 내용 해시(sha256)로 한 번만 저장하고, 제품명/img_url/id 같은 파일명 체계는
+저장소 객체를 가리키는 하드링크(또는 심볼릭 링크) 폴더("뷰")로 보여줍니다.
+
+- 객체: <저장소>/objects/ab/abcdef....jpg (같은 내용의 이미지는 하나만 저장)
+- 뷰: <저장소>/views/<뷰 이름>/<파일명> → 객체 링크
+- 이름 변경은 sqlite의 (뷰, 파일명 → 해시) 메타데이터만 바꾸고, materialize가 바뀐 링크만 다시 만듦
+- 해시는 이미지 매니페스트(image_manifest.py)에 이미 계산된 값을 그대로 사용
+- 객체는 가능하면 원본을 하드링크해서 만들므로 원본을 제자리에서 덮어쓰면 객체도 바뀜 (verify()로 확인)
+"""
+
+import os
+import sys
+import time
+import errno
+import shutil
+import sqlite3
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from image_manifest import ImageManifest, file_sha256
+from rename_images_by_id import load_id_mapping
+
+
+def _link_or_copy(source: str, target: str, mode: str) -> str:
+    """
+    source를 target으로 링크 (실패하면 복사)
+
+    Returns:
+        실제로 사용한 방식 ('hardlink', 'symlink', 'copy')
+    """
+    try:
+        if mode == 'symlink':
+            os.symlink(os.path.relpath(source, os.path.dirname(target)), target)
+        else:
+            os.link(source, target)
+        return mode
+    except OSError as e:
+        # 다른 파일 시스템이거나 링크 권한이 없으면 (Windows 심볼릭 링크 등) 복사
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copy2(source, target)
+        return 'copy'
+
+
+def _run_chunked(function, items: List, workers: int, chunk_size: int = 1000) -> Tuple[List, List]:
+    """items를 chunk_size개씩 묶어 스레드 풀로 실행 (function(item)의 반환값 목록과 [(item, 오류 메시지)])"""
+    def run_chunk(chunk):
+        done, failed = [], []
+        for item in chunk:
+            try:
+                done.append(function(item))
+            except Exception as e:
+                failed.append((item, str(e)))
+        return done, failed
+
+    done, failed = [], []
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_done, chunk_failed in executor.map(run_chunk, chunks):
+            done.extend(chunk_done)
+            failed.extend(chunk_failed)
+    return done, failed
+
+
+class ImageStore:
+    def __init__(self, root: str = "화장품_이미지_store", link_mode: str = 'hardlink', workers: int = 8):
+        """
+        Args:
+            root: 저장소 폴더
+            link_mode: 객체/뷰를 만드는 방식 ('hardlink' 또는 'symlink', 안 되면 복사)
+            workers: 파일 작업 스레드 수
+        """
+        if link_mode not in ('hardlink', 'symlink'):
+            raise ValueError(f"link_mode는 'hardlink' 또는 'symlink'여야 합니다: {link_mode}")
+        self.root = Path(root)
+        self.link_mode = link_mode
+        self.workers = workers
+        (self.root / 'objects').mkdir(parents=True, exist_ok=True)
+        (self.root / 'views').mkdir(exist_ok=True)
+        self._conn = sqlite3.connect(str(self.root / 'store.sqlite'), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS names (
+                view TEXT NOT NULL,
+                name TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (view, name)
+            );
+            CREATE INDEX IF NOT EXISTS names_sha256 ON names (sha256);
+            -- 뷰 폴더에 실제로 만들어 둔 링크 (materialize가 바뀐 것만 다시 만들기 위한 기록)
+            CREATE TABLE IF NOT EXISTS materialized (
+                view TEXT NOT NULL,
+                name TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (view, name)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def object_path(self, sha256: str, extension: str) -> Path:
+        """객체 파일 경로 (해시 앞 두 글자로 폴더를 나눔)"""
+        return self.root / 'objects' / sha256[:2] / f"{sha256}{extension.lower()}"
+
+    def _objects(self) -> Dict[str, str]:
+        """{해시: 확장자}"""
+        return dict(self._conn.execute("SELECT sha256, extension FROM objects"))
+
+    def ingest(self, manifest: ImageManifest, view: str, rel_dir: Optional[str] = '') -> Dict:
+        """
+        매니페스트의 이미지를 저장소에 넣고 파일명 그대로 뷰를 만듦 (뷰의 기존 이름은 교체)
+
+        Args:
+            manifest: 갱신(refresh)된 이미지 매니페스트
+            view: 뷰 이름 (예: '제품명')
+            rel_dir: 가져올 폴더 ('' = 최상위, None = 전체)
+
+        Returns:
+            {'images': 이미지 수, 'stored': 새로 저장한 객체 수, 'deduplicated': 이미 있던 내용이라 저장하지 않은 수,
+             'copied': 링크 대신 복사한 수, 'failed': 실패 수}
+        """
+        entries = manifest.entries(rel_dir)
+        known = self._objects()
+        new_objects = {}
+        for entry in entries:
+            if entry.sha256 not in known and entry.sha256 not in new_objects:
+                new_objects[entry.sha256] = entry
+
+        # 객체는 하드링크로 만들어 데이터를 복사하지 않음 (심볼릭 링크 모드여도 원본이 옮겨질 수 있으므로 하드링크)
+        def store_object(entry):
+            target = self.object_path(entry.sha256, entry.extension)
+            target.parent.mkdir(exist_ok=True)
+            if target.exists():
+                return entry, 'exists'
+            return entry, _link_or_copy(str(manifest.path_of(entry)), str(target), 'hardlink')
+
+        done, failed = _run_chunked(store_object, list(new_objects.values()), self.workers)
+        self._conn.executemany("INSERT OR REPLACE INTO objects (sha256, extension, size) VALUES (?, ?, ?)",
+                               [(entry.sha256, entry.extension.lower(), entry.size) for entry, _ in done])
+        failed_hashes = {entry.sha256 for entry, _ in failed}
+
+        names = {f"{entry.stem}{entry.extension}": entry.sha256
+                 for entry in entries if entry.sha256 not in failed_hashes}
+        self.set_view(view, names)
+        return {'images': len(entries), 'stored': len(done), 'deduplicated': len(entries) - len(new_objects),
+                'copied': sum(1 for _, how in done if how == 'copy'), 'failed': len(failed)}
+
+    def set_view(self, view: str, names: Dict[str, str]):
+        """뷰의 {파일명: 해시}를 통째로 교체 (메타데이터만 변경, 폴더는 materialize에서 반영)"""
+        self._conn.execute("DELETE FROM names WHERE view = ?", (view,))
+        self._conn.executemany("INSERT INTO names (view, name, sha256) VALUES (?, ?, ?)",
+                               [(view, name, sha256) for name, sha256 in names.items()])
+        self._conn.commit()
+
+    def view(self, view: str) -> Dict[str, str]:
+        """뷰의 {파일명: 해시}"""
+        return dict(self._conn.execute("SELECT name, sha256 FROM names WHERE view = ? ORDER BY name", (view,)))
+
+    def views(self) -> List[str]:
+        return [view for (view,) in self._conn.execute("SELECT DISTINCT view FROM names ORDER BY view")]
+
+    def rename_view(self, source_view: str, target_view: str, mapping: Dict[str, str]) -> Dict:
+        """
+        source_view의 파일명을 mapping으로 바꿔 target_view를 만듦 (같은 이름이면 제자리 이름 변경)
+
+        파일을 옮기지 않고 메타데이터만 바꾸므로 순환(1 → 2 → 1)도 그대로 처리됨.
+        확장자는 원래 파일 것을 유지하고, 여러 파일이 같은 이름으로 가면 먼저 나온 것만 사용.
+
+        Args:
+            mapping: {현재 파일명(확장자 제외): 새 파일명(확장자 제외)}
+
+        Returns:
+            {'renamed': 변경 수, 'not_matched': 매핑에 없는 파일 수, 'conflicts': 대상 이름 중복 수}
+        """
+        names, stats = {}, {'renamed': 0, 'not_matched': 0, 'conflicts': 0}
+        for name, sha256 in self.view(source_view).items():
+            stem, extension = os.path.splitext(name)
+            if stem not in mapping:
+                stats['not_matched'] += 1
+                continue
+            new_name = f"{mapping[stem]}{extension}"
+            if new_name.lower() in names:
+                stats['conflicts'] += 1
+                continue
+            names[new_name.lower()] = (new_name, sha256)
+            stats['renamed'] += 1
+        self.set_view(target_view, dict(names.values()))
+        return stats
+
+    def materialize(self, view: str, full: bool = False) -> Dict:
+        """
+        뷰 폴더를 메타데이터와 맞춤 (지난번과 달라진 링크만 만들고/지움)
+
+        Args:
+            full: True면 기록을 무시하고 폴더를 다시 읽어 전부 맞춤 (뷰 폴더를 직접 건드린 경우)
+
+        Returns:
+            {'linked': 새로 만든 링크 수, 'removed': 지운 링크 수, 'unchanged': 그대로 둔 수, 'failed': 실패 수}
+        """
+        view_dir = self.root / 'views' / view
+        view_dir.mkdir(exist_ok=True)
+        desired = self.view(view)
+        if full:
+            self._conn.execute("DELETE FROM materialized WHERE view = ?", (view,))
+            current = {name: None for name in os.listdir(view_dir)}
+        else:
+            current = dict(self._conn.execute("SELECT name, sha256 FROM materialized WHERE view = ?", (view,)))
+
+        objects = self._objects()
+        to_remove = [name for name in current if name not in desired]
+        to_link = [(name, sha256) for name, sha256 in desired.items() if current.get(name) != sha256]
+        base = str(view_dir)
+
+        def remove(name):
+            try:
+                os.unlink(os.path.join(base, name))
+            except FileNotFoundError:
+                pass
+            return name
+
+        # 임시 이름으로 링크를 만든 뒤 os.replace로 교체 (이미 있는 이름도 한 번에 바뀜)
+        def link(item):
+            name, sha256 = item
+            target = os.path.join(base, name)
+            temp = os.path.join(base, f".linking-{name}")
+            if os.path.lexists(temp):
+                os.unlink(temp)
+            _link_or_copy(str(self.object_path(sha256, objects[sha256])), temp, self.link_mode)
+            os.replace(temp, target)
+            return item
+
+        removed, remove_failed = _run_chunked(remove, to_remove, self.workers)
+        linked, link_failed = _run_chunked(link, to_link, self.workers)
+
+        self._conn.executemany("DELETE FROM materialized WHERE view = ? AND name = ?", [(view, name) for name in removed])
+        self._conn.executemany("INSERT OR REPLACE INTO materialized (view, name, sha256) VALUES (?, ?, ?)",
+                               [(view, name, sha256) for name, sha256 in linked])
+        self._conn.commit()
+        return {'linked': len(linked), 'removed': len(removed),
+                'unchanged': len(desired) - len(to_link), 'failed': len(remove_failed) + len(link_failed)}
+
+    def drop_view(self, view: str):
+        """뷰 메타데이터와 폴더 삭제 (객체는 gc에서 정리)"""
+        self.set_view(view, {})
+        self.materialize(view)
+        self._conn.execute("DELETE FROM materialized WHERE view = ?", (view,))
+        self._conn.commit()
+        shutil.rmtree(self.root / 'views' / view, ignore_errors=True)
+
+    def gc(self) -> Tuple[int, int]:
+        """어떤 뷰에서도 쓰지 않는 객체 삭제 → (삭제 수, 바이트)"""
+        unused = self._conn.execute(
+            "SELECT sha256, extension, size FROM objects WHERE sha256 NOT IN (SELECT sha256 FROM names)").fetchall()
+        for sha256, extension, _ in unused:
+            try:
+                self.object_path(sha256, extension).unlink()
+            except FileNotFoundError:
+                pass
+        self._conn.executemany("DELETE FROM objects WHERE sha256 = ?", [(sha256,) for sha256, _, _ in unused])
+        self._conn.commit()
+        return len(unused), sum(size for _, _, size in unused)
+
+    def verify(self) -> List[str]:
+        """객체 내용이 해시와 맞는지 확인 → 맞지 않거나 없는 객체 해시 목록 (원본을 덮어쓴 경우 등)"""
+        def check(item):
+            sha256, extension = item
+            path = self.object_path(sha256, extension)
+            return sha256 if not path.exists() or file_sha256(path) != sha256 else None
+
+        done, failed = _run_chunked(check, list(self._objects().items()), self.workers)
+        return [sha256 for sha256 in done if sha256] + [item[0] for item, _ in failed]
+
+    def stats(self) -> Dict:
+        """{'objects': 객체 수, 'stored_bytes': 실제 저장 크기, 'names': 전체 뷰 파일 수, 'logical_bytes': 뷰 기준 크기}"""
+        objects, stored_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        names, logical_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(objects.size), 0) FROM names JOIN objects USING (sha256)").fetchone()
+        return {'objects': objects, 'stored_bytes': stored_bytes, 'names': names, 'logical_bytes': logical_bytes}
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"이미지 저장소: 객체 {stats['objects']}개 ({stats['stored_bytes'] / 1e6:.1f}MB), "
+                f"뷰 {len(self.views())}개 / 파일 {stats['names']}개 ({stats['logical_bytes'] / 1e6:.1f}MB) - "
+                f"중복 제거로 {(stats['logical_bytes'] - stats['stored_bytes']) / 1e6:.1f}MB 절약 ({self.root})")
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    """
+    메인 실행 함수: 이미지 폴더를 저장소에 넣고 제품명 뷰와 id 뷰를 만듦
+    """
+    print("=" * 60)
+    print("내용 주소 이미지 저장소 구축 스크립트")
+    print("=" * 60)
+
+    # ============ 여기에 설정값 입력 ============
+    image_folder = "화장품_이미지"
+    store_root = "화장품_이미지_store"
+    mapping_file = "cosmetic_data_processed_with_columns.xlsx"  # 제품명 → img_url(id) 매핑
+    link_mode = 'symlink' if "--symlink" in sys.argv else 'hardlink'
+    # ==========================================
+
+    if not Path(image_folder).exists():
+        print(f"{image_folder} 폴더를 찾을 수 없습니다.")
+        return
+
+    started_at = time.time()
+    manifest = ImageManifest(image_folder)
+    print(manifest.summary(manifest.refresh()))
+    store = ImageStore(store_root, link_mode)
+    try:
+        stats = store.ingest(manifest, '제품명')
+        print(f"저장: 이미지 {stats['images']}개 중 새 객체 {stats['stored']}개, 중복 {stats['deduplicated']}개 "
+              f"(복사 {stats['copied']}개, 실패 {stats['failed']}개)")
+
+        mapping = load_id_mapping(mapping_file, '제품명', 'img_url')
+        stats = store.rename_view('제품명', 'id', mapping)
+        print(f"id 뷰: 변경 {stats['renamed']}개, 매핑 없음 {stats['not_matched']}개, 이름 중복 {stats['conflicts']}개")
+
+        for view in ('제품명', 'id'):
+            stats = store.materialize(view)
+            print(f"{store.root / 'views' / view}: 링크 {stats['linked']}개 생성, {stats['removed']}개 삭제, "
+                  f"{stats['unchanged']}개 그대로 (실패 {stats['failed']}개)")
+        print(store.summary())
+        print(f"소요 시간: {time.time() - started_at:.2f}초")
+    except Exception as e:
+        print(f"오류 발생: {str(e)}")
+    finally:
+        store.close()
+        manifest.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,115 @@
 import os
+import sys
+import csv
+import time
+import errno
 import shutil
+import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from image_manifest import ImageManifest
 
-def move_all_images_to_root():
+def plan_moves(entries, root_names):
     """
-    화장품_이미지 폴더 내의 모든 하위 폴더에서 이미지 파일들을 
+    하위 폴더 이미지를 상위 폴더로 옮길 계획을 메모리에서 한 번에 계산하는 함수
+    
+    파일명이 겹치면 경로순으로 앞선 파일이 원래 이름을 갖고, 나머지는 "파일명_1.jpg", "파일명_2.jpg" ...
+    처럼 비어 있는 가장 작은 번호를 붙임 (같은 입력이면 항상 같은 계획).
+    이미 상위 폴더에 있는 파일과 내용(해시)까지 같은 파일은 중복으로 보고 옮기지 않음.
+    
+    Args:
+        entries: 옮길 이미지 매니페스트 항목 (하위 폴더 파일)
+        root_names: {상위 폴더 파일명: 내용 해시}
+    
+    Returns:
+        [(원본 상대 경로, 대상 파일명, 상태)] - 상태는 'move', 'renamed'(번호 붙임), 'duplicate'(옮기지 않음)
+    """
+    # 대소문자를 구분하지 않는 파일 시스템(Windows/macOS)에서도 겹치지 않도록 소문자로 비교
+    taken = {name.lower(): sha256 for name, sha256 in root_names.items()}
+    plan = []
+    for entry in sorted(entries, key=lambda entry: entry.path):
+        name = f"{entry.stem}{entry.extension}"
+        if name.lower() not in taken:
+            taken[name.lower()] = entry.sha256
+            plan.append((entry.path, name, 'move'))
+            continue
+        if taken[name.lower()] == entry.sha256:
+            plan.append((entry.path, name, 'duplicate'))
+            continue
+        
+        number = 1
+        while f"{entry.stem}_{number}{entry.extension}".lower() in taken:
+            number += 1
+        name = f"{entry.stem}_{number}{entry.extension}"
+        taken[name.lower()] = entry.sha256
+        plan.append((entry.path, name, 'renamed'))
+    return plan
+
+def _move_file(source_path, target_path):
+    """
+    대상 파일을 덮어쓰지 않고 이동 (대상이 이미 있으면 FileExistsError)
+
+    os.rename은 POSIX에서 기존 대상을 그대로 덮어쓰므로, 하드 링크를 만든 뒤(대상이 있으면 실패) 원본을 지움.
+    다른 파일 시스템이거나 하드 링크를 지원하지 않으면 대상이 없는지 확인한 뒤 이동.
+    """
+    try:
+        os.link(source_path, target_path)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if os.path.lexists(target_path):
+            raise FileExistsError(errno.EEXIST, "대상 파일이 이미 존재합니다", str(target_path))
+        if e.errno == errno.EXDEV:
+            shutil.move(str(source_path), str(target_path))  # 복사 후 삭제
+        else:
+            os.rename(source_path, target_path)
+        return
+    os.unlink(source_path)
+
+def execute_moves(base_path, moves, workers=8, chunk_size=1000):
+    """
+    계획된 이동을 스레드 풀로 실행하는 함수 (파일마다 작업을 만들지 않고 chunk_size개씩 묶어서 전달)
+    
+    Args:
+        base_path: 이미지 폴더
+        moves: [(원본 상대 경로, 대상 파일명)]
+        workers: 동시 이동 스레드 수
+        chunk_size: 스레드 하나가 한 번에 처리할 파일 수
+    
+    Returns:
+        (완료된 [(원본 상대 경로, 대상 파일명)], [(원본 상대 경로, 오류 메시지)])
+    """
+    base = str(base_path)
+    
+    def move_chunk(chunk):
+        done, failed = [], []
+        for source, target in chunk:
+            try:
+                _move_file(os.path.join(base, source), os.path.join(base, target))
+                done.append((source, target))
+            except Exception as e:
+                failed.append((source, str(e)))
+        return done, failed
+    
+    chunks = [moves[i:i + chunk_size] for i in range(0, len(moves), chunk_size)]
+    done, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_done, chunk_failed in executor.map(move_chunk, chunks):
+            done.extend(chunk_done)
+            failed.extend(chunk_failed)
+            processed = len(done) + len(failed)
+            if processed % 10000 < chunk_size or processed == len(moves):
+                print(f"진행률: {processed}/{len(moves)}")
+    return done, failed
+
+def move_all_images_to_root(dry_run=False, workers=8):
+    """
+    화장품_이미지 폴더 내의 모든 하위 폴더에서 이미지 파일들을
     상위 폴더(화장품_이미지)로 이동하는 함수
+    
+    Args:
+        dry_run: True면 이동 계획만 출력하고 "화장품_이미지_move_plan.csv"로 저장
+        workers: 동시 이동 스레드 수
     """
     
     # 기본 경로 설정
@@ -13,129 +117,149 @@ def move_all_images_to_root():
     
     if not base_path.exists():
         print(f"❌ {base_path} 폴더를 찾을 수 없습니다.")
-        return
+        return 0, 0, 0
     
-    # 지원하는 이미지 확장자
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+    print("🔍 이미지 파일들을 검색 중...")
     
-    # 이동할 파일들 정보 수집
-    files_to_move = []
-    moved_count = 0
-    skipped_count = 0
-    error_count = 0
+    # 폴더를 훑지 않고 매니페스트에서 이미지 조회 (바뀐 폴더만 증분 갱신)
+    manifest = ImageManifest(base_path)
+    print(manifest.summary(manifest.refresh()))
+    entries = manifest.entries()
+    root_names = {f"{entry.stem}{entry.extension}": entry.sha256 for entry in entries if entry.dir == ''}
+    # 상위 폴더(화장품_이미지)의 파일은 건너뛰기
+    plan = plan_moves([entry for entry in entries if entry.dir != ''], root_names)
     
-    print("🔍 이미지 파일들을 검색 중...")
+    print(f"📊 총 {len(plan)}개의 이미지 파일을 발견했습니다.")
     
-    # 모든 하위 폴더 탐색
-    for root, dirs, files in os.walk(base_path):
-        root_path = Path(root)
-        
-        # 상위 폴더(화장품_이미지)는 건너뛰기
-        if root_path == base_path:
-            continue
-            
-        for file in files:
-            file_path = root_path / file
-            file_extension = file_path.suffix.lower()
-            
-            # 이미지 파일인지 확인
-            if file_extension in image_extensions:
-                target_path = base_path / file
-                files_to_move.append((file_path, target_path))
-    
-    print(f"📊 총 {len(files_to_move)}개의 이미지 파일을 발견했습니다.")
-    
-    if len(files_to_move) == 0:
+    if len(plan) == 0:
         print("✅ 이동할 이미지 파일이 없습니다.")
-        return
+        manifest.close()
+        return 0, 0, 0
     
-    # 사용자 확인
-    print("\n📋 이동할 파일들 (처음 10개만 표시):")
-    for i, (source, target) in enumerate(files_to_move[:10]):
-        print(f"  {i+1}. {source.relative_to(base_path)} → {target.name}")
+    moves = [(source, target) for source, target, status in plan if status != 'duplicate']
+    renamed = [(source, target) for source, target, status in plan if status == 'renamed']
+    duplicates = [(source, target) for source, target, status in plan if status == 'duplicate']
     
-    if len(files_to_move) > 10:
-        print(f"  ... 그리고 {len(files_to_move) - 10}개 더")
+    # 이동 계획 요약
+    print(f"\n📋 이동 계획: 이동 {len(moves)}개 (이름 충돌로 번호 붙임 {len(renamed)}개), "
+          f"상위 폴더와 내용이 같아 건너뜀 {len(duplicates)}개")
+    print("이동할 파일들 (처음 10개만 표시):")
+    for i, (source, target) in enumerate(moves[:10]):
+        print(f"  {i+1}. {source} → {target}")
+    if len(moves) > 10:
+        print(f"  ... 그리고 {len(moves) - 10}개 더")
+    if renamed:
+        print("번호를 붙인 파일 (처음 5개만 표시):")
+        for i, (source, target) in enumerate(renamed[:5]):
+            print(f"  {i+1}. {source} → {target}")
+    
+    if dry_run:
+        report_path = f"{base_path}_move_plan.csv"
+        with open(report_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['원본', '대상', '상태'])
+            writer.writerows(plan)
+        print(f"\n📝 드라이런: 파일을 옮기지 않았습니다. 전체 계획: {report_path}")
+        manifest.close()
+        return 0, len(duplicates), 0
     
     # 파일 이동 시작
-    print(f"\n🚀 이미지 파일 이동을 시작합니다...")
+    print(f"\n🚀 이미지 파일 이동을 시작합니다... (스레드 {workers}개)")
+    started_at = time.time()
+    done, failed = execute_moves(base_path, moves, workers)
+    elapsed = time.time() - started_at
     
-    for i, (source_path, target_path) in enumerate(files_to_move, 1):
-        try:
-            # 진행률 표시
-            if i % 10 == 0 or i == len(files_to_move):
-                print(f"진행률: {i}/{len(files_to_move)}")
-            
-            # 대상 파일이 이미 존재하는지 확인
-            if target_path.exists():
-                print(f"⚠️  파일이 이미 존재합니다: {target_path.name}")
-                skipped_count += 1
-                continue
-            
-            # 파일 이동
-            shutil.move(str(source_path), str(target_path))
-            moved_count += 1
-            
-        except Exception as e:
-            print(f"❌ 파일 이동 실패: {source_path.name} - {str(e)}")
-            error_count += 1
+    for source, error in failed[:10]:
+        print(f"❌ 파일 이동 실패: {source} - {error}")
     
+    # 이동을 매니페스트에 반영
+    manifest.record_renames(done)
+    manifest.close()
+    
+    moved_count, skipped_count, error_count = len(done), len(duplicates), len(failed)
     print(f"\n✅ 이미지 파일 이동 완료!")
     print(f"📊 결과 요약:")
-    print(f"  - 성공적으로 이동: {moved_count}개")
+    print(f"  - 성공적으로 이동: {moved_count}개 (번호 붙임 {len(renamed)}개)")
     print(f"  - 건너뛴 파일: {skipped_count}개")
     print(f"  - 오류 발생: {error_count}개")
+    print(f"  - 소요 시간: {elapsed:.2f}초 ({moved_count / max(elapsed, 1e-9):,.0f}개/초)")
     
     return moved_count, skipped_count, error_count
 
 def remove_empty_folders():
     """
     화장품_이미지 폴더 내의 빈 폴더들을 제거하는 함수
+    (아래에서 위로 한 번만 훑으면서 하위 폴더가 모두 지워지고 Thumbs.db만 남은 폴더까지 삭제)
     """
     base_path = Path("화장품_이미지")
     removed_folders = []
+    removed_paths = set()
     
     print(f"\n🗂️  빈 폴더 정리 중...")
     
-    # 하위 폴더부터 상위 폴더 순으로 정렬 (깊은 폴더부터 삭제)
-    all_dirs = []
-    for root, dirs, files in os.walk(base_path):
-        for dir_name in dirs:
-            dir_path = Path(root) / dir_name
-            all_dirs.append(dir_path)
-    
-    # 깊이 순으로 정렬 (깊은 폴더부터)
-    all_dirs.sort(key=lambda x: len(x.parts), reverse=True)
-    
-    for dir_path in all_dirs:
+    for root, dirs, files in os.walk(base_path, topdown=False):
+        dir_path = Path(root)
+        if dir_path == base_path:
+            continue
+        
+        # 남은 하위 폴더가 없고 파일이 Thumbs.db 같은 시스템 파일뿐이면 삭제
+        remaining_dirs = [name for name in dirs if str(dir_path / name) not in removed_paths]
+        if remaining_dirs or any(not name.lower().startswith('thumbs.db') for name in files):
+            continue
+        
         try:
-            # 폴더가 비어있는지 확인 (Thumbs.db 같은 시스템 파일 제외)
-            contents = list(dir_path.iterdir())
-            image_or_folder_contents = [
-                item for item in contents 
-                if not item.name.lower().startswith('thumbs.db')
-            ]
-            
-            if len(image_or_folder_contents) == 0:
-                # Thumbs.db 파일이 있다면 먼저 삭제
-                for item in contents:
-                    if item.name.lower().startswith('thumbs.db'):
-                        try:
-                            item.unlink()
-                        except:
-                            pass
-                
-                # 빈 폴더 삭제
-                dir_path.rmdir()
-                removed_folders.append(dir_path.name)
-                print(f"🗑️  삭제된 빈 폴더: {dir_path.name}")
-                
+            for name in files:
+                try:
+                    (dir_path / name).unlink()
+                except OSError:
+                    pass
+            dir_path.rmdir()
+            removed_paths.add(str(dir_path))
+            removed_folders.append(dir_path.name)
         except Exception as e:
             print(f"⚠️  폴더 삭제 실패: {dir_path.name} - {str(e)}")
     
+    for name in removed_folders[:10]:
+        print(f"🗑️  삭제된 빈 폴더: {name}")
+    if len(removed_folders) > 10:
+        print(f"  ... 그리고 {len(removed_folders) - 10}개 더")
     print(f"✅ 총 {len(removed_folders)}개의 빈 폴더를 삭제했습니다.")
     return removed_folders
 
+def benchmark_move(num_files=20000, num_folders=200, workers=(1, 8)):
+    """
+    임시 폴더에 가짜 이미지 트리를 만들어 기존 방식(파일마다 exists + shutil.move)과
+    계획 후 병렬 os.rename 방식의 처리량 비교
+    """
+    print(f"벤치마크: 하위 폴더 {num_folders}개, 이미지 {num_files}개")
+    
+    def make_tree(base):
+        for i in range(num_files):
+            folder = base / f"folder{i % num_folders}"
+            folder.mkdir(exist_ok=True)
+            (folder / f"{i}.jpg").write_bytes(b'')
+        return [(path.relative_to(base).as_posix(), path.name) for path in sorted(base.glob('*/*.jpg'))]
+    
+    with tempfile.TemporaryDirectory(dir='.') as temp_dir:
+        base = Path(temp_dir) / 'serial'
+        base.mkdir()
+        moves = make_tree(base)
+        started_at = time.perf_counter()
+        for source, target in moves:
+            if not (base / target).exists():
+                shutil.move(str(base / source), str(base / target))
+        elapsed = time.perf_counter() - started_at
+        print(f"  - 기존 방식 (순차 exists + shutil.move): {elapsed:.2f}초 ({num_files / elapsed:,.0f}개/초)")
+        
+        for worker_count in workers:
+            base = Path(temp_dir) / f'planned{worker_count}'
+            base.mkdir()
+            moves = make_tree(base)
+            started_at = time.perf_counter()
+            done, failed = execute_moves(base, moves, worker_count)
+            elapsed = time.perf_counter() - started_at
+            print(f"  - 계획 후 os.rename (스레드 {worker_count}개): {elapsed:.2f}초 ({len(done) / elapsed:,.0f}개/초)")
+
 def main():
     """
     메인 실행 함수
@@ -144,6 +268,15 @@ def main():
     print("🖼️  화장품 이미지 파일 정리 스크립트")
     print("=" * 60)
     
+    # ============ 여기에 설정값 입력 ============
+    dry_run = "--dry-run" in sys.argv   # True면 이동 계획만 출력/저장
+    workers = 8                         # 동시 이동 스레드 수
+    # ==========================================
+    
+    if "--benchmark" in sys.argv:
+        benchmark_move()
+        return
+    
     # 현재 작업 디렉토리 확인
     current_dir = Path.cwd()
     print(f"📁 현재 작업 디렉토리: {current_dir}")
@@ -157,15 +290,16 @@ def main():
     
     try:
         # 1단계: 이미지 파일 이동
-        moved, skipped, errors = move_all_images_to_root()
+        moved, skipped, errors = move_all_images_to_root(dry_run=dry_run, workers=workers)
         
         # 2단계: 빈 폴더 정리
         if moved > 0:
             removed_folders = remove_empty_folders()
         
-        print(f"\n🎉 모든 작업이 완료되었습니다!")
-        print(f"이제 모든 이미지가 '화장품_이미지' 폴더에 정리되었습니다.")
-        
+        if not dry_run:
+            print(f"\n🎉 모든 작업이 완료되었습니다!")
+            print(f"이제 모든 이미지가 '화장품_이미지' 폴더에 정리되었습니다.")
+    
     except Exception as e:
         print(f"❌ 오류 발생: {str(e)}")
 
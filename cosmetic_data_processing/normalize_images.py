@@ -0,0 +1,264 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from image_manifest import ImageManifest
+
+# 출력 형식별 확장자
+FORMAT_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+def _has_alpha(image):
+    """투명도가 있는 이미지인지 (알파 채널 모드 RGBA/LA/PA 또는 팔레트/그레이스케일의 투명색)"""
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+def _prepare(image, output_format):
+    """EXIF 회전 적용 후 출력 형식에 맞는 모드로 변환 (JPEG은 투명 배경을 흰색으로)"""
+    image = ImageOps.exif_transpose(image)
+    if output_format == 'JPEG':
+        if _has_alpha(image):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    return image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+def _save(image, path, output_format, quality):
+    """임시 파일에 저장 후 교체 (중간에 중단되어도 깨진 파일이 남지 않도록)"""
+    temp_path = f"{path}.tmp"
+    if output_format == 'WEBP':
+        image.save(temp_path, output_format, quality=quality, method=4)
+    else:
+        image.save(temp_path, output_format, quality=quality, optimize=True, progressive=True)
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+def normalize_image(task):
+    """
+    이미지 한 장을 최대 크기로 줄인 정규화 이미지와 썸네일로 인코딩 (프로세스 풀 작업 함수)
+    
+    Args:
+        task: (원본 경로, 정규화 이미지 경로, 썸네일 경로, 설정)
+    
+    Returns:
+        (원본 경로, (정규화 바이트, 썸네일 바이트) 또는 None, 오류 메시지 또는 None)
+    """
+    source_path, full_path, thumb_path, settings = task
+    try:
+        with Image.open(source_path) as image:
+            image = _prepare(image, settings['format'])
+        full = image.copy()
+        full.thumbnail((settings['max_dimension'], settings['max_dimension']), Image.LANCZOS)  # 작은 이미지는 그대로
+        full_bytes = _save(full, full_path, settings['format'], settings['quality'])
+        full.thumbnail((settings['thumb_dimension'], settings['thumb_dimension']), Image.LANCZOS)
+        thumb_bytes = _save(full, thumb_path, settings['format'], settings['thumb_quality'])
+        return source_path, (full_bytes, thumb_bytes), None
+    except Exception as e:
+        return source_path, None, str(e)
+
+# 변환 방식이 바뀌면 올림 (2: LA/PA 이미지의 투명도 유지)
+ENCODER_VERSION = 2
+
+def settings_key(settings):
+    """설정이나 변환 방식이 바뀌면 모든 이미지를 다시 인코딩하도록 캐시 키에 포함"""
+    return (f"{settings['format']}-{settings['max_dimension']}px-q{settings['quality']}"
+            f"-thumb{settings['thumb_dimension']}px-q{settings['thumb_quality']}-v{ENCODER_VERSION}")
+
+def normalize_images(image_folder="화장품_이미지_processed",
+                     output_folder="화장품_이미지_normalized",
+                     output_format='WEBP',
+                     max_dimension=1024,
+                     quality=80,
+                     thumb_dimension=256,
+                     thumb_quality=70,
+                     workers=None):
+    """
+    이미지 폴더의 정규화 이미지(<출력 폴더>/full)와 썸네일(<출력 폴더>/thumb)을 만드는 함수
+    
+    원본 내용 해시(이미지 매니페스트)와 설정으로 캐시하므로 바뀐 이미지만 다시 인코딩하고,
+    내용이 같은 이미지는 한 번만 인코딩해서 복사합니다. 인코딩은 프로세스 풀에서 병렬로 실행합니다.
+    
+    Args:
+        image_folder: 원본 이미지 폴더
+        output_folder: 출력 폴더 (파일명은 원본과 같고 확장자만 출력 형식으로)
+        output_format: 'WEBP' 또는 'JPEG'
+        max_dimension: 정규화 이미지의 긴 변 최대 픽셀
+        quality: 정규화 이미지 품질
+        thumb_dimension: 썸네일의 긴 변 최대 픽셀
+        thumb_quality: 썸네일 품질
+        workers: 인코딩 프로세스 수 (None이면 CPU 수)
+    
+    Returns:
+        결과 요약 딕셔너리
+    """
+    output_format = output_format.upper()
+    if output_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"지원하지 않는 출력 형식입니다: {output_format} (WEBP, JPEG)")
+    settings = {'format': output_format, 'max_dimension': max_dimension, 'quality': quality,
+                'thumb_dimension': thumb_dimension, 'thumb_quality': thumb_quality}
+    key = settings_key(settings)
+    extension = FORMAT_EXTENSIONS[output_format]
+    
+    image_folder, output_folder = Path(image_folder), Path(output_folder)
+    if not image_folder.exists():
+        print(f"{image_folder} 폴더를 찾을 수 없습니다.")
+        return None
+    full_dir, thumb_dir = output_folder / 'full', output_folder / 'thumb'
+    full_dir.mkdir(parents=True, exist_ok=True)
+    thumb_dir.mkdir(exist_ok=True)
+    
+    # 원본을 제자리에서 덮어쓴 경우도 잡도록 전체 확인 (stat만 하고 크기/수정 시각이 바뀐 파일만 해시 재계산)
+    manifest = ImageManifest(image_folder)
+    print(manifest.summary(manifest.refresh(full=True)))
+    entries = manifest.entries('')
+    
+    # 원본 파일명 → (원본 해시, 설정, 크기): 이전 실행에서 만든 결과
+    conn = sqlite3.connect(str(output_folder / 'normalized.sqlite'))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outputs (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            settings TEXT NOT NULL,
+            source_bytes INTEGER NOT NULL,
+            full_bytes INTEGER NOT NULL,
+            thumb_bytes INTEGER NOT NULL
+        )
+    """)
+    previous = {row[0]: row[1:] for row in conn.execute(
+        "SELECT path, sha256, settings, source_bytes, full_bytes, thumb_bytes FROM outputs")}
+    
+    def output_paths(entry):
+        name = f"{entry.stem}{extension}"
+        return str(full_dir / name), str(thumb_dir / name)
+    
+    def remove_outputs(path, keep_extension=None):
+        stem = os.path.splitext(path)[0]
+        for folder in (full_dir, thumb_dir):
+            for other_extension in FORMAT_EXTENSIONS.values():
+                candidate = folder / f"{stem}{other_extension}"
+                if other_extension != keep_extension and candidate.exists():
+                    candidate.unlink()
+    
+    # 원본이 사라진 결과 삭제, 출력 형식이 바뀐 결과는 이전 형식 파일 삭제
+    current_paths = {entry.path for entry in entries}
+    removed = [path for path in previous if path not in current_paths]
+    for path in removed:
+        remove_outputs(path)
+    for path, record in previous.items():
+        if path in current_paths and record[1] != key:
+            remove_outputs(path, keep_extension=extension)
+    conn.executemany("DELETE FROM outputs WHERE path = ?", [(path,) for path in removed])
+    
+    # 캐시 확인: 해시와 설정이 같고 파일이 남아 있으면 건너뜀, 같은 내용은 한 장만 인코딩
+    # (확장자만 다른 원본은 출력 파일명이 같으므로 경로순으로 앞선 것만 사용)
+    cached, to_encode, duplicates, conflicts = [], {}, [], []
+    claimed = set()
+    for entry in entries:
+        full_path, thumb_path = output_paths(entry)
+        if full_path.lower() in claimed:
+            conflicts.append(entry.path)
+            continue
+        claimed.add(full_path.lower())
+        record = previous.get(entry.path)
+        if record and record[:2] == (entry.sha256, key) and os.path.exists(full_path) and os.path.exists(thumb_path):
+            cached.append((entry, record[2:]))
+        elif entry.sha256 in to_encode:
+            duplicates.append(entry)
+        else:
+            to_encode[entry.sha256] = entry
+    
+    print(f"\n정규화 계획 ({key}): 인코딩 {len(to_encode)}개, 같은 내용 복사 {len(duplicates)}개, 캐시 사용 {len(cached)}개, "
+          f"삭제 {len(removed)}개")
+    if conflicts:
+        print(f"확장자만 다른 같은 이름이라 건너뜀: {len(conflicts)}개 (예: {', '.join(conflicts[:5])})")
+    
+    started_at = time.time()
+    tasks = [(str(manifest.path_of(entry)), *output_paths(entry), settings) for entry in to_encode.values()]
+    by_source = {str(manifest.path_of(entry)): entry for entry in to_encode.values()}
+    encoded, failed = {}, []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, min(32, len(tasks) // ((workers or os.cpu_count() or 1) * 4)))
+            for i, (source_path, sizes, error) in enumerate(executor.map(normalize_image, tasks, chunksize=chunksize), 1):
+                if error:
+                    failed.append((source_path, error))
+                else:
+                    encoded[by_source[source_path].sha256] = (by_source[source_path], sizes)
+                if i % 1000 == 0 or i == len(tasks):
+                    print(f"진행률: {i}/{len(tasks)} ({i / max(time.time() - started_at, 1e-9):,.1f}개/초)")
+    elapsed = time.time() - started_at
+    
+    # 내용이 같은 이미지는 인코딩 결과를 복사
+    copied = []
+    for entry in duplicates:
+        if entry.sha256 not in encoded:
+            continue
+        source_entry, sizes = encoded[entry.sha256]
+        for source, target in zip(output_paths(source_entry), output_paths(entry)):
+            shutil.copyfile(source, target)
+        copied.append((entry, sizes))
+    
+    rows = [(entry.path, entry.sha256, key, entry.size, *sizes)
+            for entry, sizes in list(encoded.values()) + copied]
+    conn.executemany("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    
+    total_source, total_full, total_thumb = conn.execute(
+        "SELECT COALESCE(SUM(source_bytes), 0), COALESCE(SUM(full_bytes), 0), COALESCE(SUM(thumb_bytes), 0) FROM outputs"
+    ).fetchone()
+    conn.close()
+    manifest.close()
+    
+    encoded_source = sum(entry.size for entry, _ in encoded.values())
+    encoded_full = sum(sizes[0] for _, sizes in encoded.values())
+    for source_path, error in failed[:10]:
+        print(f"인코딩 실패: {source_path} ({error})")
+    
+    print(f"\n정규화 완료: {output_folder}")
+    print(f"  - 인코딩: {len(encoded)}개, {elapsed:.2f}초 ({len(encoded) / max(elapsed, 1e-9):,.1f}개/초)")
+    print(f"  - 같은 내용 복사: {len(copied)}개, 캐시 사용: {len(cached)}개, 실패: {len(failed)}개")
+    if encoded:
+        print(f"  - 이번 인코딩: 원본 {encoded_source / 1e6:.1f}MB → {encoded_full / 1e6:.1f}MB")
+    print(f"  - 전체: 원본 {total_source / 1e6:.1f}MB → 정규화 {total_full / 1e6:.1f}MB "
+          f"({(total_source - total_full) / 1e6:.1f}MB 절약, {total_full / max(total_source, 1):.0%}), "
+          f"썸네일 {total_thumb / 1e6:.1f}MB")
+    
+    return {'encoded': len(encoded), 'copied': len(copied), 'cached': len(cached), 'removed': len(removed),
+            'failed': len(failed), 'seconds': elapsed, 'source_bytes': total_source,
+            'full_bytes': total_full, 'thumb_bytes': total_thumb}
+
+def main():
+    """
+    메인 실행 함수
+    """
+    print("=" * 60)
+    print("이미지 정규화 (리사이즈, WebP/JPEG, 썸네일) 스크립트")
+    print("=" * 60)
+    
+    # ============ 여기에 설정값 입력 ============
+    image_folder = "화장품_이미지_processed"
+    output_folder = "화장품_이미지_normalized"
+    output_format = 'JPEG' if "--jpeg" in sys.argv else 'WEBP'
+    max_dimension = 1024     # 정규화 이미지 긴 변 최대 픽셀
+    quality = 80             # 정규화 이미지 품질
+    thumb_dimension = 256    # 썸네일 긴 변 최대 픽셀
+    thumb_quality = 70       # 썸네일 품질
+    workers = None           # 인코딩 프로세스 수 (None이면 CPU 수)
+    # ==========================================
+    
+    # 현재 작업 디렉토리 확인
+    current_dir = Path.cwd()
+    print(f"현재 작업 디렉토리: {current_dir}")
+    
+    try:
+        normalize_images(image_folder, output_folder, output_format, max_dimension, quality,
+                         thumb_dimension, thumb_quality, workers)
+    except Exception as e:
+        print(f"오류 발생: {str(e)}")
+
+if __name__ == "__main__":
+    main()
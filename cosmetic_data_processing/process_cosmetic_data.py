@@ -1,6 +1,11 @@
 import pandas as pd
 import re
 import os
+import sys
+import time
+
+# 생성기를 구조화 출력 모드(structured_output=True)로 돌리면 이미 채워져 있는 컬럼
+EXTRACTED_COLUMNS = ['주요_효능', '케어_증상', '핵심_성분', '텍스트_설명']
 
 def extract_cosmetic_info(embedding_text):
     """
@@ -66,6 +71,65 @@ def extract_cosmetic_info(embedding_text):
     
     return result
 
+# 세 필드를 한 번에 뽑는 패턴 (필드마다 선택적 전방탐색 → 필드 순서와 무관하게 각 필드의 첫 번째 대괄호 값)
+FIELD_PATTERN = re.compile(
+    r'^(?=(?:.*?\[주요\s*효능[:\s]*(?P<주요_효능>[^\]]+)\])?)'
+    r'(?=(?:.*?\[케어\s*증상[:\s]*(?P<케어_증상>[^\]]+)\])?)'
+    r'(?=(?:.*?\[핵심\s*성분[:\s]*(?P<핵심_성분>[^\]]+)\])?)',
+    re.DOTALL
+)
+# 텍스트 설명에서 지울 대괄호 필드 전체 (extract_cosmetic_info의 bracket_patterns를 하나로 합친 것)
+BRACKET_PATTERN = re.compile(r'\[(?:제품유형|피부타입|관련\s*피부질환|주요\s*효능|케어\s*증상|핵심\s*성분)[^\]]*\]')
+
+def extract_cosmetic_columns(embedding_texts):
+    """
+    임베딩_텍스트 시리즈 전체에서 주요 효능, 케어 증상, 핵심 성분, 텍스트 설명을 한 번에 추출하는 함수
+    (결과는 행마다 extract_cosmetic_info를 호출한 것과 같음)
+    """
+    # object 타입으로 맞춰서 파이썬 re/str 규칙(유니코드 공백 등)을 그대로 사용
+    texts = embedding_texts.astype(object)
+    texts = texts.where(texts.map(lambda value: isinstance(value, str)), '')
+    
+    extracted = texts.str.extract(FIELD_PATTERN).fillna('')
+    for key in ['주요_효능', '케어_증상', '핵심_성분']:
+        extracted[key] = extracted[key].str.strip()
+    
+    # 대괄호 필드 제거 후 연속된 공백/줄바꿈을 하나로 정리 (split/join이 re.sub(r'\s+', ' ')보다 빠름)
+    extracted['텍스트_설명'] = texts.str.replace(BRACKET_PATTERN, '', regex=True).str.split().str.join(' ')
+    return extracted[EXTRACTED_COLUMNS]
+
+def benchmark_extraction(input_file_path, scale=50, repeat=3):
+    """
+    행 단위 추출(extract_cosmetic_info)과 벡터화 추출(extract_cosmetic_columns)의 속도 비교 및 결과 일치 확인
+    
+    Args:
+        input_file_path: 임베딩_텍스트 컬럼이 있는 엑셀 파일
+        scale: 데이터를 몇 배로 복제해서 측정할지
+        repeat: 반복 측정 횟수 (가장 빠른 값 사용)
+    """
+    frame = pd.concat([pd.read_excel(input_file_path)] * scale, ignore_index=True)
+    texts = frame['임베딩_텍스트']
+    print(f"벤치마크: {len(texts)}행 ({scale}배 복제), {repeat}회 반복 중 최솟값")
+    
+    timings = {}
+    for name, extract in [('행 단위 (iterrows + extract_cosmetic_info)',
+                           lambda: pd.DataFrame([extract_cosmetic_info(row['임베딩_텍스트']) for _, row in frame.iterrows()])),
+                          ('벡터화 (extract_cosmetic_columns)',
+                           lambda: extract_cosmetic_columns(texts))]:
+        best = None
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            result = extract()
+            elapsed = time.perf_counter() - started_at
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = (best, result)
+        print(f"  - {name}: {best:.3f}초 ({len(texts) / best:,.0f}행/초)")
+    
+    (row_time, row_result), (vector_time, vector_result) = timings.values()
+    identical = row_result[EXTRACTED_COLUMNS].astype(object).equals(vector_result.astype(object))
+    print(f"속도 향상: {row_time / vector_time:.1f}배, 결과 일치: {'예' if identical else '아니오'}")
+    return identical
+
 def process_cosmetic_data(input_file_path, output_file_path=None):
     """
     화장품 데이터를 가공하여 새로운 컬럼들을 추가하는 함수
@@ -92,21 +156,21 @@ def process_cosmetic_data(input_file_path, output_file_path=None):
                 print(df.iloc[i]['임베딩_텍스트'][:200] + "...")
                 print("-" * 50)
         
-        # 새로운 컬럼들 추출
+        # 새로운 컬럼들 추출 (구조화 출력으로 이미 채워진 행은 다시 파싱하지 않음)
         print("\n데이터 가공 중...")
-        extracted_data = []
+        has_structured = all(key in df.columns for key in EXTRACTED_COLUMNS)
+        reused = df[EXTRACTED_COLUMNS].notna().all(axis=1) if has_structured else pd.Series(False, index=df.index)
+        
+        extracted = pd.DataFrame('', index=df.index, columns=EXTRACTED_COLUMNS, dtype=object)
+        extracted.loc[~reused] = extract_cosmetic_columns(df.loc[~reused, '임베딩_텍스트'])
         
-        for idx, row in df.iterrows():
-            if idx % 100 == 0:
-                print(f"진행률: {idx}/{len(df)}")
-            
-            embedding_text = row['임베딩_텍스트']
-            extracted_info = extract_cosmetic_info(embedding_text)
-            extracted_data.append(extracted_info)
+        if has_structured:
+            extracted.loc[reused] = df.loc[reused, EXTRACTED_COLUMNS]
+            print(f"구조화 출력 컬럼 사용: {reused.sum()}행, 임베딩_텍스트 파싱: {len(df) - reused.sum()}행")
         
         # 새로운 컬럼들을 데이터프레임에 추가
-        for key in ['주요_효능', '케어_증상', '핵심_성분', '텍스트_설명']:
-            df[key] = [item[key] for item in extracted_data]
+        for key in EXTRACTED_COLUMNS:
+            df[key] = extracted[key].tolist()
         
         # 출력 파일 경로 설정
         if output_file_path is None:
@@ -142,7 +206,10 @@ if __name__ == "__main__":
     input_file = "cosmetic_data.xlsx"
     
     # 파일이 존재하는지 확인
-    if not os.path.exists(input_file):
+    if os.path.exists(input_file) and "--benchmark" in sys.argv:
+        # 추출 속도 비교: python process_cosmetic_data.py --benchmark
+        benchmark_extraction(input_file)
+    elif not os.path.exists(input_file):
         print(f"파일을 찾을 수 없습니다: {input_file}")
         print("현재 디렉토리의 파일들:")
         for file in os.listdir("."):
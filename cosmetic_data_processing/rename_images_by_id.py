@@ -0,0 +1,301 @@
+import os
+import sys
+import csv
+import json
+import time
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from image_manifest import ImageManifest, IMAGE_EXTENSIONS
+from move_all_images import execute_moves
+
+def load_id_mapping(mapping_file, key_column='제품명', id_column='img_url'):
+    """
+    엑셀/CSV에서 {현재 파일명(확장자 제외): 새 파일명(id)} 매핑을 읽는 함수
+    
+    id가 이미 확장자를 포함하고 있으면("12.jpg") 확장자는 떼고 사용 (확장자는 실제 파일 것을 따름)
+    """
+    if str(mapping_file).lower().endswith('.csv'):
+        df = pd.read_csv(mapping_file, dtype=object)
+    else:
+        df = pd.read_excel(mapping_file, dtype=object)
+    
+    missing_columns = [col for col in (key_column, id_column) if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"필요한 컬럼이 없습니다: {missing_columns} (사용 가능한 컬럼: {list(df.columns)})")
+    
+    mapping = {}
+    for key, image_id in zip(df[key_column], df[id_column]):
+        if pd.isna(key) or pd.isna(image_id):
+            continue
+        key, image_id = str(key).strip(), str(image_id).strip()
+        if image_id.endswith('.0') and image_id[:-2].isdigit():
+            image_id = image_id[:-2]  # 숫자 id가 실수로 읽힌 경우
+        stem, extension = os.path.splitext(image_id)
+        if extension.lower() in IMAGE_EXTENSIONS:
+            image_id = stem
+        if key and image_id:
+            mapping.setdefault(key, image_id)
+    return mapping
+
+def plan_renames(mapping, entries, run_id):
+    """
+    이름 변경 계획을 메모리에서 한 번에 계산하는 함수
+    
+    - 대상 이름이 다른 원본 파일 자리인 경우(연쇄/순환)는 원본을 먼저 임시 이름으로 옮긴 뒤 최종 이름으로 변경
+    - 여러 원본이 같은 대상으로 가거나, 대상 자리에 이름이 바뀌지 않는 파일이 있으면 충돌로 보고 건너뜀
+    - 대소문자만 다른 이름도 같은 이름으로 취급 (Windows/macOS)
+    
+    Args:
+        mapping: {현재 파일명(확장자 제외): 새 파일명(확장자 제외)}
+        entries: 최상위 폴더 이미지 매니페스트 항목
+        run_id: 임시 파일명에 붙일 실행 id
+    
+    Returns:
+        {'temp': [(원본, 임시)], 'final': [(원본 또는 임시, 대상)], 'renames': [(원본, 대상)],
+         'conflicts': [(원본, 대상, 사유)], 'not_matched': [현재 파일명], 'unchanged': 이미 이름이 같은 수}
+    """
+    by_stem = {}
+    for entry in entries:
+        by_stem.setdefault(entry.stem, entry)
+    
+    renames, conflicts, not_matched, unchanged = [], [], [], 0
+    claimed = {}
+    for key, image_id in mapping.items():
+        entry = by_stem.get(key)
+        if entry is None:
+            not_matched.append(key)
+            continue
+        target = f"{image_id}{entry.extension}"
+        if target == entry.path:
+            unchanged += 1
+            continue
+        if target.lower() in claimed:
+            conflicts.append((entry.path, target, f"대상 이름 중복 ({claimed[target.lower()]})"))
+            continue
+        claimed[target.lower()] = entry.path
+        renames.append((entry.path, target))
+    
+    # 대상 자리에 있는 파일이 같이 이름이 바뀌면 연쇄/순환, 그대로 남으면 충돌
+    sources = {source.lower() for source, _ in renames}
+    occupied = {entry.path.lower() for entry in entries}
+    planned = []
+    for source, target in renames:
+        if target.lower() in occupied and target.lower() not in sources:
+            conflicts.append((source, target, "파일이 이미 존재합니다"))
+        else:
+            planned.append((source, target))
+    
+    # 충돌로 빠진 원본은 제자리에 남으므로 그 자리를 대상으로 하는 변경도 충돌 (남는 것이 없을 때까지 반복)
+    while True:
+        sources = {source.lower() for source, _ in planned}
+        blocked = [(source, target) for source, target in planned
+                   if target.lower() in occupied and target.lower() not in sources]
+        if not blocked:
+            break
+        conflicts.extend((source, target, "대상 파일이 이름 변경에서 제외됨") for source, target in blocked)
+        blocked = set(blocked)
+        planned = [item for item in planned if item not in blocked]
+    
+    targets = {target.lower() for _, target in planned}
+    temp, final = [], []
+    for i, (source, target) in enumerate(planned):
+        if source.lower() in targets:
+            temp_name = f".renaming-{run_id}-{i}{os.path.splitext(source)[1]}"
+            temp.append((source, temp_name))
+            final.append((temp_name, target))
+        else:
+            final.append((source, target))
+    
+    return {'temp': temp, 'final': final, 'renames': planned, 'conflicts': conflicts,
+            'not_matched': not_matched, 'unchanged': unchanged}
+
+def _write_journal(journal_path, plan):
+    """실행 전에 전체 계획을 저널에 기록 (실행 도중 중단되어도 rollback_renames로 되돌릴 수 있도록)"""
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'plan', 'created_at': datetime.now().isoformat(),
+                            'renames': len(plan['renames'])}, ensure_ascii=False) + '\n')
+        for phase in ('temp', 'final'):
+            for source, target in plan[phase]:
+                f.write(json.dumps({'type': 'step', 'phase': phase, 'from': source, 'to': target},
+                                   ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def rollback_renames(journal_path, image_folder="화장품_이미지", workers=8):
+    """
+    저널의 이름 변경을 역순으로 되돌리는 함수 (끝까지 실행되지 않은 계획도 되돌릴 수 있음)
+    
+    단계마다 "새 이름이 있고 원래 이름이 비어 있는" 경우만 되돌리므로 여러 번 실행해도 안전함
+    """
+    image_folder = Path(image_folder)
+    steps = {'temp': [], 'final': []}
+    with open(journal_path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('type') == 'step':
+                steps[record['phase']].append((record['to'], record['from']))
+    
+    print(f"이름 변경 되돌리기: {journal_path}")
+    restored, failed = 0, 0
+    for phase in ('final', 'temp'):
+        undo = [(new, old) for new, old in steps[phase]
+                if (image_folder / new).exists() and not (image_folder / old).exists()]
+        done, errors = execute_moves(image_folder, undo, workers)
+        restored += len(done)
+        failed += len(errors)
+        for source, error in errors[:10]:
+            print(f"되돌리기 실패: {source} ({error})")
+    
+    print(f"되돌린 파일: {restored}개, 실패: {failed}개 (매니페스트는 다음 실행 때 갱신됩니다)")
+    return restored, failed
+
+def rename_images_by_id(mapping_file="cosmetic_data_processed_with_columns.xlsx",
+                        image_folder="화장품_이미지",
+                        key_column='제품명',
+                        id_column='img_url',
+                        output_file="cosmetic_data_processed_with_updated_images.xlsx",
+                        dry_run=False,
+                        workers=8):
+    """
+    제품 id 매핑으로 이미지 파일명을 한 번에 변경하고 엑셀의 img_url을 업데이트하는 함수
+    
+    파일 목록은 이미지 매니페스트에서 조회하고, 전체 계획(연쇄/순환은 임시 이름 경유, 충돌은 제외)을
+    저널에 먼저 기록한 뒤 스레드 풀로 병렬 실행합니다. 문제가 생기면 rollback_renames(저널 경로)로 되돌립니다.
+    
+    Args:
+        mapping_file: 매핑 엑셀/CSV (key_column → id_column)
+        image_folder: 이미지 폴더
+        key_column: 현재 파일명(확장자 제외)이 들어 있는 컬럼
+        id_column: 새 파일명(id)이 들어 있는 컬럼
+        output_file: img_url을 실제 파일명(확장자 포함)으로 바꾼 엑셀 저장 경로 (엑셀 매핑일 때만)
+        dry_run: True면 계획만 출력하고 "<이미지 폴더>_rename_plan.csv"로 저장
+        workers: 동시 이름 변경 스레드 수
+    """
+    image_folder = Path(image_folder)
+    if not image_folder.exists():
+        print(f"{image_folder} 폴더를 찾을 수 없습니다.")
+        return
+    
+    try:
+        print("매핑 파일을 읽는 중...")
+        mapping = load_id_mapping(mapping_file, key_column, id_column)
+        print(f"총 {len(mapping)}개의 id 매핑을 로드했습니다.")
+    except Exception as e:
+        print(f"매핑 파일 읽기 실패: {str(e)}")
+        return
+    
+    # 파일 목록은 폴더를 훑지 않고 매니페스트에서 조회
+    manifest = ImageManifest(image_folder)
+    print(manifest.summary(manifest.refresh()))
+    entries = manifest.entries('')
+    
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    plan = plan_renames(mapping, entries, run_id)
+    
+    print(f"\n이름 변경 계획:")
+    print(f"  - 변경: {len(plan['renames'])}개 (연쇄/순환으로 임시 이름 경유 {len(plan['temp'])}개)")
+    print(f"  - 이미 같은 이름: {plan['unchanged']}개")
+    print(f"  - 충돌로 제외: {len(plan['conflicts'])}개")
+    print(f"  - 매칭되지 않은 제품: {len(plan['not_matched'])}개")
+    for i, (source, target) in enumerate(plan['renames'][:10]):
+        print(f"  {i+1}. {source} → {target}")
+    if len(plan['renames']) > 10:
+        print(f"  ... 그리고 {len(plan['renames']) - 10}개 더")
+    for i, (source, target, reason) in enumerate(plan['conflicts'][:5]):
+        print(f"  충돌 {i+1}. {source} → {target}: {reason}")
+    
+    if dry_run:
+        report_path = f"{image_folder}_rename_plan.csv"
+        with open(report_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['원본', '대상', '상태'])
+            writer.writerows((source, target, '변경') for source, target in plan['renames'])
+            writer.writerows((source, target, f"충돌: {reason}") for source, target, reason in plan['conflicts'])
+            writer.writerows((key, '', '매칭 없음') for key in plan['not_matched'])
+        print(f"\n드라이런: 파일명을 바꾸지 않았습니다. 전체 계획: {report_path}")
+        manifest.close()
+        return plan
+    
+    renamed = []
+    if plan['renames']:
+        journal_path = f"{image_folder}_rename_{run_id}.journal.jsonl"
+        _write_journal(journal_path, plan)
+        print(f"\n이름 변경 저널: {journal_path}")
+        
+        started_at = time.time()
+        # 1단계: 연쇄/순환 원본을 임시 이름으로 (실패하면 되돌리고 중단)
+        temp_done, failed = execute_moves(image_folder, plan['temp'], workers)
+        if failed:
+            for source, error in failed[:10]:
+                print(f"파일 이름 변경 실패: {source} ({error})")
+            print("임시 이름 변경 단계에서 실패가 있어 되돌립니다.")
+            rollback_renames(journal_path, image_folder, workers)
+            manifest.close()
+            return
+        
+        # 2단계: 모든 파일을 최종 이름으로
+        done, failed = execute_moves(image_folder, plan['final'], workers)
+        elapsed = time.time() - started_at
+        for source, error in failed[:10]:
+            print(f"파일 이름 변경 실패: {source} ({error})")
+        
+        # 매니페스트에도 실제 순서대로 반영 (순환을 한 번에 반영하면 아직 바뀌지 않은 항목을 덮어씀)
+        manifest.record_renames(temp_done)
+        manifest.record_renames(done)
+        temp_sources = {temp_name: source for source, temp_name in plan['temp']}
+        renamed = [(temp_sources.get(source, source), target) for source, target in done]
+        print(f"이름 변경 완료: {len(renamed)}개, 실패 {len(failed)}개, {elapsed:.2f}초 "
+              f"({len(renamed) / max(elapsed, 1e-9):,.0f}개/초)")
+        if failed:
+            print(f"실패한 파일이 있습니다. 전체를 되돌리려면 rollback_renames('{journal_path}')를 실행하세요.")
+    manifest.close()
+    
+    # 엑셀의 img_url을 실제 파일명(확장자 포함)으로 업데이트
+    if output_file and not str(mapping_file).lower().endswith('.csv'):
+        try:
+            df = pd.read_excel(mapping_file)
+            # 제품마다 실제로 남은 파일명 (충돌/실패로 이름이 안 바뀐 제품은 원래 파일명)
+            by_stem = {entry.stem: entry.path for entry in entries}
+            final_paths = dict(renamed)
+            current = [by_stem.get(str(key).strip()) if pd.notna(key) else None for key in df[key_column]]
+            df[id_column] = [final_paths.get(path, path) if path else original
+                             for path, original in zip(current, df[id_column])]
+            df.to_excel(output_file, index=False)
+            print(f"\n업데이트된 엑셀 파일이 저장되었습니다: {output_file}")
+        except Exception as e:
+            print(f"엑셀 파일 저장 실패: {str(e)}")
+    
+    return plan
+
+def main():
+    """
+    메인 실행 함수
+    """
+    print("=" * 60)
+    print("제품 id 기준 이미지 파일명 일괄 변경 스크립트")
+    print("=" * 60)
+    
+    # ============ 여기에 설정값 입력 ============
+    mapping_file = "cosmetic_data_processed_with_columns.xlsx"  # 제품명 → img_url(id) 매핑
+    image_folder = "화장품_이미지"
+    dry_run = "--dry-run" in sys.argv   # True면 계획만 출력/저장
+    workers = 8                         # 동시 이름 변경 스레드 수
+    # ==========================================
+    
+    # 되돌리기: python rename_images_by_id.py --rollback <저널 경로>
+    if "--rollback" in sys.argv:
+        rollback_renames(sys.argv[sys.argv.index("--rollback") + 1], image_folder, workers)
+        return
+    
+    # 현재 작업 디렉토리 확인
+    current_dir = Path.cwd()
+    print(f"현재 작업 디렉토리: {current_dir}")
+    
+    try:
+        rename_images_by_id(mapping_file, image_folder, dry_run=dry_run, workers=workers)
+    except Exception as e:
+        print(f"오류 발생: {str(e)}")
+
+if __name__ == "__main__":
+    main()
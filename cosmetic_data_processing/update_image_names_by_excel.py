@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 from pathlib import Path
+from image_manifest import ImageManifest
 
 def update_image_names_by_excel():
     """
@@ -36,15 +37,15 @@ def update_image_names_by_excel():
         print(f"{image_folder} 폴더를 찾을 수 없습니다.")
         return
     
-    # 이미지 파일 목록 가져오기
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+    # 이미지 파일 목록 가져오기 (폴더를 훑지 않고 매니페스트 조회, 바뀐 폴더만 증분 갱신)
+    manifest = ImageManifest(image_folder)
+    print(manifest.summary(manifest.refresh()))
     image_files = {}  # {파일명(확장자제외): (파일경로, 확장자)}
     
-    for file_path in image_folder.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-            file_name_without_ext = file_path.stem
-            file_extension = file_path.suffix
-            image_files[file_name_without_ext] = (file_path, file_extension)
+    for stem, entry in manifest.stem_map().items():
+        image_files[stem] = (manifest.path_of(entry), entry.extension)
+    # 대소문자를 구분하지 않는 파일 시스템(Windows/macOS)에서도 다른 이미지를 덮어쓰지 않도록 소문자로 비교
+    existing_names = {entry.path.lower() for entry in manifest.entries('')}
     
     print(f"{len(image_files)}개의 이미지 파일을 발견했습니다.")
     
@@ -52,6 +53,7 @@ def update_image_names_by_excel():
     matched_count = 0
     not_matched_products = []
     renamed_files = []
+    renames = []  # 매니페스트에 반영할 (이전 파일명, 새 파일명)
     error_count = 0
     updated_urls = []
     
@@ -75,13 +77,16 @@ def update_image_names_by_excel():
             
             try:
                 # 새 파일명이 이미 존재하는지 확인
-                if new_file_path.exists() and new_file_path != original_file_path:
+                if new_file_name.lower() in existing_names and new_file_name.lower() != original_file_path.name.lower():
                     print(f"파일이 이미 존재합니다: {new_file_name}")
                     continue
                 
                 # 파일 이름 변경
                 if original_file_path != new_file_path:
                     original_file_path.rename(new_file_path)
+                    existing_names.discard(original_file_path.name.lower())
+                    existing_names.add(new_file_name.lower())
+                    renames.append((original_file_path.name, new_file_name))
                     renamed_files.append((product_name, new_file_name))
                     matched_count += 1
                 
@@ -98,6 +103,10 @@ def update_image_names_by_excel():
         else:
             not_matched_products.append(product_name)
     
+    # 이름 변경을 매니페스트에 반영
+    manifest.record_renames(renames)
+    manifest.close()
+    
     # 업데이트된 엑셀 파일 저장
     try:
         output_file = "cosmetic_data_processed_with_updated_images.xlsx"
@@ -2,6 +2,10 @@
 화장품 벡터 DB 구축 (심플 버전)
 """
 
+import os
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
@@ -9,19 +13,223 @@ from qdrant_client.models import Distance, VectorParams, PointStruct
 
 
 class CosmeticVectorDB:
-    def __init__(self):
+    # 인덱싱에 실제로 필요한 컬럼 (load_data는 이 컬럼만 읽음)
+    INDEX_COLUMNS = ['제품명', '브랜드', '가격', '제품유형', '피부타입', '관련_피부질환', '제품설명', '임베딩_텍스트']
+    
+    # 확장자별 Arrow 포맷
+    ARROW_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather', '.ipc': 'feather'}
+    
+    # 엑셀 Arrow 캐시 폴더 이름 (엑셀 파일과 같은 폴더에 생성)
+    ARROW_CACHE_DIR = ".arrow_cache"
+    
+    def __init__(self, reduced_dim: int = None, reduction: str = "pca", storage_path: str = None):
+        """
+        Args:
+            reduced_dim: 축소할 벡터 차원 (None이면 모델 원본 차원 사용)
+            reduction: 차원 축소 방식 ("pca" 또는 앞쪽 차원만 쓰는 "truncate")
+            storage_path: 인덱스 저장 폴더 (None이면 메모리 모드, 지정하면 projection도 같이 저장)
+        """
         # 임베딩 모델 로드 (한국어 지원)
         self.embedding_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
         
-        # Qdrant 클라이언트 (메모리 모드)
-        self.qdrant_client = QdrantClient(":memory:")
+        # Qdrant 클라이언트 (storage_path가 없으면 메모리 모드)
+        self.storage_path = storage_path
+        if storage_path:
+            os.makedirs(storage_path, exist_ok=True)
+            self.qdrant_client = QdrantClient(path=storage_path)
+        else:
+            self.qdrant_client = QdrantClient(":memory:")
         
         # 컬렉션 이름
         self.collection_name = "cosmetic_products"
+        
+        # 차원 축소 설정 (projection은 인덱싱 시점에 학습)
+        if reduction not in ("pca", "truncate"):
+            raise ValueError(f"지원하지 않는 차원 축소 방식입니다: {reduction}")
+        self.reduced_dim = reduced_dim
+        self.reduction = reduction
+        self.projection = None  # {"mean": ndarray 또는 None, "components": ndarray}
+        self._requested_reduction = (reduced_dim, reduction)  # setup_collection으로 새로 구축할 때 사용할 설정
+        
+        # 저장된 projection이 있으면 불러오기 (인덱스 차원은 저장된 projection을 따름)
+        if self.storage_path and os.path.exists(self._projection_path()):
+            self.load_projection()
+            if reduced_dim is not None and (reduced_dim, reduction) != (self.reduced_dim, self.reduction):
+                print(f"경고: 저장된 projection({self.reduction}, {self.reduced_dim}차원)이 요청한 설정"
+                      f"({reduction}, {reduced_dim}차원)과 다릅니다. 기존 인덱스 검색에는 저장된 projection을 사용하고, "
+                      f"setup_collection으로 새로 구축하면 요청한 설정으로 다시 학습합니다.")
+    
+    def _projection_path(self) -> str:
+        """인덱스 옆에 저장되는 projection 파일 경로"""
+        return os.path.join(self.storage_path, "projection.npz")
+    
+    def fit_projection(self, embeddings: np.ndarray, dim: int = None, method: str = None) -> dict:
+        """
+        카탈로그 임베딩으로 차원 축소 projection 학습
+        
+        Args:
+            embeddings: (N, 원본차원) 카탈로그 임베딩
+            dim: 축소할 차원 (None이면 self.reduced_dim)
+            method: "pca" 또는 "truncate" (None이면 self.reduction)
+            
+        Returns:
+            projection 딕셔너리 {"mean", "components"}
+        """
+        dim = dim or self.reduced_dim
+        method = method or self.reduction
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        full_dim = embeddings.shape[1]
+        
+        if dim >= full_dim:
+            raise ValueError(f"축소 차원({dim})은 원본 차원({full_dim})보다 작아야 합니다.")
+        
+        if method == "pca":
+            # 주성분은 최대 min(N, 원본차원)개라 제품 수가 적으면 컬렉션 차원과 어긋남
+            if len(embeddings) < dim:
+                raise ValueError(f"PCA 축소 차원({dim})이 카탈로그 제품 수({len(embeddings)})보다 큽니다. "
+                                 f"reduced_dim을 줄이거나 reduction='truncate'를 사용하세요.")
+            mean = embeddings.mean(axis=0)
+            # 중심화된 임베딩의 SVD → 상위 주성분
+            _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+            components = vt[:dim]
+        else:
+            return self.truncation_projection(full_dim, dim)
+        
+        return {"mean": mean, "components": components.astype(np.float32)}
+    
+    @staticmethod
+    def truncation_projection(full_dim: int, dim: int) -> dict:
+        """Matryoshka 방식 projection: 앞쪽 dim개 차원만 사용 (학습 데이터 불필요)"""
+        if dim >= full_dim:
+            raise ValueError(f"축소 차원({dim})은 원본 차원({full_dim})보다 작아야 합니다.")
+        return {"mean": None, "components": np.eye(full_dim, dtype=np.float32)[:dim]}
+    
+    def project(self, vectors: np.ndarray, projection: dict = None) -> np.ndarray:
+        """벡터에 projection 적용 (projection이 없으면 그대로 반환)"""
+        projection = projection or self.projection
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if projection is None:
+            return vectors
+        
+        if projection["mean"] is not None:
+            vectors = vectors - projection["mean"]
+        reduced = vectors @ projection["components"].T
+        
+        # 코사인 거리용 정규화
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+    
+    def save_projection(self):
+        """projection을 인덱스 폴더에 저장"""
+        if not self.storage_path or self.projection is None:
+            return
+        mean = self.projection["mean"]
+        np.savez(
+            self._projection_path(),
+            mean=mean if mean is not None else np.array([]),
+            components=self.projection["components"],
+            reduction=self.reduction
+        )
+    
+    def load_projection(self):
+        """인덱스 폴더에 저장된 projection 불러오기"""
+        data = np.load(self._projection_path())
+        mean = data["mean"]
+        self.projection = {
+            "mean": mean if mean.size > 0 else None,
+            "components": data["components"]
+        }
+        self.reduction = str(data["reduction"])
+        self.reduced_dim = self.projection["components"].shape[0]
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """검색 쿼리를 벡터로 변환 (projection 자동 적용)"""
+        query_vector = self.embedding_model.encode([query])
+        return self.project(query_vector)[0]
+    
+    def load_data(self, data_path: str, columns: list = None, use_cache: bool = True) -> pd.DataFrame:
+        """
+        화장품 데이터 로드 (Parquet/Feather/Arrow IPC/엑셀)
+        
+        엑셀은 처음 한 번만 파싱해서 Arrow 캐시로 저장하고,
+        이후에는 파일 경로/크기/수정시간이 같으면 캐시에서 바로 읽습니다.
+        
+        Args:
+            data_path: 데이터 파일 경로
+            columns: 읽을 컬럼 (None이면 INDEX_COLUMNS 중 존재하는 컬럼)
+            use_cache: 엑셀 입력 시 Arrow 캐시 사용 여부
+            
+        Returns:
+            데이터프레임
+        """
+        columns = columns or self.INDEX_COLUMNS
+        ext = os.path.splitext(data_path)[1].lower()
+        
+        if ext in self.ARROW_FORMATS:
+            return self._read_arrow(data_path, self.ARROW_FORMATS[ext], columns)
+        
+        if not use_cache:
+            return pd.read_excel(data_path, usecols=lambda col: col in columns)
+        
+        cache_path = self._arrow_cache_path(data_path)
+        if not os.path.exists(cache_path):
+            self._write_arrow_cache(data_path, cache_path)
+        return self._read_arrow(cache_path, "feather", columns)
+    
+    def _read_arrow(self, path: str, file_format: str, columns: list) -> pd.DataFrame:
+        """Arrow 계열 파일에서 필요한 컬럼만 읽기"""
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset(path, format=file_format)
+        available = [col for col in columns if col in dataset.schema.names]
+        return dataset.to_table(columns=available).to_pandas()
     
-    def load_data(self, excel_path: str) -> pd.DataFrame:
-        """엑셀 파일에서 화장품 데이터 로드"""
-        return pd.read_excel(excel_path)
+    def _arrow_cache_path(self, excel_path: str) -> str:
+        """엑셀 파일의 경로/크기/수정시간으로 캐시 파일 경로 생성"""
+        abs_path = os.path.abspath(excel_path)
+        stat = os.stat(abs_path)
+        key = hashlib.sha1(f"{abs_path}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+        
+        cache_dir = os.path.join(os.path.dirname(abs_path), self.ARROW_CACHE_DIR)
+        stem = os.path.splitext(os.path.basename(abs_path))[0]
+        return os.path.join(cache_dir, f"{stem}_{key}.arrow")
+    
+    def _arrow_cache_meta_path(self, excel_path: str) -> str:
+        """원본 엑셀별 캐시 메타데이터 파일 경로 (원본 경로 해시로 구분, 현재 캐시 파일명을 기록)"""
+        abs_path = os.path.abspath(excel_path)
+        key = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(abs_path))[0]
+        return os.path.join(os.path.dirname(abs_path), self.ARROW_CACHE_DIR, f"{stem}_{key}.source.json")
+    
+    def _write_arrow_cache(self, excel_path: str, cache_path: str):
+        """엑셀 전체를 한 번 파싱해서 Arrow 캐시로 저장 (같은 원본의 이전 버전 캐시는 삭제)"""
+        print(f"엑셀 → Arrow 캐시 생성 중: {excel_path}")
+        df = pd.read_excel(excel_path)
+        
+        # 타입이 섞인 object 컬럼은 Arrow 변환을 위해 문자열로 통일 (결측값은 유지)
+        for col in df.columns[df.dtypes == object]:
+            if df[col].dropna().map(type).nunique() > 1:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        tmp_path = cache_path + ".tmp"
+        df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, cache_path)
+        
+        # 이전 캐시는 원본별 메타데이터에 기록된 파일만 삭제 (파일명 패턴은 이름이 비슷한 다른 원본의 캐시와 겹칠 수 있음)
+        abs_path = os.path.abspath(excel_path)
+        meta_path = self._arrow_cache_meta_path(excel_path)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                previous = json.load(f)
+            stale = os.path.join(cache_dir, previous.get("cache", ""))
+            if previous.get("source") == abs_path and previous.get("cache") and stale != cache_path and os.path.exists(stale):
+                os.remove(stale)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"source": abs_path, "cache": os.path.basename(cache_path)}, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
     
     def create_embeddings(self, texts: list):
         """텍스트 리스트를 벡터로 변환"""
@@ -35,8 +243,14 @@ class CosmeticVectorDB:
         except:
             pass
         
-        # 새 컬렉션 생성
-        embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
+        # 새로 구축할 때는 생성자에서 요청한 차원 축소 설정을 사용 (저장된 projection과 다르면 index_products에서 다시 학습)
+        requested_dim, requested_reduction = self._requested_reduction
+        if requested_dim is not None and (requested_dim, requested_reduction) != (self.reduced_dim, self.reduction):
+            self.reduced_dim, self.reduction = requested_dim, requested_reduction
+            self.projection = None
+        
+        # 새 컬렉션 생성 (차원 축소 시 축소된 차원 사용)
+        embedding_dim = self.reduced_dim or self.embedding_model.get_sentence_embedding_dimension()
         self.qdrant_client.create_collection(
             collection_name=self.collection_name,
             vectors_config=VectorParams(
@@ -52,29 +266,19 @@ class CosmeticVectorDB:
         embedding_texts = df['임베딩_텍스트'].fillna('').tolist()
         embeddings = self.create_embeddings(embedding_texts)
         
+        # 차원 축소 (카탈로그로 projection을 새로 학습하고 인덱스 옆에 저장)
+        if self.reduced_dim:
+            self.projection = self.fit_projection(embeddings)
+            self.save_projection()
+            embeddings = self.project(embeddings)
+        
         # 2. Qdrant에 저장할 포인트 생성
         points = []
         for idx, row in df.iterrows():
-            # 메타데이터 구성
-            payload = {
-                # 기본 정보
-                "제품명": str(row['제품명']),
-                "브랜드": str(row['브랜드']),
-                
-                # 필터링용 (가격만)
-                "가격": int(row.get('가격', 0)) if pd.notna(row.get('가격')) else 0,
-                
-                # 참고용 (결과 표시용)
-                "제품유형": str(row.get('제품유형', '')),
-                "피부타입": str(row.get('피부타입', '')),
-                "관련_피부질환": row.get('관련_피부질환', []),  # 리스트 그대로 저장!
-                "제품설명": str(row.get('제품설명', '')),
-            }
-            
             points.append(PointStruct(
                 id=idx,
                 vector=embeddings[idx].tolist(),
-                payload=payload
+                payload=self._build_payload(row)
             ))
         
         # 3. Qdrant에 업로드
@@ -83,12 +287,61 @@ class CosmeticVectorDB:
             points=points
         )
     
+    def _build_payload(self, row) -> dict:
+        """한 제품의 메타데이터 구성 (DataFrame 행 또는 딕셔너리)"""
+        가격 = row.get('가격')
+        return {
+            # 기본 정보
+            "제품명": str(row['제품명']),
+            "브랜드": str(row['브랜드']),
+            
+            # 필터링용 (가격만)
+            "가격": int(가격) if 가격 is not None and pd.notna(가격) else 0,
+            
+            # 참고용 (결과 표시용)
+            "제품유형": str(row.get('제품유형', '')),
+            "피부타입": str(row.get('피부타입', '')),
+            "관련_피부질환": row.get('관련_피부질환', []),  # 리스트 그대로 저장!
+            "제품설명": str(row.get('제품설명', '')),
+        }
+    
+    def upsert_products(self, rows: list):
+        """
+        제품 몇 개를 바로 임베딩해서 추가/갱신 (증분 인덱싱용)
+        
+        Args:
+            rows: [(포인트 id, 제품 딕셔너리), ...] - 제품 딕셔너리에 임베딩_텍스트 포함
+        """
+        if not rows:
+            return
+        
+        # 컬렉션이 없으면 생성 (기존 인덱스는 유지)
+        if not self.qdrant_client.collection_exists(self.collection_name):
+            self.setup_collection()
+        
+        # 증분 인덱싱에서는 projection을 새로 학습하지 않음
+        if self.reduced_dim and self.projection is None:
+            if self.reduction != "truncate":
+                raise ValueError("PCA projection이 없습니다. 먼저 index_products로 카탈로그를 인덱싱하세요.")
+            full_dim = self.embedding_model.get_sentence_embedding_dimension()
+            self.projection = self.truncation_projection(full_dim, self.reduced_dim)
+            self.save_projection()
+        
+        texts = [str(product.get('임베딩_텍스트') or '') for _, product in rows]
+        embeddings = self.project(self.embedding_model.encode(texts))
+        
+        points = [
+            PointStruct(id=int(point_id), vector=embeddings[i].tolist(), payload=self._build_payload(product))
+            for i, (point_id, product) in enumerate(rows)
+        ]
+        self.qdrant_client.upsert(collection_name=self.collection_name, points=points)
+    
     def search(self, query: str, price_limit: int = None, top_k: int = 3):
         """
         기본 화장품 검색 (하위 호환성 유지)
         """
         # 1. 쿼리를 벡터로 변환
-        query_vector = self.embedding_model.encode([query])[0]
+        query_vector = self.encode_query(query)
         
         # 2. 검색 조건 설정
         search_params = {
@@ -148,7 +401,7 @@ class CosmeticVectorDB:
         # (하드 필터는 너무 제한적이므로 3단계에서 보너스 점수로 처리)
         
         # 2단계: 임베딩 유사도 검색
-        query_vector = self.embedding_model.encode([query])[0]
+        query_vector = self.encode_query(query)
         
         search_params = {
             "collection_name": self.collection_name,
@@ -222,6 +475,56 @@ class CosmeticVectorDB:
         products.sort(key=lambda x: x['유사도점수'], reverse=True)
         return products[:top_k]
     
+    def dimension_recall_report(self, df: pd.DataFrame, queries: list, dims: list = (64, 128, 192, 256),
+                                k: int = 10, method: str = None) -> pd.DataFrame:
+        """
+        차원 축소 설정별 recall@k 리포트 (원본 차원 검색 결과 기준)
+        
+        Args:
+            df: 카탈로그 데이터프레임 (임베딩_텍스트 컬럼 필요)
+            queries: 평가용 검색 쿼리 리스트
+            dims: 비교할 축소 차원 리스트
+            k: 상위 k개 기준
+            method: "pca" 또는 "truncate" (None이면 self.reduction)
+            
+        Returns:
+            차원별 recall@k 데이터프레임
+        """
+        method = method or self.reduction
+        catalog = np.asarray(self.create_embeddings(df['임베딩_텍스트'].fillna('').tolist()), dtype=np.float32)
+        query_vectors = np.asarray(self.embedding_model.encode(queries), dtype=np.float32)
+        k = min(k, len(catalog))
+        
+        def top_k(catalog_vectors, query_matrix):
+            catalog_vectors = catalog_vectors / np.maximum(np.linalg.norm(catalog_vectors, axis=1, keepdims=True), 1e-12)
+            query_matrix = query_matrix / np.maximum(np.linalg.norm(query_matrix, axis=1, keepdims=True), 1e-12)
+            scores = query_matrix @ catalog_vectors.T
+            return np.argsort(-scores, axis=1)[:, :k]
+        
+        # 원본 차원 기준 결과
+        baseline = top_k(catalog, query_vectors)
+        
+        rows = []
+        for dim in dims:
+            if dim >= catalog.shape[1] or (method == "pca" and dim > len(catalog)):
+                continue
+            projection = self.fit_projection(catalog, dim=dim, method=method)
+            reduced = top_k(self.project(catalog, projection), self.project(query_vectors, projection))
+            recall = np.mean([
+                len(set(base) & set(red)) / k for base, red in zip(baseline, reduced)
+            ])
+            rows.append({
+                "차원": dim,
+                "방식": method,
+                f"recall@{k}": round(float(recall), 4),
+                "메모리_비율": round(dim / catalog.shape[1], 3)
+            })
+        
+        report = pd.DataFrame(rows)
+        print(f"차원 축소 recall@{k} 리포트 (기준: {catalog.shape[1]}차원, 쿼리 {len(queries)}개)")
+        print(report.to_string(index=False))
+        return report
+    
     def translate_medical_to_cosmetic(self, medical_description: str, skin_condition: str) -> str:
         """
         의학적 진단 용어를 화장품 용어로 번역
@@ -443,6 +746,80 @@ class CosmeticVectorDB:
             print(f"    피부타입: {product['피부타입']}")
 
 
+class StreamingIndexer:
+    """
+    큐로 들어오는 생성 결과를 작은 배치로 묶어 바로 벡터 DB에 upsert하는 증분 인덱서
+    
+    큐 항목: (포인트 id, 제품 딕셔너리), None이 들어오면 남은 배치를 저장하고 종료
+    """
+    
+    def __init__(self, db: CosmeticVectorDB, batch_size: int = 8, flush_interval: float = 2.0):
+        """
+        Args:
+            db: 대상 벡터 DB
+            batch_size: 한 번에 임베딩/upsert할 제품 수
+            flush_interval: 배치가 덜 찼어도 저장하는 최대 대기 시간(초)
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.indexed_count = 0
+        self.error_count = 0
+        self._thread = None
+    
+    def run(self, row_queue):
+        """큐가 끝날 때까지(None) 배치 단위로 인덱싱"""
+        import time
+        import queue
+        
+        batch = []
+        last_flush = time.time()
+        
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.time() - last_flush))
+            try:
+                item = row_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # 타임아웃: 모인 배치만 저장
+            
+            if item is None:
+                self._flush(batch)
+                break
+            if item is not False:
+                batch.append(item)
+            
+            if len(batch) >= self.batch_size or (batch and time.time() - last_flush >= self.flush_interval):
+                self._flush(batch)
+                batch = []
+                last_flush = time.time()
+            elif not batch:
+                last_flush = time.time()
+    
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        try:
+            self.db.upsert_products(batch)
+            self.indexed_count += len(batch)
+            print(f"🔎 인덱싱 완료: {len(batch)}개 (누적 {self.indexed_count}개)")
+        except Exception as e:
+            self.error_count += len(batch)
+            print(f"⚠️ 인덱싱 실패 ({len(batch)}개): {e}")
+    
+    def start(self, row_queue):
+        """백그라운드 스레드에서 인덱서 실행"""
+        import threading
+        
+        self._thread = threading.Thread(target=self.run, args=(row_queue,), daemon=True)
+        self._thread.start()
+        return self._thread
+    
+    def join(self):
+        """인덱서 스레드 종료 대기"""
+        if self._thread is not None:
+            self._thread.join()
+
+
 # ============================================
 # 사용 예시
 # ============================================
@@ -0,0 +1,64 @@
+"""
+화장품 데이터 생성 → 벡터 DB 스트리밍 인덱싱
+
+Generate_Cosmetic_Data_Claude.py가 생성한 행을 엑셀 저장/재가공 없이
+큐로 바로 받아서 작은 배치 단위로 임베딩/upsert합니다.
+생성이 진행되는 동안 이미 처리된 제품은 바로 검색할 수 있습니다.
+"""
+
+import os
+import sys
+import queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cosmetic_data_generation"))
+
+from Generate_Cosmetic_Data_Claude import CosmeticDataGenerator
+from build_vector_db import CosmeticVectorDB, StreamingIndexer
+
+# ========== 설정 ==========
+EXCEL_PATH = "../cosmetic_data_generation/화장품데이터.xlsx"  # 원본 엑셀 경로
+STORAGE_PATH = "./cosmetic_index"  # 벡터 DB 저장 폴더 (None이면 메모리 모드)
+START_ROW = 0
+END_ROW = None
+BATCH_SIZE = 8         # 한 번에 upsert할 제품 수
+FLUSH_INTERVAL = 2.0   # 배치가 덜 찼어도 저장하는 최대 대기 시간(초)
+# ==========================
+
+
+def main():
+    api_key = os.getenv("ANTHROPIC_API_KEY", "")
+    if not api_key:
+        print("경고: ANTHROPIC_API_KEY가 설정되지 않았습니다.")
+        return
+    
+    if not os.path.exists(EXCEL_PATH):
+        print(f"파일이 존재하지 않습니다: {EXCEL_PATH}")
+        return
+    
+    generator = CosmeticDataGenerator(api_key)
+    db = CosmeticVectorDB(storage_path=STORAGE_PATH)
+    
+    # 생성기 → 큐 → 인덱서
+    row_queue = queue.Queue(maxsize=BATCH_SIZE * 4)
+    indexer = StreamingIndexer(db, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL)
+    indexer.start(row_queue)
+    
+    try:
+        generator.process_excel_file(
+            excel_path=EXCEL_PATH,
+            start_row=START_ROW,
+            end_row=END_ROW,
+            stream_queue=row_queue
+        )
+    except KeyboardInterrupt:
+        print("\n사용자에 의해 중단되었습니다.")
+    finally:
+        # 종료 신호 → 남은 배치 저장 후 인덱서 종료
+        row_queue.put(None)
+        indexer.join()
+    
+    print(f"\n스트리밍 인덱싱 완료: {indexer.indexed_count}개 (실패 {indexer.error_count}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,20 +14,29 @@ from datasets import load_from_disk, DatasetDict
 from anthropic import Anthropic
 from tqdm import tqdm
 import os
+import sys
+import time
 from prompts import SYSTEM_PROMPT
 
+# 화장품 데이터 생성기와 같은 Rate Limiter 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cosmetic_data_generation"))
+from rate_limiter import RateLimiter
+
 # ========== 설정 (여기만 수정하세요!) ==========
 DATASET_PATH = "../skin_disease_dataset"  # 전처리 (1)에서 만든 데이터셋 경로 
 SAVE_PATH = "../skin_disease_dataset_with_output"  # 저장할 경로
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")  # 환경 변수에서 가져오거나 여기에 직접 입력
 NUM_SAMPLES = 10  # Claude로 처리할 개수 (1000개 추천)
 TXT_OUTPUT_FILE = "claude_outputs.txt"  # 원하는 파일명으로 변경 가능!
+REQUESTS_PER_MINUTE = 50  # 분당 최대 요청 수
+TOKENS_PER_MINUTE = 30000  # 분당 최대 입력 토큰 수
+MAX_RETRIES = 3  # 재시도 가능한 오류(429, 5xx 등)의 최대 시도 횟수
 # ================================================
 
 # System Prompt는 prompts.py에서 import
 
 
-def process_with_claude(client, image_pil, label, description, symptom):
+def process_with_claude(client, image_pil, label, description, symptom, rate_limiter=None):
     """
     Claude API로 이미지 설명 생성
     
@@ -37,6 +46,7 @@ def process_with_claude(client, image_pil, label, description, symptom):
         label: 정답 라벨
         description: JSON의 description
         symptom: JSON의 symptom
+        rate_limiter: 공유 RateLimiter (None이면 제한/재시도 없이 호출)
     
     Returns:
         Claude의 응답 (str)
@@ -54,8 +64,7 @@ def process_with_claude(client, image_pil, label, description, symptom):
 
                 위 정보를 참고하여 이미지를 자세히 분석하고, 정답에 맞게 설명하라."""
         
-    # Claude API 호출
-    message = client.messages.create(
+    request = dict(
         model="claude-sonnet-4-20250514",  # 최신 Claude Sonnet
         max_tokens=1024,
         system=SYSTEM_PROMPT,
@@ -80,9 +89,29 @@ def process_with_claude(client, image_pil, label, description, symptom):
         ],
     )
     
-    # 응답 추출
-    response = message.content[0].text
-    return response
+    if rate_limiter is None:
+        message = client.messages.create(**request)
+        return message.content[0].text
+    
+    # 입력 토큰 추정 (텍스트 + 이미지)
+    input_tokens = (
+        rate_limiter.estimate_tokens(SYSTEM_PROMPT + user_text)
+        + rate_limiter.estimate_image_tokens(image_pil.width, image_pil.height)
+    )
+    
+    # Claude API 호출 (재시도 가능한 오류만 재시도)
+    for attempt in range(MAX_RETRIES):
+        try:
+            rate_limiter.acquire(input_tokens)
+            message = client.messages.create(**request)
+            
+            # 응답 추출
+            return message.content[0].text
+        except Exception as e:
+            delay = rate_limiter.retry_delay(e, attempt)
+            if delay is None or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(delay)
 
 
 def save_outputs_to_txt(dataset, num_samples, output_file):
@@ -138,7 +167,9 @@ def main():
     
     # Claude 클라이언트 초기화
     print(f"\n🤖 Claude API 초기화 중...")
-    client = Anthropic(api_key=ANTHROPIC_API_KEY)
+    # 재시도는 process_with_claude의 rate_limiter 루프에서만 하도록 SDK 자체 재시도는 끔
+    client = Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+    rate_limiter = RateLimiter(requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE)
     print(f"✅ 초기화 완료!")
     
     # Train 데이터 처리 (일부만)
@@ -171,7 +202,8 @@ def main():
                 image_pil=sample["image"],
                 label=sample["label"],
                 description=sample["description"],
-                symptom=sample["symptom"]
+                symptom=sample["symptom"],
+                rate_limiter=rate_limiter
             )
             
             train_outputs[i] = result
@@ -217,6 +249,7 @@ def main():
     print("✅ Claude API 처리 완료!")
     print("=" * 60)
     print(f"처리된 개수: {NUM_SAMPLES}개")
+    print(rate_limiter.summary())
     print(f"나머지: {len(dataset['train']) - NUM_SAMPLES}개 (Gemma로 처리 필요)")
     
     # txt 파일로 저장 (새로 추가된 부분!)